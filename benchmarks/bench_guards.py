@@ -0,0 +1,66 @@
+# benchmarks/bench_guards.py
+"""Compare prepare_orders (batch NumPy) à une boucle sur prepare_order.
+
+Usage: python benchmarks/bench_guards.py [--symbols 2000] [--orders 100 1000 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from guards import FilterTable, prepare_order, prepare_orders  # noqa: E402
+
+def build_table(n_symbols: int) -> FilterTable:
+    symbols = []
+    for i in range(n_symbols):
+        symbols.append({"symbol": f"S{i}USDT", "filters": [
+            {"filterType": "PRICE_FILTER", "minPrice": "0.01", "maxPrice": "100000", "tickSize": "0.01"},
+            {"filterType": "LOT_SIZE", "minQty": "0.00001", "maxQty": "9000", "stepSize": "0.00001"},
+            {"filterType": "NOTIONAL", "minNotional": "5"},
+            {"filterType": "PERCENT_PRICE_BY_SIDE", "bidMultiplierUp": "5", "bidMultiplierDown": "0.2",
+             "askMultiplierUp": "5", "askMultiplierDown": "0.2"},
+        ]})
+    return FilterTable.from_exchange_info({"symbols": symbols})
+
+def scalar_loop(table, symbols, sides, last, prices, qtys):
+    out = []
+    for i in range(len(symbols)):
+        try:
+            out.append(prepare_order(table.get(symbols[i]), sides[i], last[i], prices[i], qtys[i]))
+        except ValueError:
+            out.append(None)
+    return out
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--orders", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+    table = build_table(args.symbols)
+    table.columns()  # construction unique, hors mesure
+    rng = np.random.default_rng(0)
+    print(f"{'ordres':>8} {'boucle (ms)':>12} {'batch (ms)':>11} {'speedup':>8}")
+    for n in args.orders:
+        symbols = [f"S{i}/USDT" for i in rng.integers(0, args.symbols, n)]
+        sides = list(rng.choice(["BUY", "SELL"], n))
+        last = rng.uniform(1, 1000, n)
+        prices = last * rng.uniform(0.9, 1.1, n)
+        qtys = rng.uniform(0, 1, n)
+        t_loop = best_of(lambda: scalar_loop(table, symbols, sides, last.tolist(), prices.tolist(), qtys.tolist()))
+        t_batch = best_of(lambda: prepare_orders(table, symbols, sides, last, prices, qtys))
+        print(f"{n:>8} {t_loop * 1e3:>12.2f} {t_batch * 1e3:>11.2f} {t_loop / t_batch:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# benchmarks/bench_pipeline.py
+"""Débit de bout en bout du bot contre un exchange simulé (benchmarks/fake_exchange.py).
+
+Pour chaque taille d'univers, mesure (meilleur de --repeat) :
+  exchange_info    téléchargement + compilation des filtres (à froid)
+  ohlcv_fetch      backfill REST de toutes les bougies (à froid, --latency par appel)
+  indicators_full  compute_indicators (pandas / ta) sur tout l'historique de chaque symbole
+  cycle            clôture de bougie : une bougie ajoutée par symbole puis analyze_symbol sur tout l'univers
+  cycle_panel      idem en mode panel (analyze_panel)
+  guards           prepare_order pour un ordre par symbole
+  orders           execute_trade (dry run) de 100 signaux au plus (un par symbole) via l'OrderPipeline,
+                   sans plafond de débit
+  bookticker       décodage de 20 000 messages bookTicker (BookStore.handle)
+  paper_orders     5 000 ordres market exécutés par le PaperExchange contre ce carnet
+et la mémoire (pic tracemalloc, Mo) d'un démarrage à froid suivi d'un cycle.
+
+Les résultats peuvent être enregistrés comme référence (--save-baseline) ; les
+exécutions suivantes signalent toute étape plus lente que la référence de plus
+de --tolerance (et d'au moins 2 ms), avec un code de sortie 1 sous --check.
+
+Usage: python benchmarks/bench_pipeline.py [--symbols 50 500 2000] [--candles 200]
+       [--latency 0.0] [--baseline benchmarks/baseline.json] [--save-baseline] [--check]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import yaml  # noqa: E402
+
+import main as bot  # noqa: E402
+import utils  # noqa: E402
+from cache import OHLCVCache  # noqa: E402
+from execution import OrderPipeline  # noqa: E402
+from fake_exchange import FakeExchange  # noqa: E402
+from guards import prepare_order  # noqa: E402
+from indicators import IndicatorBank, compute_indicators  # noqa: E402
+from marketdata import BookStore  # noqa: E402
+from paper import PaperExchange  # noqa: E402
+from strategies.rsi_sma import RSISMAStrategy  # noqa: E402
+
+STAGES = ("exchange_info", "ohlcv_fetch", "indicators_full", "cycle", "cycle_panel", "guards", "orders",
+          "bookticker", "paper_orders")
+BOOK_MESSAGES = 20_000
+PAPER_ORDERS = 5_000
+ORDERS = 100
+NOISE_FLOOR = 0.002  # secondes
+
+def load_cfg(candles: int):
+    with open(os.path.join(ROOT, "config.yml"), "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    cfg["bot"].update(limit=candles, dry_run=True)
+    return cfg
+
+def reset_exchange_info():
+    utils._EXINFO_CACHE, utils._EXINFO_TS = {}, 0.0
+
+async def timed(coro) -> float:
+    t0 = time.perf_counter()
+    await coro
+    return time.perf_counter() - t0
+
+def close_candle(ex: FakeExchange, cache: OHLCVCache, timeframe: str, step: int):
+    """Simule la clôture : une nouvelle bougie par symbole, comme le flux klines"""
+    for s in ex.symbols:
+        last = cache.store.get(s, timeframe).column('close')[-1]
+        t = int(ex._times[-1]) + step * ex.tf_ms
+        close = last * (1 + 0.002 * (step % 3 - 1))
+        cache.store.merge(s, timeframe, [[t, last, max(last, close) * 1.01, min(last, close) * 0.99, close, 100.0]])
+
+async def run_once(n: int, candles: int, latency: float, state: dict) -> dict:
+    cfg = load_cfg(candles)
+    timeframe = cfg["bot"]["timeframe"]
+    ex = FakeExchange(n, candles, timeframe, latency)
+    cache = OHLCVCache(capacity=candles)
+    strategy = RSISMAStrategy(cfg["strategy"])
+    indicators = IndicatorBank(cfg["strategy"])
+    out = {}
+
+    reset_exchange_info()
+    out["exchange_info"] = await timed(utils.get_exchange_info(ex))
+    out["ohlcv_fetch"] = await timed(bot.refresh_candles(ex, ex.symbols, cfg, cache))
+
+    t0 = time.perf_counter()
+    for s in ex.symbols:
+        compute_indicators(cache.store.get(s, timeframe).to_frame(), cfg["strategy"])
+    out["indicators_full"] = time.perf_counter() - t0
+
+    # Premier passage : moteurs incrémentaux initialisés (démarrage), hors mesure
+    await asyncio.gather(*(bot.analyze_symbol(ex, s, cfg, cache, strategy, indicators) for s in ex.symbols))
+    state["step"] += 1
+    close_candle(ex, cache, timeframe, state["step"])
+    out["cycle"] = await timed(asyncio.gather(
+        *(bot.analyze_symbol(ex, s, cfg, cache, strategy, indicators) for s in ex.symbols)))
+    out["cycle_panel"] = await timed(bot.analyze_panel(ex, ex.symbols, cfg, cache, strategy))
+
+    filters = [await utils.get_symbol_filters(ex, s) for s in ex.symbols]
+    prices = [ex.last_price(s) for s in ex.symbols]
+    t0 = time.perf_counter()
+    for f, p in zip(filters, prices):
+        prepare_order(f, "BUY", p, p, 100.0 / p)
+    out["guards"] = time.perf_counter() - t0
+
+    pipeline = OrderPipeline(concurrency=4, orders_per_second=0)
+    pipeline.start()
+    signals = [{'symbol': s, 'signal': {'action': 'BUY', 'confidence': 1.0}, 'price': ex.last_price(s)}
+               for s in ex.symbols[:ORDERS]]
+    t0 = time.perf_counter()
+    for sig in signals:
+        pipeline.submit(sig['symbol'], 'BUY', bot.execute_trade, ex, sig, cfg)
+    await pipeline.join()
+    out["orders"] = time.perf_counter() - t0
+    await pipeline.stop()
+
+    messages = state.setdefault(("book", n), ex.bookticker_messages(BOOK_MESSAGES))
+    book = BookStore(n)
+    t0 = time.perf_counter()
+    for raw in messages:
+        book.handle(raw)
+    out["bookticker"] = time.perf_counter() - t0
+
+    paper = PaperExchange(ex, balances={"USDT": 1e12}, book=book, book_max_age=None)
+    quoted = [s for s in ex.symbols if book.age(s) is not None][:100]
+    await paper.create_order(quoted[0], "market", "buy", 1.0)  # filtres chargés hors mesure
+    t0 = time.perf_counter()
+    for i in range(PAPER_ORDERS):
+        await paper.create_order(quoted[i % len(quoted)], "market", "sell" if i // len(quoted) % 2 else "buy", 1.0)
+    out["paper_orders"] = time.perf_counter() - t0
+    return out
+
+async def memory_peak(n: int, candles: int) -> float:
+    cfg = load_cfg(candles)
+    ex = FakeExchange(n, candles, cfg["bot"]["timeframe"])
+    cache = OHLCVCache(capacity=candles)
+    strategy = RSISMAStrategy(cfg["strategy"])
+    indicators = IndicatorBank(cfg["strategy"])
+    reset_exchange_info()
+    tracemalloc.start()
+    await bot.refresh_candles(ex, ex.symbols, cfg, cache)
+    await asyncio.gather(*(bot.analyze_symbol(ex, s, cfg, cache, strategy, indicators) for s in ex.symbols))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+async def bench(sizes, candles, latency, repeat) -> dict:
+    results = {}
+    state = {"step": 0}
+    for n in sizes:
+        runs = [await run_once(n, candles, latency, state) for _ in range(repeat)]
+        best = {stage: min(r[stage] for r in runs) for stage in STAGES}
+        best["memory_mb"] = await memory_peak(n, candles)
+        results[str(n)] = best
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for n, stages in results.items():
+        ref = baseline.get("results", {}).get(n, {})
+        for stage in STAGES:
+            if stage not in ref:
+                continue
+            if stages[stage] > ref[stage] * (1 + tolerance) and stages[stage] - ref[stage] > NOISE_FLOOR:
+                regressions.append((n, stage, ref[stage], stages[stage]))
+    return regressions
+
+def report(results: dict, regressions: list):
+    flagged = {(n, stage) for n, stage, _, _ in regressions}
+    print(f"{'étape':<16}" + "".join(f"{n + ' sym (ms)':>16}" for n in results))
+    for stage in STAGES:
+        cells = []
+        for n, stages in results.items():
+            mark = " !" if (n, stage) in flagged else "  "
+            cells.append(f"{stages[stage] * 1e3:>14.2f}{mark}")
+        print(f"{stage:<16}" + "".join(cells))
+    print(f"{'memory_mb':<16}" + "".join(f"{stages['memory_mb']:>14.1f}  " for stages in results.values()))
+    print(f"{'book msg/s':<16}" + "".join(f"{BOOK_MESSAGES / stages['bookticker']:>14.0f}  "
+                                          for stages in results.values()))
+    print(f"{'paper ord/s':<16}" + "".join(f"{PAPER_ORDERS / stages['paper_orders']:>14.0f}  "
+                                           for stages in results.values()))
+    for n, stage, ref, cur in regressions:
+        print(f"RÉGRESSION {stage} @ {n} symboles : {ref * 1e3:.2f} ms -> {cur * 1e3:.2f} ms ({cur / ref - 1:+.0%})")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--candles", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="latence simulée par appel REST (s)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=os.path.join(ROOT, "benchmarks", "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--check", action="store_true", help="code de sortie 1 en cas de régression")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # DRY RUN et démarrage : pas de log par ordre
+    results = asyncio.run(bench(args.symbols, args.candles, args.latency, args.repeat))
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != vars_params(args):
+            print(f"Référence {args.baseline} mesurée avec d'autres paramètres : comparaison ignorée")
+            baseline = {}
+    regressions = compare(results, baseline, args.tolerance)
+    report(results, regressions)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"params": vars_params(args), "python": sys.version.split()[0],
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+        print(f"Référence enregistrée dans {args.baseline}")
+    if args.check and regressions:
+        sys.exit(1)
+
+def vars_params(args) -> dict:
+    return {"candles": args.candles, "latency": args.latency}
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/fake_exchange.py
+"""Exchange ccxt simulé, en mémoire et déterministe, pour les benchmarks.
+
+Expose les méthodes utilisées par le bot (load_markets, fetch_tickers,
+fetch_ohlcv, fetch_ticker, fetch_balance, create_order, publicGetExchangeInfo)
+sur `n_symbols` symboles synthétiques 'S0000/USDT'... dont les bougies sont
+des marches aléatoires reproductibles (graine par symbole), alignées sur la
+bougie en cours. `latency` ajoute un délai réseau simulé à chaque appel REST.
+"""
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+_TF_MS = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000, '4h': 14_400_000, '1d': 86_400_000}
+
+class FakeExchange:
+    def __init__(self, n_symbols: int = 50, candles: int = 500, timeframe: str = '1h',
+                 latency: float = 0.0, seed: int = 0):
+        self.timeframe = timeframe
+        self.tf_ms = _TF_MS[timeframe]
+        self.latency = latency
+        self.seed = seed
+        self.symbols = [f"S{i:04d}/USDT" for i in range(n_symbols)]
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+        self.calls: Counter = Counter()
+        self.orders: List[Dict[str, Any]] = []
+        last_open = int(time.time() * 1000) // self.tf_ms * self.tf_ms
+        self._times = last_open - self.tf_ms * np.arange(candles - 1, -1, -1, dtype=np.int64)
+        self._series: Dict[str, np.ndarray] = {}
+
+    async def _call(self, name: str):
+        self.calls[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def series(self, symbol: str) -> np.ndarray:
+        """Bougies (n x 6) du symbole, générées au premier accès"""
+        rows = self._series.get(symbol)
+        if rows is None:
+            rng = np.random.default_rng(self.seed * 100_003 + self._index[symbol])
+            n = len(self._times)
+            close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+            open_ = np.concatenate([[close[0]], close[:-1]])
+            spread = np.abs(rng.normal(0, 0.005, n)) * close
+            rows = np.column_stack([self._times, open_, np.maximum(open_, close) + spread,
+                                    np.minimum(open_, close) - spread, close, rng.uniform(10, 1000, n)])
+            self._series[symbol] = rows
+        return rows
+
+    def last_price(self, symbol: str) -> float:
+        return float(self.series(symbol)[-1, 4])
+
+    async def load_markets(self, reload=False):
+        await self._call('load_markets')
+        return {s: {'symbol': s, 'base': s.split('/')[0], 'quote': 'USDT', 'active': True, 'type': 'spot'}
+                for s in self.symbols}
+
+    async def fetch_tickers(self, symbols=None):
+        await self._call('fetch_tickers')
+        return {s: {'symbol': s, 'last': self.last_price(s), 'quoteVolume': 1e6 + i}
+                for i, s in enumerate(symbols or self.symbols)}
+
+    async def fetch_ticker(self, symbol: str):
+        await self._call('fetch_ticker')
+        price = self.last_price(symbol)
+        return {'symbol': symbol, 'last': price, 'close': price, 'bid': price * 0.9995, 'ask': price * 1.0005}
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: Optional[str] = None, since: Optional[int] = None,
+                          limit: Optional[int] = None):
+        await self._call('fetch_ohlcv')
+        rows = self.series(symbol)
+        if since is not None:
+            rows = rows[np.searchsorted(rows[:, 0], since):][:limit]
+        elif limit:
+            rows = rows[-limit:]
+        out = rows.tolist()
+        for r in out:
+            r[0] = int(r[0])
+        return out
+
+    async def fetch_balance(self):
+        await self._call('fetch_balance')
+        return {'free': {'USDT': 1_000_000.0}, 'used': {'USDT': 0.0}}
+
+    async def create_order(self, symbol, type, side, amount, price=None, params=None):
+        await self._call('create_order')
+        order = {'id': str(len(self.orders) + 1), 'symbol': symbol, 'type': type, 'side': side,
+                 'amount': amount, 'price': price or self.last_price(symbol), 'status': 'closed'}
+        self.orders.append(order)
+        return order
+
+    async def publicGetExchangeInfo(self, params=None):
+        await self._call('publicGetExchangeInfo')
+        return {'symbols': [{'symbol': s.replace('/', ''), 'status': 'TRADING', 'filters': [
+            {"filterType": "PRICE_FILTER", "minPrice": "0.0001", "maxPrice": "1000000", "tickSize": "0.0001"},
+            {"filterType": "LOT_SIZE", "minQty": "0.00001", "maxQty": "9000000", "stepSize": "0.00001"},
+            {"filterType": "NOTIONAL", "minNotional": "5"},
+        ]} for s in self.symbols]}
+
+    async def close(self):
+        pass
+
+    def bookticker_messages(self, count: int, seed: int = 1) -> List[str]:
+        """Messages combined-stream bookTicker bruts, répartis sur tous les symboles"""
+        rng = np.random.default_rng(seed)
+        idx = rng.integers(0, len(self.symbols), count)
+        mids = np.array([self.last_price(s) for s in self.symbols])[idx] * rng.uniform(0.99, 1.01, count)
+        out = []
+        for u, (i, mid) in enumerate(zip(idx, mids), start=1):
+            sid = self.symbols[i].replace('/', '')
+            out.append(json.dumps({"stream": f"{sid.lower()}@bookTicker", "data": {
+                "u": u, "s": sid, "b": f"{mid * 0.9995:.4f}", "B": "1.5", "a": f"{mid * 1.0005:.4f}", "A": "2.0"}}))
+        return out
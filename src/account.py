@@ -0,0 +1,198 @@
+# src/account.py
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import websockets
+
+from marketdata import STREAM_URL
+from metrics import ws_messages, ws_reconnects
+from ratelimit import PRIORITY_ACCOUNT
+from utils import with_rate_limit_retry
+
+logger = logging.getLogger(__name__)
+
+# Statuts executionReport après lesquels un ordre n'est plus ouvert
+_TERMINAL_STATUSES = {"FILLED", "CANCELED", "REJECTED", "EXPIRED", "EXPIRED_IN_MATCH"}
+
+class AccountState:
+    """Soldes et ordres ouverts en mémoire, lus de façon synchrone par le bot.
+
+    Les événements de solde datés (`E`, ms) au plus tard de la dernière
+    réconciliation REST sont déjà inclus dans celle-ci et sont ignorés ; une
+    réconciliation plus ancienne que le dernier événement appliqué est
+    écartée. Le notionnel d'un BUY envoyé est réservé jusqu'à son
+    executionReport pour que des ordres concurrents ne se dimensionnent pas
+    sur le même solde libre.
+    """
+
+    def __init__(self):
+        self.free: Dict[str, float] = {}
+        self.locked: Dict[str, float] = {}
+        self.orders: Dict[int, Dict[str, Any]] = {}  # ordres ouverts par orderId
+        self.reserved: Dict[str, Tuple[str, float, float]] = {}  # clientOrderId -> (actif, montant, instant ms)
+        self.updated_at = 0.0
+        self.snapshot_at = 0.0  # instant (ms) de la dernière réconciliation REST appliquée
+        self.event_at = 0.0  # instant (ms) du dernier événement de solde appliqué
+        self.streaming = False  # user data stream connecté et réconcilié
+
+    def free_balance(self, asset: str) -> float:
+        """Solde libre, déduction faite des réservations des ordres en vol"""
+        held = sum(amount for a, amount, _ in self.reserved.values() if a == asset)
+        return max(0.0, self.free.get(asset, 0.0) - held)
+
+    def reserve(self, client_id: str, asset: str, amount: float):
+        self.reserved[client_id] = (asset, float(amount), time.time() * 1000)
+
+    def release(self, client_id: Optional[str]):
+        self.reserved.pop(client_id, None)
+
+    def total(self, asset: str) -> float:
+        return self.free.get(asset, 0.0) + self.locked.get(asset, 0.0)
+
+    def is_fresh(self, max_age: float) -> bool:
+        return self.streaming or (self.updated_at > 0 and time.time() - self.updated_at < max_age)
+
+    def apply_balance(self, balance: Dict[str, Any], at: Optional[float] = None) -> bool:
+        """Réconciliation complète depuis un fetch_balance ccxt, datée `at` (ms).
+
+        Sans `at`, l'updateTime du compte (balance["timestamp"]) ou à défaut
+        l'instant courant. Retourne False si un événement plus récent a déjà
+        été appliqué (snapshot périmé, ignoré).
+        """
+        at = float(at or balance.get("timestamp") or time.time() * 1000)
+        if at < self.event_at:
+            return False
+        self.free = {a: float(v or 0.0) for a, v in (balance.get("free") or {}).items()}
+        self.locked = {a: float(v or 0.0) for a, v in (balance.get("used") or {}).items()}
+        self.snapshot_at = at
+        self.updated_at = time.time()
+        # Ordres antérieurs au snapshot : déjà débités des soldes
+        self.reserved = {c: r for c, r in self.reserved.items() if r[2] > at}
+        return True
+
+    def _balance_event(self, data: Dict[str, Any]) -> bool:
+        """Date l'événement ; False s'il est déjà inclus dans la dernière réconciliation"""
+        # Heure de la mise à jour du compte (u / T), comparable à l'updateTime REST ; E à défaut
+        at = float(data.get("u") or data.get("T") or data.get("E") or 0.0)
+        if at and at <= self.snapshot_at:
+            return False
+        self.event_at = max(self.event_at, at)
+        self.updated_at = time.time()
+        return True
+
+    def apply_event(self, data: Dict[str, Any]):
+        """Applique un événement du user data stream Binance"""
+        event = data.get("e")
+        if event == "outboundAccountPosition":
+            if self._balance_event(data):
+                for b in data.get("B", []):
+                    self.free[b["a"]] = float(b["f"])
+                    self.locked[b["a"]] = float(b["l"])
+        elif event == "balanceUpdate":
+            if self._balance_event(data):
+                self.free[data["a"]] = self.free.get(data["a"], 0.0) + float(data["d"])
+        elif event == "executionReport":
+            # L'ordre est connu de l'exchange : les soldes poussés prennent le relais de la réservation
+            self.release(data.get("c"))
+            self.release(data.get("C"))
+            order_id = data.get("i")
+            if data.get("X") in _TERMINAL_STATUSES:
+                self.orders.pop(order_id, None)
+            else:
+                self.orders[order_id] = {
+                    "symbol": data.get("s"),
+                    "side": data.get("S"),
+                    "status": data.get("X"),
+                    "qty": float(data.get("q") or 0.0),
+                    "filled": float(data.get("z") or 0.0),
+                }
+
+# Etat du compte partagé par risk_gate et execute_trade
+_ACCOUNT = AccountState()
+
+def get_account() -> AccountState:
+    return _ACCOUNT
+
+async def reconcile_account(exchange, account: Optional[AccountState] = None) -> AccountState:
+    account = account or _ACCOUNT
+    balance = await with_rate_limit_retry(exchange.fetch_balance, priority=PRIORITY_ACCOUNT)
+    if not account.apply_balance(balance):
+        logger.info("Réconciliation REST plus ancienne que le dernier événement du stream, ignorée")
+    return account
+
+async def ensure_account(exchange, max_age: float = 0.0) -> AccountState:
+    """Etat du compte ; REST uniquement si le stream est coupé et l'état plus vieux que max_age"""
+    if not _ACCOUNT.is_fresh(max_age):
+        await reconcile_account(exchange)
+    return _ACCOUNT
+
+class UserDataStream:
+    """User data stream Binance (listenKey) alimentant un AccountState.
+
+    Après chaque connexion, l'état est réconcilié en REST (les événements
+    reçus entre-temps restent en file et sont appliqués ensuite), puis
+    réconcilié périodiquement pour corriger toute dérive.
+    """
+
+    def __init__(self, exchange, account: Optional[AccountState] = None, base_url: str = STREAM_URL,
+                 keepalive_interval: float = 1800.0, reconcile_interval: float = 300.0,
+                 reconnect_delay: float = 3.0):
+        self.exchange = exchange
+        self.account = account or _ACCOUNT
+        self.base_url = base_url
+        self.keepalive_interval = keepalive_interval
+        self.reconcile_interval = reconcile_interval
+        self.reconnect_delay = reconnect_delay
+        self.ready = asyncio.Event()
+
+    async def _listen_key(self) -> str:
+        resp = await with_rate_limit_retry(self.exchange.publicPostUserDataStream, weight=2, priority=PRIORITY_ACCOUNT)
+        return resp["listenKey"]
+
+    async def _maintain(self, listen_key: str):
+        """Keepalive du listenKey et réconciliation périodique"""
+        last_keepalive = time.monotonic()
+        while True:
+            await asyncio.sleep(min(self.reconcile_interval, self.keepalive_interval))
+            if time.monotonic() - last_keepalive >= self.keepalive_interval:
+                await with_rate_limit_retry(self.exchange.publicPutUserDataStream, {"listenKey": listen_key},
+                                            weight=2, priority=PRIORITY_ACCOUNT)
+                last_keepalive = time.monotonic()
+            try:
+                await reconcile_account(self.exchange, self.account)
+            except Exception as e:
+                logger.warning(f"Réconciliation du compte échouée: {e}")
+
+    async def run(self):
+        while True:
+            maintain = None
+            try:
+                listen_key = await self._listen_key()
+                async with websockets.connect(f"{self.base_url}/ws/{listen_key}",
+                                              ping_interval=20, ping_timeout=60) as ws:
+                    await reconcile_account(self.exchange, self.account)
+                    self.account.streaming = True
+                    self.ready.set()
+                    maintain = asyncio.create_task(self._maintain(listen_key))
+                    messages = ws_messages.labels(stream="user")
+                    async for raw in ws:
+                        messages.inc()
+                        try:
+                            self.account.apply_event(json.loads(raw))
+                        except Exception as e:
+                            logger.error(f"Evénement compte invalide: {e}")
+            except asyncio.CancelledError:
+                self.account.streaming = False
+                if maintain:
+                    maintain.cancel()
+                raise
+            except Exception as e:
+                logger.warning(f"User data stream interrompu: {e}")
+            self.account.streaming = False
+            if maintain:
+                maintain.cancel()
+            ws_reconnects.labels(stream="user").inc()
+            await asyncio.sleep(self.reconnect_delay)
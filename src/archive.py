@@ -0,0 +1,237 @@
+# src/archive.py
+"""Archive locale des bougies, colonne par colonne, lisible en memory-map.
+
+Disposition : <root>/<BTCUSDT>/<timeframe>/<colonne>.bin, un tableau binaire
+brut little-endian par colonne (timestamp int64, open/high/low/close/volume
+float64), trié par open time. Les ajouts en fin de série sont des appends ;
+la lecture d'une plage de dates ne mappe que les pages concernées.
+
+Usage: python src/archive.py --symbols BTC/USDT ETH/USDT --timeframe 1h --since 2023-01-01
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from candles import OHLCV_COLUMNS, timeframe_ms
+from utils import with_rate_limit_retry
+
+COLUMNS = ('timestamp',) + OHLCV_COLUMNS
+_DTYPES = {name: np.dtype('<f8') for name in OHLCV_COLUMNS}
+_DTYPES['timestamp'] = np.dtype('<i8')
+
+Timestamp = Union[int, str, pd.Timestamp, None]
+
+def _to_ms(value: Timestamp) -> Optional[int]:
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    return int(pd.Timestamp(value, tz='UTC').value // 1_000_000)
+
+class CandleArchive:
+    """Archive de bougies par (symbole, timeframe) sur disque"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dir(self, symbol: str, timeframe: str) -> str:
+        d = os.path.join(self.root, symbol.replace('/', '').upper(), timeframe)
+        if not os.path.isdir(d) and os.path.isdir(d + '.old'):
+            os.replace(d + '.old', d)  # réécriture interrompue : retour à l'ancienne version
+        return d
+
+    def _file(self, d: str, column: str) -> str:
+        return os.path.join(d, f"{column}.bin")
+
+    def _length(self, d: str) -> int:
+        """Nombre de bougies complètes (la plus courte colonne fait foi après un crash)"""
+        sizes = []
+        for col in COLUMNS:
+            path = self._file(d, col)
+            if not os.path.exists(path):
+                return 0
+            sizes.append(os.path.getsize(path) // _DTYPES[col].itemsize)
+        return min(sizes)
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def keys(self) -> List[tuple]:
+        """(symbole archivé, timeframe) présents sur disque"""
+        if not os.path.isdir(self.root):
+            return []
+        return [(s, tf) for s in sorted(os.listdir(self.root))
+                for tf in sorted(os.listdir(os.path.join(self.root, s)))
+                if not tf.endswith(('.old', '.tmp'))]
+
+    def length(self, symbol: str, timeframe: str) -> int:
+        return self._length(self._dir(symbol, timeframe))
+
+    def _column(self, d: str, column: str, n: int) -> np.ndarray:
+        if n == 0:
+            return np.empty(0, dtype=_DTYPES[column])
+        return np.memmap(self._file(d, column), dtype=_DTYPES[column], mode='r', shape=(n,))
+
+    def timestamps(self, symbol: str, timeframe: str) -> np.ndarray:
+        d = self._dir(symbol, timeframe)
+        return self._column(d, 'timestamp', self._length(d))
+
+    def first_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        ts = self.timestamps(symbol, timeframe)
+        return int(ts[0]) if len(ts) else None
+
+    def last_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        ts = self.timestamps(symbol, timeframe)
+        return int(ts[-1]) if len(ts) else None
+
+    def read(self, symbol: str, timeframe: str, start: Timestamp = None,
+             end: Timestamp = None) -> Dict[str, np.ndarray]:
+        """Colonnes de la plage [start, end) en memory-map (aucune lecture complète du fichier)"""
+        d = self._dir(symbol, timeframe)
+        n = self._length(d)
+        ts = self._column(d, 'timestamp', n)
+        start, end = _to_ms(start), _to_ms(end)
+        i0 = int(np.searchsorted(ts, start, side='left')) if start is not None else 0
+        i1 = int(np.searchsorted(ts, end, side='left')) if end is not None else n
+        return {col: self._column(d, col, n)[i0:i1] for col in COLUMNS}
+
+    def tail(self, symbol: str, timeframe: str, count: int) -> np.ndarray:
+        """Les `count` dernières bougies au format ccxt (n, 6), pour CandleBuffer.merge"""
+        d = self._dir(symbol, timeframe)
+        n = self._length(d)
+        i0 = max(0, n - count)
+        return np.column_stack([self._column(d, col, n)[i0:] for col in COLUMNS]).astype(np.float64)
+
+    def to_frame(self, symbol: str, timeframe: str, start: Timestamp = None,
+                 end: Timestamp = None) -> pd.DataFrame:
+        """DataFrame OHLCV indexé par date (copie de la plage seulement)"""
+        cols = self.read(symbol, timeframe, start, end)
+        index = pd.to_datetime(np.asarray(cols['timestamp']), unit='ms')
+        return pd.DataFrame({c: np.asarray(cols[c]) for c in OHLCV_COLUMNS},
+                            index=pd.DatetimeIndex(index, name='datetime'))
+
+    def _append(self, d: str, n: int, columns: Dict[str, np.ndarray]):
+        os.makedirs(d, exist_ok=True)
+        # timestamp en dernier : une bougie n'existe que quand sa colonne timestamp est écrite
+        for col in OHLCV_COLUMNS + ('timestamp',):
+            path = self._file(d, col)
+            with open(path, 'ab') as f:
+                f.truncate(n * _DTYPES[col].itemsize)  # retire une écriture partielle éventuelle
+                f.write(np.ascontiguousarray(columns[col], dtype=_DTYPES[col]).tobytes())
+
+    def _rewrite(self, d: str, columns: Dict[str, np.ndarray]):
+        tmp = d + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        self._append(tmp, 0, columns)
+        if os.path.isdir(d):
+            os.replace(d, d + '.old')
+        os.replace(tmp, d)
+        shutil.rmtree(d + '.old', ignore_errors=True)
+
+    def write(self, symbol: str, timeframe: str, rows: Sequence[Sequence[float]]) -> int:
+        """Ajoute des bougies ccxt [ts, o, h, l, c, v] ; retourne le nombre de bougies nouvelles.
+
+        Les bougies postérieures à la dernière sont ajoutées en fin de fichier,
+        celles antérieures à la première déclenchent une réécriture ; les bougies
+        déjà couvertes sont ignorées.
+        """
+        if rows is None or len(rows) == 0:
+            return 0
+        arr = np.asarray(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+        ts, first_idx = np.unique(arr[:, 0].astype(np.int64), return_index=True)
+        cols = {col: arr[first_idx, i] for i, col in enumerate(COLUMNS)}
+        cols['timestamp'] = ts
+        d = self._dir(symbol, timeframe)
+        n = self._length(d)
+        existing = self._column(d, 'timestamp', n)
+        if n:
+            before = ts < existing[0]
+            after = ts > existing[-1]
+        else:
+            before = np.zeros(len(ts), dtype=bool)
+            after = np.ones(len(ts), dtype=bool)
+        del existing
+        if before.any():
+            self._rewrite(d, {col: np.concatenate([cols[col][before], self._column(d, col, n), cols[col][after]])
+                              for col in COLUMNS})
+        elif after.any():
+            self._append(d, n, {col: cols[col][after] for col in COLUMNS})
+        return int(before.sum() + after.sum())
+
+# Archive partagée (None = désactivée)
+_ARCHIVE: Optional[CandleArchive] = None
+
+def configure_archive(root: Optional[str]) -> Optional[CandleArchive]:
+    global _ARCHIVE
+    _ARCHIVE = CandleArchive(root) if root else None
+    return _ARCHIVE
+
+def get_archive() -> Optional[CandleArchive]:
+    return _ARCHIVE
+
+async def download(exchange, archive: CandleArchive, symbol: str, timeframe: str,
+                   since: Timestamp, until: Timestamp = None, page: int = 1000) -> int:
+    """Complète l'archive sur [since, until) en paginant fetch_ohlcv.
+
+    Seules les plages absentes (avant la première / après la dernière bougie)
+    sont demandées ; la bougie en cours n'est jamais archivée.
+    """
+    tf = timeframe_ms(timeframe)
+    now = int(time.time() * 1000)
+    since = _to_ms(since)
+    until = min(_to_ms(until) or now, now - tf + 1)  # bougies clôturées uniquement
+    first = archive.first_timestamp(symbol, timeframe)
+    last = archive.last_timestamp(symbol, timeframe)
+    ranges = []
+    if first is None:
+        ranges.append((since, until, False))
+    else:
+        if since < first:
+            ranges.append((since, first, True))
+        ranges.append((max(since, last + tf), until, False))
+
+    total = 0
+    for start, stop, prepend in ranges:
+        cursor, pending = start, []
+        while cursor < stop:
+            rows = await with_rate_limit_retry(exchange.fetch_ohlcv, symbol, timeframe, since=cursor, limit=page)
+            kept = [r for r in rows or [] if cursor <= r[0] < stop]
+            if not kept:
+                break
+            if prepend:
+                pending.extend(kept)  # écrit en une fois : une seule réécriture
+            else:
+                total += archive.write(symbol, timeframe, kept)
+            cursor = int(kept[-1][0]) + tf
+            if len(rows) < page:
+                break
+        if pending:
+            total += archive.write(symbol, timeframe, pending)
+    return total
+
+async def _main(argv: List[str]):
+    from config import load_config, create_exchange
+    parser = argparse.ArgumentParser(description="Téléchargement incrémental de l'archive de bougies")
+    parser.add_argument("--symbols", nargs="+", required=True)
+    parser.add_argument("--timeframe", default=None)
+    parser.add_argument("--since", required=True, help="date de début (ex: 2023-01-01)")
+    parser.add_argument("--until", default=None)
+    args = parser.parse_args(argv)
+    cfg = load_config()
+    archive = CandleArchive(cfg.get("archive", {}).get("root", "data/candles"))
+    exchange = await create_exchange(cfg)
+    try:
+        for symbol in args.symbols:
+            added = await download(exchange, archive, symbol, args.timeframe or cfg["bot"]["timeframe"],
+                                   args.since, args.until)
+            print(f"{symbol}: +{added} bougies")
+    finally:
+        await exchange.close()
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
@@ -1,34 +1,173 @@
-import backtrader as bt
-from utils import load_config
-
-class Strategy(bt.Strategy):
-    def __init__(self):
-        cfg = load_config()
-        self.cfg = cfg
-        self.rsi = bt.indicators.RSI(self.data.close, period=cfg['indicators']['rsi_window'])
-        self.sma_short = bt.indicators.SMA(self.data.close, period=cfg['indicators']['sma_short_window'])
-        self.sma_long = bt.indicators.SMA(self.data.close, period=cfg['indicators']['sma_long_window'])
-
-    def next(self):
-        if not self.position:
-            if self.rsi < self.cfg['indicators']['rsi_buy'] and self.sma_short > self.sma_long:
-                size = self.broker.getcash() * self.cfg['position_size_pct'] / self.data.close[0]
-                self.buy(size=size)
-        else:
-            change = (self.data.close[0] / self.position.price) - 1
-            if change >= self.cfg['take_profit_pct'] or change <= -self.cfg['trailing_stop_pct']:
-                self.close()
-
-if __name__=='__main__':
-    cerebro = bt.Cerebro()
-    cfg = load_config()
-    data = bt.feeds.GenericCSVData(
-        dataname='historical.csv',
-        dtformat='%Y-%m-%d %H:%M:%S',
-        datetime=0, open=1, high=2, low=3, close=4, volume=5,
-        openinterest=-1
-    )
-    cerebro.adddata(data)
-    cerebro.addstrategy(Strategy)
-    cerebro.run()
-    cerebro.plot()
+# src/backtest.py
+"""Backtest vectoriel de la stratégie RSI/SMA.
+
+Mêmes règles d'exécution que l'ancienne stratégie backtrader : signal évalué
+à la clôture d'une bougie, ordre au marché exécuté à l'ouverture suivante,
+sortie take-profit par rapport au prix d'entrée, ou stop suiveur à
+`trailing_stop_pct` sous le plus haut des clôtures depuis l'entrée (comme
+TriggerIndex en réel ; au pire le prix d'entrée). Les indicateurs (`ta`,
+identiques au bot) et les signaux (RSISMAStrategy.evaluate_batch) sont calculés
+en une passe ; seule la boucle sur les trades reste en Python.
+
+Usage: python src/backtest.py [historical.csv | BTC/USDT [début [fin]]]
+"""
+import sys
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from guards import SymbolInfo, compile_filters, prepare_order
+from indicators import rsi_series, sma_series
+from strategies.rsi_sma import RSISMAStrategy
+
+class BacktestResult:
+    """Trades, courbe d'equity (une valeur par bougie) et statistiques"""
+
+    def __init__(self, trades: pd.DataFrame, equity: pd.Series, stats: Dict[str, float]):
+        self.trades = trades
+        self.equity = equity
+        self.stats = stats
+
+    def __repr__(self) -> str:
+        return f"BacktestResult({len(self.trades)} trades, {self.stats})"
+
+def load_ohlcv_csv(path: str) -> pd.DataFrame:
+    """CSV datetime,open,high,low,close,volume (format de historical.csv)"""
+    df = pd.read_csv(path, header=None, names=['datetime', 'open', 'high', 'low', 'close', 'volume'])
+    if not np.issubdtype(df['open'].dtype, np.number):
+        df = df.iloc[1:]  # ligne d'en-tête
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    return df.set_index('datetime').astype(float)
+
+def load_data(source: str, cfg: Dict[str, Any], start=None, end=None) -> pd.DataFrame:
+    """Fichier CSV, ou symbole lu dans l'archive de bougies (timeframe de la config)"""
+    if source.endswith('.csv'):
+        return load_ohlcv_csv(source)
+    from archive import CandleArchive
+    archive = CandleArchive(cfg.get('archive', {}).get('root', 'data/candles'))
+    return archive.to_frame(source, cfg['bot']['timeframe'], start, end)
+
+def _stats(trades: pd.DataFrame, equity: np.ndarray, initial_cash: float, fees: float) -> Dict[str, float]:
+    closed = trades[trades['reason'] != 'OPEN']
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    returns = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.array([])
+    return {
+        'final_equity': float(equity[-1]) if len(equity) else initial_cash,
+        'total_return': float(equity[-1] / initial_cash - 1) if len(equity) else 0.0,
+        'trades': int(len(closed)),
+        'win_rate': float((closed['pnl'] > 0).mean()) if len(closed) else 0.0,
+        'max_drawdown': float(((peak - equity) / peak).max()) if len(equity) else 0.0,
+        'sharpe_per_bar': float(returns.mean() / returns.std()) if len(returns) and returns.std() > 0 else 0.0,
+        'fees_paid': float(fees),
+    }
+
+def run_backtest(df: pd.DataFrame, cfg: Dict[str, Any], symbol_info: Optional[SymbolInfo] = None,
+                 fee_pct: Optional[float] = None, initial_cash: Optional[float] = None,
+                 indicators: Optional[Dict[str, np.ndarray]] = None) -> BacktestResult:
+    """Backtest d'un symbole sur un DataFrame OHLCV (colonnes open/close au minimum).
+
+    `cfg` est la configuration complète (sections strategy, bot, backtest) ;
+    `symbol_info` (exchangeInfo ou SymbolFilters) active l'arrondi prepare_order
+    et le rejet MIN_NOTIONAL comme en réel.
+    """
+    return backtest_arrays(df['open'].to_numpy(dtype=np.float64), df['close'].to_numpy(dtype=np.float64),
+                           df.index, cfg, symbol_info, fee_pct, initial_cash, indicators)
+
+def strategy_indicators(closes: np.ndarray, strat_cfg: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    close = pd.Series(closes)
+    return {
+        'SMA_short': sma_series(close, strat_cfg['sma_short_window']),
+        'SMA_long': sma_series(close, strat_cfg['sma_long_window']),
+        'RSI': rsi_series(close, strat_cfg['rsi_window']),
+    }
+
+def backtest_arrays(opens: np.ndarray, closes: np.ndarray, index, cfg: Dict[str, Any],
+                    symbol_info: Optional[SymbolInfo] = None, fee_pct: Optional[float] = None,
+                    initial_cash: Optional[float] = None,
+                    indicators: Optional[Dict[str, np.ndarray]] = None) -> BacktestResult:
+    """Coeur de run_backtest sur des tableaux (évite toute copie, ex: mémoire partagée).
+
+    `indicators` (SMA_short, SMA_long, RSI) permet de réutiliser des séries déjà calculées.
+    """
+    strat_cfg = cfg['strategy']
+    bt_cfg = cfg.get('backtest', {})
+    fee = float(bt_cfg.get('fee_pct', 0.001) if fee_pct is None else fee_pct)
+    cash = float(bt_cfg.get('initial_cash', 10000.0) if initial_cash is None else initial_cash)
+    initial = cash
+    size_pct = float(cfg['bot'].get('position_size_pct', 0.02))
+    tp = float(strat_cfg.get('take_profit_pct', 0.05))
+    sl = float(strat_cfg.get('trailing_stop_pct', 0.02))
+    filters = compile_filters(symbol_info) if symbol_info is not None else None
+
+    n = len(closes)
+    ind = indicators if indicators is not None else strategy_indicators(closes, strat_cfg)
+    actions, _ = RSISMAStrategy(strat_cfg).evaluate_batch(ind['RSI'], ind['SMA_short'], ind['SMA_long'])
+    buy_idx = np.flatnonzero(actions == 'BUY')
+
+    cash_delta = np.zeros(n)
+    qty_delta = np.zeros(n)
+    trades: List[Dict[str, Any]] = []
+    fees = 0.0
+    i = 0  # première bougie où un signal peut être pris (pas de position)
+    while True:
+        k = int(np.searchsorted(buy_idx, i))
+        if k == len(buy_idx) or buy_idx[k] + 1 >= n:
+            break
+        sig = int(buy_idx[k])
+        qty = cash * size_pct / closes[sig]
+        if filters is not None:
+            try:
+                _, qty = prepare_order(filters, 'BUY', closes[sig], closes[sig], qty)
+            except ValueError:
+                i = sig + 1
+                continue
+        fill = sig + 1
+        entry = opens[fill]
+        entry_fee = qty * entry * fee
+        cash -= qty * entry + entry_fee
+        cash_delta[fill] -= qty * entry + entry_fee
+        qty_delta[fill] += qty
+        fees += entry_fee
+
+        held = closes[fill:]
+        change = held / entry - 1
+        # Stop suiveur : high-water mark des clôtures, initialisé au prix d'entrée
+        peak = np.maximum.accumulate(np.maximum(held, entry))
+        hit = np.flatnonzero((change >= tp) | (held <= peak * (1 - sl)))
+        exit_fill = fill + int(hit[0]) + 1 if len(hit) else n
+        trade = {'entry_time': index[fill], 'entry_price': entry, 'qty': qty}
+        if exit_fill >= n:
+            # Position encore ouverte en fin de données : valorisée à la dernière clôture
+            trade.update(exit_time=index[-1], exit_price=closes[-1], reason='OPEN',
+                         pnl=qty * (closes[-1] - entry) - entry_fee)
+            trades.append(trade)
+            break
+        exit_price = opens[exit_fill]
+        exit_fee = qty * exit_price * fee
+        cash += qty * exit_price - exit_fee
+        cash_delta[exit_fill] += qty * exit_price - exit_fee
+        qty_delta[exit_fill] -= qty
+        fees += exit_fee
+        trade.update(exit_time=index[exit_fill], exit_price=exit_price,
+                     reason='TAKE_PROFIT' if change[hit[0]] >= tp else 'STOP_LOSS',
+                     pnl=qty * (exit_price - entry) - entry_fee - exit_fee)
+        trades.append(trade)
+        i = exit_fill
+
+    columns = ['entry_time', 'exit_time', 'entry_price', 'exit_price', 'qty', 'pnl', 'reason']
+    trades_df = pd.DataFrame(trades, columns=columns)
+    trades_df['return_pct'] = trades_df['exit_price'] / trades_df['entry_price'] - 1
+    equity = initial + np.cumsum(cash_delta) + np.cumsum(qty_delta) * closes
+    return BacktestResult(trades_df, pd.Series(equity, index=index, name='equity'),
+                          _stats(trades_df, equity, initial, fees))
+
+if __name__ == '__main__':
+    from config import load_config
+    config = load_config()
+    args = sys.argv[1:]
+    data = load_data(args[0] if args else config.get('backtest', {}).get('data', 'historical.csv'), config, *args[1:3])
+    result = run_backtest(data, config)
+    print(result.trades.to_string())
+    for key, value in result.stats.items():
+        print(f"{key}: {value}")
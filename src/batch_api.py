@@ -1,12 +1,13 @@
 # src/batch_api.py
 
 import asyncio
-from src.utils import safe_api_call
+from utils import with_rate_limit_retry
 
 async def fetch_multiple_ohlcv(exchange, symbols, timeframe, limit):
+    # Le budget de poids est géré par l'ordonnanceur central (ratelimit.WeightScheduler)
     tasks = [
-        safe_api_call(exchange.fetch_ohlcv, symbol, timeframe, limit)
-        for symbol in symbols[:10]  # Batch de 10 max
+        with_rate_limit_retry(exchange.fetch_ohlcv, symbol, timeframe, limit=limit)
+        for symbol in symbols
     ]
     results = await asyncio.gather(*tasks, return_exceptions=True)
     return {symbol: result for symbol, result in zip(symbols, results) 
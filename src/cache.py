@@ -2,10 +2,15 @@ import time
 from typing import Dict, Optional
 import pandas as pd
 
+from candles import CandleStore
+
 class OHLCVCache:
-    def __init__(self, ttl_seconds=300):  # 5 min TTL
+    def __init__(self, ttl_seconds=300, capacity=200):  # 5 min TTL
         self.cache: Dict[str, tuple] = {}
         self.ttl = ttl_seconds
+        # Bougies brutes conservées après expiration du TTL pour les mises à jour incrémentales
+        self.store = CandleStore(capacity)
+        self.refreshed: Dict[str, float] = {}
     
     def get(self, symbol: str, timeframe: str) -> Optional[pd.DataFrame]:
         key = f"{symbol}_{timeframe}"
@@ -18,3 +23,11 @@ class OHLCVCache:
     def set(self, symbol: str, timeframe: str, data: pd.DataFrame):
         key = f"{symbol}_{timeframe}"
         self.cache[key] = (data, time.time())
+
+    def is_fresh(self, symbol: str, timeframe: str) -> bool:
+        """Vrai si les bougies brutes ont été rafraîchies depuis moins de ttl secondes"""
+        ts = self.refreshed.get(f"{symbol}_{timeframe}")
+        return ts is not None and time.time() - ts < self.ttl
+
+    def touch(self, symbol: str, timeframe: str):
+        self.refreshed[f"{symbol}_{timeframe}"] = time.time()
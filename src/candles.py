@@ -0,0 +1,193 @@
+# src/candles.py
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple, List
+
+import numpy as np
+import pandas as pd
+from ccxt.base.exchange import Exchange
+
+from utils import with_rate_limit_retry
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+_COL = {name: i for i, name in enumerate(OHLCV_COLUMNS)}
+# Horloge du marché (epoch, secondes) : time.time en live, horloge de replay (src/replay.py) sinon
+_CLOCK: Callable[[], float] = time.time
+_SPEED = 1.0
+
+def configure_clock(clock: Optional[Callable[[], float]] = None, speed: float = 1.0):
+    """Installe l'horloge du marché ; sans argument, retour au temps réel"""
+    global _CLOCK, _SPEED
+    _CLOCK = clock or time.time
+    _SPEED = float(speed)
+
+def market_time() -> float:
+    """Instant courant du marché : décide quelles bougies sont clôturées"""
+    return _CLOCK()
+
+def market_speed() -> float:
+    """Secondes de marché écoulées par seconde réelle (1 hors replay accéléré)"""
+    return _SPEED
+
+
+def timeframe_ms(timeframe: str) -> int:
+    """Durée d'une bougie en millisecondes ('1m', '1h', ...)"""
+    return int(Exchange.parse_timeframe(timeframe) * 1000)
+
+
+class CandleBuffer:
+    """Ring buffer OHLCV préalloué pour un couple (symbole, timeframe).
+
+    Chaque bougie est écrite deux fois (slot i et i + capacity) : la fenêtre
+    courante est donc toujours un slice contigu et view() ne copie rien.
+    """
+
+    __slots__ = ('capacity', '_ts', '_data', '_start', '_size', 'version', 'live')
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity doit être > 0")
+        self.capacity = int(capacity)
+        self._ts = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._data = np.zeros((len(OHLCV_COLUMNS), 2 * self.capacity), dtype=np.float64)
+        self._start = 0
+        self._size = 0
+        self.version = 0  # incrémenté à chaque modification
+        self.live = False  # alimenté en continu par un flux WebSocket
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        """Open time (ms) de la dernière bougie stockée, None si vide"""
+        if self._size == 0:
+            return None
+        return int(self._ts[self._start + self._size - 1])
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+        self.version += 1
+
+    def _write(self, idx, ts, values):
+        cap = self.capacity
+        self._ts[idx] = ts
+        self._ts[idx + cap] = ts
+        self._data[:, idx] = values
+        self._data[:, idx + cap] = values
+
+    def merge(self, rows: Sequence[Sequence[float]]) -> int:
+        """Fusionne des bougies ccxt [ts, o, h, l, c, v] triées par open time.
+
+        La bougie de même open time que la dernière stockée (bougie en cours)
+        est remplacée, les plus récentes sont ajoutées, les plus anciennes
+        ignorées. Retourne le nombre de bougies ajoutées.
+        """
+        if rows is None or len(rows) == 0:
+            return 0
+        arr = np.asarray(rows, dtype=np.float64).reshape(-1, 1 + len(OHLCV_COLUMNS))
+        ts = arr[:, 0].astype(np.int64)
+        values = arr[:, 1:].T
+        last = self.last_open_time
+        changed = False
+        if last is not None:
+            keep = ts >= last
+            ts, values = ts[keep], values[:, keep]
+            if len(ts) and ts[0] == last:
+                self._write((self._start + self._size - 1) % self.capacity, ts[0], values[:, 0])
+                ts, values = ts[1:], values[:, 1:]
+                changed = True
+        added = len(ts)
+        if added:
+            cap = self.capacity
+            if added > cap:
+                ts, values = ts[-cap:], values[:, -cap:]
+            n = len(ts)
+            idx = (self._start + self._size + np.arange(n)) % cap
+            self._write(idx, ts, values)
+            overflow = max(0, self._size + n - cap)
+            self._start = (self._start + overflow) % cap
+            self._size = min(cap, self._size + n)
+            changed = True
+        if changed:
+            self.version += 1
+        return added
+
+    def timestamps(self) -> np.ndarray:
+        """Open times (ms) en ordre chronologique, vue sans copie"""
+        return self._ts[self._start:self._start + self._size]
+
+    def view(self) -> np.ndarray:
+        """Matrice (5, n) open/high/low/close/volume, vue sans copie"""
+        return self._data[:, self._start:self._start + self._size]
+
+    def column(self, name: str) -> np.ndarray:
+        return self._data[_COL[name], self._start:self._start + self._size]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.column('close')
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame au format historique de fetch_ohlcv_cached (copie)"""
+        df = pd.DataFrame(self.view().T.copy(), columns=list(OHLCV_COLUMNS))
+        df.insert(0, 'timestamp', pd.to_datetime(self.timestamps(), unit='ms'))
+        return df
+
+
+class CandleStore:
+    """Ensemble des ring buffers OHLCV indexés par (symbole, timeframe)"""
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = int(capacity)
+        self._buffers: Dict[Tuple[str, str], CandleBuffer] = {}
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._buffers
+
+    def keys(self) -> List[Tuple[str, str]]:
+        return list(self._buffers)
+
+    def get(self, symbol: str, timeframe: str) -> Optional[CandleBuffer]:
+        return self._buffers.get((symbol, timeframe))
+
+    def buffer(self, symbol: str, timeframe: str) -> CandleBuffer:
+        """Retourne le buffer du couple, créé vide si besoin"""
+        key = (symbol, timeframe)
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = self._buffers[key] = CandleBuffer(self.capacity)
+        return buf
+
+    def merge(self, symbol: str, timeframe: str, rows) -> int:
+        return self.buffer(symbol, timeframe).merge(rows)
+
+
+async def refresh_buffer(exchange, buf: CandleBuffer, symbol: str, timeframe: str, limit: int,
+                         archive=None) -> int:
+    """Télécharge uniquement les bougies postérieures à la dernière stockée.
+
+    La bougie en cours est re-téléchargée et remplacée. Si le trou depuis la
+    dernière bougie dépasse `limit`, le buffer est rechargé entièrement.
+    Avec une CandleArchive, un buffer vide est d'abord amorcé depuis le disque
+    et les bougies clôturées téléchargées y sont ajoutées.
+    """
+    tf = timeframe_ms(timeframe)
+    now = market_time() * 1000
+    if archive is not None and len(buf) == 0:
+        buf.merge(archive.tail(symbol, timeframe, limit))
+    since = buf.last_open_time
+    if since is not None and now - since >= limit * tf:
+        buf.clear()
+        since = None
+    data = await with_rate_limit_retry(exchange.fetch_ohlcv, symbol, timeframe, since=since, limit=limit)
+    if archive is not None and data:
+        last = archive.last_timestamp(symbol, timeframe)
+        closed = [r for r in data if r[0] + tf <= now]
+        # Pas d'ajout qui laisserait un trou dans l'archive (complété par archive.download)
+        if closed and (last is None or closed[0][0] <= last + tf):
+            archive.write(symbol, timeframe, closed)
+    return buf.merge(data)
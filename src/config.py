@@ -0,0 +1,30 @@
+# src/config.py
+import os
+import logging
+from typing import Dict, Any
+
+import yaml
+import ccxt.async_support as ccxt
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = os.environ.get("BOT_CONFIG", "config.yml")
+
+def load_config() -> Dict[str, Any]:
+    """Charge la configuration depuis config.yml"""
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+async def create_exchange(cfg: Dict[str, Any]):
+    """Initialise l'exchange avec gestion testnet"""
+    ex_name = cfg["bot"].get("exchange", "binance")
+    klass = getattr(ccxt, ex_name)
+    exchange = klass({
+        "apiKey": os.environ.get("API_KEY", ""),
+        "secret": os.environ.get("API_SECRET", ""),
+        "enableRateLimit": True,
+    })
+    if cfg["bot"].get("testnet") or os.environ.get("TESTNET") == "1":
+        exchange.set_sandbox_mode(True)
+        logger.info("Mode testnet activé")
+    return exchange
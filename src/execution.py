@@ -0,0 +1,104 @@
+# src/execution.py
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import order_queue_depth, record_signal_latency
+
+logger = logging.getLogger(__name__)
+
+class _Job:
+    __slots__ = ("symbol", "action", "fn", "args", "created", "future")
+
+    def __init__(self, symbol: str, action: str, fn: Callable[..., Awaitable[Any]], args: tuple,
+                 created: float, future: asyncio.Future):
+        self.symbol = symbol
+        self.action = action
+        self.fn = fn
+        self.args = args
+        self.created = created
+        self.future = future
+
+class OrderPipeline:
+    """Pipeline d'exécution des ordres alimenté par l'étage de signal.
+
+    Une file servie par `concurrency` workers ; un verrou par symbole empêche
+    un BUY et un SELL (TP/SL) du même symbole de se croiser, et un ordre
+    déjà en file pour (symbole, action) n'est pas dupliqué. Les envois sont
+    espacés pour rester sous `orders_per_second`. Le délai entre la création
+    du signal et l'acquittement est publié dans bot_signal_to_ack_seconds.
+    """
+
+    def __init__(self, concurrency: int = 4, orders_per_second: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.concurrency = max(1, int(concurrency))
+        self.interval = 1.0 / orders_per_second if orders_per_second > 0 else 0.0
+        self._clock = clock
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._pending: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._workers: List[asyncio.Task] = []
+        self._next_slot = 0.0
+
+    def start(self):
+        while len(self._workers) < self.concurrency:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def join(self):
+        """Attend que tous les ordres soumis soient traités"""
+        await self.queue.join()
+
+    def pending(self, symbol: str, action: Optional[str] = None) -> bool:
+        if action is not None:
+            return (symbol, action.upper()) in self._pending
+        return any(key[0] == symbol for key in self._pending)
+
+    def submit(self, symbol: str, action: str, fn: Callable[..., Awaitable[Any]], *args,
+               created: Optional[float] = None) -> asyncio.Future:
+        """Met un ordre en file ; retourne le futur du résultat de `fn(*args)`"""
+        key = (symbol, action.upper())
+        existing = self._pending.get(key)
+        if existing is not None:
+            return existing
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        self.queue.put_nowait(_Job(symbol, key[1], fn, args, created or self._clock(), future))
+        order_queue_depth.set(self.queue.qsize())
+        return future
+
+    async def _throttle(self):
+        now = self._clock()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _run(self, job: _Job):
+        lock = self._locks.setdefault(job.symbol, asyncio.Lock())
+        async with lock:
+            await self._throttle()
+            try:
+                result = await job.fn(*job.args)
+            except Exception as e:
+                logger.error(f"Erreur exécution {job.action} {job.symbol}: {e}")
+                result = None
+            record_signal_latency(job.action.lower(), self._clock() - job.created)
+        if not job.future.done():
+            job.future.set_result(result)
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            order_queue_depth.set(self.queue.qsize())
+            try:
+                await self._run(job)
+            finally:
+                self._pending.pop((job.symbol, job.action), None)
+                self.queue.task_done()
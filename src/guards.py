@@ -1,75 +1,251 @@
 # src/guards.py
 import math
-from typing import Tuple, Dict, Any
+from decimal import Decimal
+from typing import Tuple, Dict, Any, Optional, Union, Sequence
 
-def _round_down_to_step(value: float, step: float) -> float:
-    if step <= 0:
-        return value
-    return math.floor(value / step) * step
+import numpy as np
 
-def normalize_price_qty(symbol_info: Dict[str, Any], side: str, price: float, qty: float) -> Tuple[float, float]:
+# Tolérance (en fraction de tick/step) absorbant l'erreur de représentation binaire,
+# ex: 0.29 * 100 = 28.999999999999996 doit donner 29 ticks et non 28
+_UNIT_EPS = 1e-9
+
+def _parse_step(raw: Any) -> Tuple[int, int]:
+    """'0.01000000' -> (1, 100) : le pas vaut units / scale, exactement"""
+    d = Decimal(str(raw or "0")).normalize()
+    if d <= 0:
+        return 0, 1
+    exp = d.as_tuple().exponent
+    if exp >= 0:
+        return int(d), 1
+    scale = 10 ** (-exp)
+    return int(d * scale), scale
+
+def _floor_units(value: float, units: int, scale: int) -> float:
+    """Arrondi inférieur au multiple de units/scale, calculé en entiers"""
+    n = math.floor(value * scale / units + _UNIT_EPS)
+    return n * units / scale
+
+class SymbolFilters:
+    """Filtres d'un symbole pré-compilés depuis exchangeInfo (valeurs déjà converties)"""
+
+    __slots__ = (
+        "symbol",
+        "has_price_filter", "min_price", "max_price", "tick_units", "tick_scale",
+        "has_lot_size", "min_qty", "max_qty", "step_units", "step_scale",
+        "min_notional",
+        "has_percent_price", "pp_up", "pp_down",
+        "has_percent_price_by_side", "ask_up", "ask_down", "bid_up", "bid_down",
+    )
+
+    def __init__(self, symbol_info: Dict[str, Any]):
+        filters = {f["filterType"]: f for f in symbol_info.get("filters", [])}
+        self.symbol = symbol_info.get("symbol")
+
+        pf = filters.get("PRICE_FILTER")
+        self.has_price_filter = pf is not None
+        pf = pf or {}
+        self.min_price = float(pf.get("minPrice", "0"))
+        self.max_price = float(pf.get("maxPrice", "1000000000"))
+        self.tick_units, self.tick_scale = _parse_step(pf.get("tickSize", "0"))
+
+        ls = filters.get("LOT_SIZE") or filters.get("MARKET_LOT_SIZE")
+        self.has_lot_size = ls is not None
+        ls = ls or {}
+        self.min_qty = float(ls.get("minQty", "0"))
+        self.max_qty = float(ls.get("maxQty", "1000000000"))
+        self.step_units, self.step_scale = _parse_step(ls.get("stepSize", "0"))
+
+        mn = filters.get("MIN_NOTIONAL") or filters.get("NOTIONAL")
+        self.min_notional = float(mn.get("minNotional") or mn.get("notional") or "0") if mn else 0.0
+
+        pp = filters.get("PERCENT_PRICE")
+        self.has_percent_price = pp is not None
+        pp = pp or {}
+        self.pp_up = float(pp.get("multiplierUp", "999"))
+        self.pp_down = float(pp.get("multiplierDown", "0"))
+
+        pps = filters.get("PERCENT_PRICE_BY_SIDE")
+        self.has_percent_price_by_side = pps is not None
+        pps = pps or {}
+        self.ask_up = float(pps.get("askMultiplierUp", "999"))
+        self.ask_down = float(pps.get("askMultiplierDown", "0"))
+        self.bid_up = float(pps.get("bidMultiplierUp", "999"))
+        self.bid_down = float(pps.get("bidMultiplierDown", "0"))
+
+    @property
+    def tick_size(self) -> float:
+        return self.tick_units / self.tick_scale
+
+    @property
+    def step_size(self) -> float:
+        return self.step_units / self.step_scale
+
+    def __repr__(self) -> str:
+        return f"SymbolFilters({self.symbol!r}, tick={self.tick_size}, step={self.step_size})"
+
+SymbolInfo = Union[SymbolFilters, Dict[str, Any]]
+
+def compile_filters(symbol_info: SymbolInfo) -> SymbolFilters:
+    """Accepte un dict exchangeInfo brut ou des filtres déjà compilés"""
+    if isinstance(symbol_info, SymbolFilters):
+        return symbol_info
+    return SymbolFilters(symbol_info)
+
+# Codes de rejet retournés par prepare_orders (un par ligne)
+REJECT_NONE = 0
+REJECT_UNKNOWN_SYMBOL = 1
+REJECT_PERCENT_PRICE = 2
+REJECT_PERCENT_PRICE_BY_SIDE = 3
+REJECT_MIN_NOTIONAL = 4
+REJECT_REASONS = {
+    REJECT_NONE: None,
+    REJECT_UNKNOWN_SYMBOL: "UNKNOWN_SYMBOL",
+    REJECT_PERCENT_PRICE: "PERCENT_PRICE",
+    REJECT_PERCENT_PRICE_BY_SIDE: "PERCENT_PRICE_BY_SIDE",
+    REJECT_MIN_NOTIONAL: "MIN_NOTIONAL",
+}
+
+class FilterTable:
+    """Filtres compilés de tout exchangeInfo, indexés par symbole (O(1))"""
+
+    def __init__(self, filters: Dict[str, SymbolFilters]):
+        self._filters = filters
+        self._rows = {sym: i for i, sym in enumerate(filters)}
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+
+    @classmethod
+    def from_exchange_info(cls, info: Dict[str, Any]) -> "FilterTable":
+        return cls({s["symbol"]: SymbolFilters(s) for s in info.get("symbols", []) if s.get("symbol")})
+
+    def __len__(self) -> int:
+        return len(self._filters)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.replace("/", "") in self._filters
+
+    def get(self, symbol: str) -> Optional[SymbolFilters]:
+        """Accepte 'BTC/USDT' ou 'BTCUSDT'"""
+        return self._filters.get(symbol.replace("/", ""))
+
+    def rows(self, symbols: Sequence[str]) -> np.ndarray:
+        """Indices de ligne des symboles dans columns(), -1 si inconnu"""
+        get = self._rows.get
+        return np.fromiter((get(s.replace("/", ""), -1) for s in symbols), dtype=np.int64, count=len(symbols))
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Filtres en colonnes NumPy (une ligne par symbole), construites une seule fois"""
+        if self._columns is None:
+            filters = list(self._filters.values())
+            self._columns = {
+                name: np.array([getattr(f, name) for f in filters],
+                               dtype=bool if name.startswith("has_") else np.float64)
+                for name in SymbolFilters.__slots__ if name != "symbol"
+            }
+        return self._columns
+
+def normalize_price_qty(symbol_info: SymbolInfo, side: str, price: float, qty: float) -> Tuple[float, float]:
     """Applique PRICE_FILTER et LOT_SIZE (min/max + arrondi tick/step)."""
-    filters = {f["filterType"]: f for f in symbol_info.get("filters", [])}
-
-    pf = filters.get("PRICE_FILTER")
-    if pf:
-        min_price = float(pf.get("minPrice", "0"))
-        max_price = float(pf.get("maxPrice", "1000000000"))
-        tick = float(pf.get("tickSize", "0"))
-        price = max(min_price, min(max_price, price))
-        if tick > 0:
-            price = _round_down_to_step(price, tick)
-
-    ls = filters.get("LOT_SIZE") or filters.get("MARKET_LOT_SIZE")
-    if ls:
-        min_qty = float(ls.get("minQty", "0"))
-        max_qty = float(ls.get("maxQty", "1000000000"))
-        step = float(ls.get("stepSize", "0"))
-        qty = max(min_qty, min(max_qty, qty))
-        if step > 0:
-            qty = _round_down_to_step(qty, step)
+    f = compile_filters(symbol_info)
+
+    if f.has_price_filter:
+        price = max(f.min_price, min(f.max_price, price))
+        if f.tick_units > 0:
+            price = _floor_units(price, f.tick_units, f.tick_scale)
+
+    if f.has_lot_size:
+        qty = max(f.min_qty, min(f.max_qty, qty))
+        if f.step_units > 0:
+            qty = _floor_units(qty, f.step_units, f.step_scale)
 
     return price, qty
 
-def check_min_notional(symbol_info: Dict[str, Any], quote_price: float, qty: float) -> None:
-    filters = {f["filterType"]: f for f in symbol_info.get("filters", [])}
-    mn = filters.get("MIN_NOTIONAL") or filters.get("NOTIONAL")
-    if mn:
-        min_notional = float(mn.get("minNotional") or mn.get("notional") or "0")
-        if quote_price * qty < min_notional:
-            raise ValueError("Filter failure: MIN_NOTIONAL")
+def check_min_notional(symbol_info: SymbolInfo, quote_price: float, qty: float) -> None:
+    f = compile_filters(symbol_info)
+    if quote_price * qty < f.min_notional:
+        raise ValueError("Filter failure: MIN_NOTIONAL")
 
-def check_percent_price_filters(symbol_info: Dict[str, Any], side: str, last_price: float, order_price: float) -> None:
+def check_percent_price_filters(symbol_info: SymbolInfo, side: str, last_price: float, order_price: float) -> None:
     """Valide PERCENT_PRICE et PERCENT_PRICE_BY_SIDE si présents."""
-    filters = {f["filterType"]: f for f in symbol_info.get("filters", [])}
+    f = compile_filters(symbol_info)
 
-    pp = filters.get("PERCENT_PRICE")
-    if pp:
-        up = float(pp.get("multiplierUp", "999"))
-        dn = float(pp.get("multiplierDown", "0"))
-        if not (last_price * dn <= order_price <= last_price * up):
+    if f.has_percent_price:
+        if not (last_price * f.pp_down <= order_price <= last_price * f.pp_up):
             raise ValueError("Filter failure: PERCENT_PRICE")
 
-    pps = filters.get("PERCENT_PRICE_BY_SIDE")
-    if pps:
+    if f.has_percent_price_by_side:
         if side.upper() == "BUY":
-            up = float(pps.get("askMultiplierUp", "999"))
-            dn = float(pps.get("askMultiplierDown", "0"))
+            up, dn = f.ask_up, f.ask_down
         else:
-            up = float(pps.get("bidMultiplierUp", "999"))
-            dn = float(pps.get("bidMultiplierDown", "0"))
+            up, dn = f.bid_up, f.bid_down
         if not (last_price * dn <= order_price <= last_price * up):
             raise ValueError("Filter failure: PERCENT_PRICE_BY_SIDE")
 
 def prepare_order(
-    symbol_info: Dict[str, Any],
+    symbol_info: SymbolInfo,
     side: str,
     last_price: float,
     desired_price: float,
     desired_qty: float,
 ) -> Tuple[float, float]:
     """Pipeline complet: normalisation + vérifs pour réduire les erreurs 1013."""
-    price, qty = normalize_price_qty(symbol_info, side, desired_price, desired_qty)
-    check_percent_price_filters(symbol_info, side, last_price, price)
-    check_min_notional(symbol_info, last_price, qty)
+    f = compile_filters(symbol_info)
+    price, qty = normalize_price_qty(f, side, desired_price, desired_qty)
+    check_percent_price_filters(f, side, last_price, price)
+    check_min_notional(f, last_price, qty)
     return price, qty
+
+def _floor_units_array(values: np.ndarray, units: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Version vectorielle de _floor_units (mêmes opérations, mêmes résultats)"""
+    safe = np.where(units > 0, units, 1.0)
+    n = np.floor(values * scale / safe + _UNIT_EPS)
+    return np.where(units > 0, n * units / scale, values)
+
+def prepare_orders(
+    table: FilterTable,
+    symbols: Sequence[str],
+    sides: Sequence[str],
+    last_prices: Sequence[float],
+    desired_prices: Sequence[float],
+    desired_qtys: Sequence[float],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Version batch de prepare_order : une passe NumPy pour N ordres.
+
+    `sides` contient 'BUY'/'SELL' ou un tableau booléen (True = achat).
+    Retourne (prix, quantités, codes REJECT_*) au lieu de lever ValueError ;
+    les lignes rejetées gardent leurs valeurs normalisées pour diagnostic.
+    """
+    rows = table.rows(symbols)
+    known = rows >= 0
+    c = {name: col[np.where(known, rows, 0)] for name, col in table.columns().items()} if len(table) else None
+    last = np.asarray(last_prices, dtype=np.float64)
+    price = np.asarray(desired_prices, dtype=np.float64).copy()
+    qty = np.asarray(desired_qtys, dtype=np.float64).copy()
+    reasons = np.where(known, REJECT_NONE, REJECT_UNKNOWN_SYMBOL).astype(np.int8)
+    if c is None:
+        return price, qty, reasons
+    if isinstance(sides, np.ndarray) and sides.dtype == bool:
+        is_buy = sides
+    else:
+        is_buy = np.fromiter((s.upper() == "BUY" for s in sides), dtype=bool, count=len(sides))
+
+    pf = known & c["has_price_filter"]
+    clamped = np.maximum(c["min_price"], np.minimum(c["max_price"], price))
+    price = np.where(pf, _floor_units_array(clamped, c["tick_units"], c["tick_scale"]), price)
+
+    ls = known & c["has_lot_size"]
+    clamped = np.maximum(c["min_qty"], np.minimum(c["max_qty"], qty))
+    qty = np.where(ls, _floor_units_array(clamped, c["step_units"], c["step_scale"]), qty)
+
+    ok = reasons == REJECT_NONE
+    pp_fail = c["has_percent_price"] & ~((last * c["pp_down"] <= price) & (price <= last * c["pp_up"]))
+    reasons[ok & pp_fail] = REJECT_PERCENT_PRICE
+
+    ok = reasons == REJECT_NONE
+    up = np.where(is_buy, c["ask_up"], c["bid_up"])
+    dn = np.where(is_buy, c["ask_down"], c["bid_down"])
+    pps_fail = c["has_percent_price_by_side"] & ~((last * dn <= price) & (price <= last * up))
+    reasons[ok & pps_fail] = REJECT_PERCENT_PRICE_BY_SIDE
+
+    ok = reasons == REJECT_NONE
+    reasons[ok & (last * qty < c["min_notional"])] = REJECT_MIN_NOTIONAL
+    return price, qty, reasons
@@ -1,11 +1,226 @@
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
 import pandas as pd
 import ta
 
+NAN = float('nan')
+
+
+def sma_series(close: pd.Series, window: int) -> np.ndarray:
+    return ta.trend.SMAIndicator(close, window=window).sma_indicator().to_numpy()
+
+
+def rsi_series(close: pd.Series, window: int) -> np.ndarray:
+    return ta.momentum.RSIIndicator(close, window=window).rsi().to_numpy()
+
+
 def compute_indicators(df: pd.DataFrame, strat_cfg: dict) -> pd.DataFrame:
-    rsi_w = strat_cfg['rsi_window']
-    sma_s = strat_cfg['sma_short_window']
-    sma_l = strat_cfg['sma_long_window']
-    df['SMA_short'] = ta.trend.SMAIndicator(df['close'], window=sma_s).sma_indicator()
-    df['SMA_long']  = ta.trend.SMAIndicator(df['close'], window=sma_l).sma_indicator()
-    df['RSI']       = ta.momentum.RSIIndicator(df['close'], window=rsi_w).rsi()
-    return df
+    """Calcul vectoriel complet via `ta` (référence, renvoie un nouveau DataFrame)"""
+    return df.assign(
+        SMA_short=sma_series(df['close'], strat_cfg['sma_short_window']),
+        SMA_long=sma_series(df['close'], strat_cfg['sma_long_window']),
+        RSI=rsi_series(df['close'], strat_cfg['rsi_window']),
+    )
+
+
+class RollingMean:
+    """Moyenne glissante O(1) identique au bit près à pandas rolling(window).mean().
+
+    Reproduit l'algorithme de pandas : somme compensée (Kahan) avec des
+    compensations distinctes pour les ajouts et les retraits, et correction
+    des séries constantes / de signe constant.
+    """
+
+    __slots__ = ('window', '_ring', '_pos', '_count', '_state', 'value')
+
+    def __init__(self, window: int):
+        if window <= 0:
+            raise ValueError("window doit être > 0")
+        self.window = int(window)
+        self._ring = [0.0] * self.window
+        self._pos = 0
+        self._count = 0
+        # nobs, sum, compensation ajout, compensation retrait, nb négatifs, nb valeurs identiques, valeur précédente
+        self._state: Tuple = (0, 0.0, 0.0, 0.0, 0, 0, NAN)
+        self.value = NAN
+
+    def _step(self, x: float) -> Tuple[Tuple, float]:
+        nobs, total, comp_add, comp_rem, neg, same, prev = self._state
+        if self.window == 1:
+            # pandas recalcule chaque fenêtre de taille 1 depuis zéro
+            nobs, total, comp_add, comp_rem, neg, same, prev = 0, 0.0, 0.0, 0.0, 0, 0, NAN
+        elif self._count >= self.window:
+            old = self._ring[self._pos]
+            if old == old:
+                nobs -= 1
+                y = -old - comp_rem
+                t = total + y
+                comp_rem = t - total - y
+                total = t
+                if math.copysign(1.0, old) < 0:
+                    neg -= 1
+        if x == x:
+            nobs += 1
+            y = x - comp_add
+            t = total + y
+            comp_add = t - total - y
+            total = t
+            if math.copysign(1.0, x) < 0:
+                neg += 1
+            same = same + 1 if x == prev else 1
+            prev = x
+        if nobs >= self.window and nobs > 0:
+            result = total / nobs
+            if same >= nobs:
+                result = prev
+            elif neg == 0 and result < 0:
+                result = 0.0
+            elif neg == nobs and result > 0:
+                result = 0.0
+        else:
+            result = NAN
+        return (nobs, total, comp_add, comp_rem, neg, same, prev), result
+
+    def push(self, x: float) -> float:
+        """Intègre une valeur définitive et retourne la moyenne"""
+        x = float(x)
+        self._state, self.value = self._step(x)
+        self._ring[self._pos] = x
+        self._pos = (self._pos + 1) % self.window
+        self._count += 1
+        return self.value
+
+    def peek(self, x: float) -> float:
+        """Moyenne si `x` était ajoutée, sans modifier l'état"""
+        return self._step(float(x))[1]
+
+
+class WilderRSI:
+    """RSI lissé de Wilder, identique au bit près à ta.momentum.RSIIndicator"""
+
+    __slots__ = ('window', '_alpha', '_keep', '_state', 'value')
+
+    def __init__(self, window: int):
+        if window <= 0:
+            raise ValueError("window doit être > 0")
+        self.window = int(window)
+        # pandas convertit alpha en centre de masse puis recalcule alpha
+        com = (1 - 1 / self.window) / (1 / self.window)
+        self._alpha = 1.0 / (1.0 + com)
+        self._keep = 1.0 - self._alpha
+        # nobs, moyenne des hausses, moyenne des baisses, dernière clôture
+        self._state: Tuple = (0, NAN, NAN, NAN)
+        self.value = NAN
+
+    def _ewm(self, weighted: float, cur: float) -> float:
+        if weighted != weighted:
+            return cur
+        if weighted != cur:
+            weighted = (self._keep * weighted + self._alpha * cur) / (self._keep + self._alpha)
+        return weighted
+
+    def _step(self, close: float) -> Tuple[Tuple, float]:
+        nobs, up, down, prev = self._state
+        diff = close - prev
+        # ta : diff.where(diff > 0, 0.0) et -diff.where(diff < 0, 0.0), la 1ère diff (NaN) donne 0
+        up = self._ewm(up, diff if diff > 0 else 0.0)
+        down = self._ewm(down, -(diff if diff < 0 else 0.0))
+        nobs += 1
+        if nobs < self.window:
+            result = NAN
+        elif down == 0:
+            result = 100.0
+        else:
+            result = 100 - (100 / (1 + up / down))
+        return (nobs, up, down, close), result
+
+    def push(self, close: float) -> float:
+        self._state, self.value = self._step(float(close))
+        return self.value
+
+    def peek(self, close: float) -> float:
+        return self._step(float(close))[1]
+
+
+class IndicatorEngine:
+    """RSI / SMA courte / SMA longue incrémentaux pour un symbole.
+
+    Les bougies clôturées sont intégrées une seule fois (push) ; la bougie en
+    cours est évaluée sans modifier l'état (peek) et peut changer librement.
+    """
+
+    def __init__(self, strat_cfg: dict):
+        self.strat_cfg = strat_cfg
+        self._reset()
+
+    def _reset(self):
+        self.sma_short = RollingMean(self.strat_cfg['sma_short_window'])
+        self.sma_long = RollingMean(self.strat_cfg['sma_long_window'])
+        self.rsi = WilderRSI(self.strat_cfg['rsi_window'])
+        self.last_closed_ts: Optional[int] = None
+        self.values: Dict[str, float] = {'SMA_short': NAN, 'SMA_long': NAN, 'RSI': NAN}
+
+    def push(self, close: float) -> Dict[str, float]:
+        """Intègre une bougie clôturée"""
+        self.values = {
+            'SMA_short': self.sma_short.push(close),
+            'SMA_long': self.sma_long.push(close),
+            'RSI': self.rsi.push(close),
+        }
+        return self.values
+
+    def peek(self, close: float) -> Dict[str, float]:
+        """Indicateurs en incluant la bougie en cours, sans l'intégrer"""
+        return {
+            'SMA_short': self.sma_short.peek(close),
+            'SMA_long': self.sma_long.peek(close),
+            'RSI': self.rsi.peek(close),
+        }
+
+    def update(self, open_time: int, close: float, closed: bool) -> Dict[str, float]:
+        """Mise à jour depuis un flux (kline) : bougie clôturée ou en cours"""
+        if self.last_closed_ts is not None and open_time <= self.last_closed_ts:
+            return self.values
+        if closed:
+            self.last_closed_ts = int(open_time)
+            return self.push(close)
+        return self.peek(close)
+
+    def sync(self, timestamps: np.ndarray, closes: np.ndarray) -> Dict[str, float]:
+        """Mise à jour depuis un buffer de bougies dont la dernière est en cours.
+
+        Seules les bougies clôturées depuis le dernier appel sont intégrées :
+        O(1) amorti quand une bougie se clôture entre deux appels.
+        """
+        n = len(timestamps)
+        if n == 0:
+            return self.values
+        start = 0
+        if self.last_closed_ts is not None:
+            start = int(np.searchsorted(timestamps, self.last_closed_ts, side='right'))
+            if start == 0:
+                # historique plus connu du buffer (trou) : reconstruction complète
+                self._reset()
+        for i in range(start, n - 1):
+            self.push(closes[i])
+            self.last_closed_ts = int(timestamps[i])
+        if self.last_closed_ts is not None and timestamps[-1] <= self.last_closed_ts:
+            return self.values
+        return self.peek(closes[-1])
+
+
+class IndicatorBank:
+    """Moteurs d'indicateurs par (symbole, timeframe), créés à la demande"""
+
+    def __init__(self, strat_cfg: dict):
+        self.strat_cfg = strat_cfg
+        self._engines: Dict[Tuple[str, str], IndicatorEngine] = {}
+
+    def engine(self, symbol: str, timeframe: str) -> IndicatorEngine:
+        key = (symbol, timeframe)
+        eng = self._engines.get(key)
+        if eng is None:
+            eng = self._engines[key] = IndicatorEngine(self.strat_cfg)
+        return eng
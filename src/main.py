@@ -2,56 +2,61 @@
 import os
 import asyncio
 import time
+import uuid
 import logging
 from datetime import datetime, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
-import yaml
+import numpy as np
 import pandas as pd
-import ccxt.async_support as ccxt
 
 # Imports locaux ABSOLUS
-from metrics import start_metrics_server, bot_daily_pnl, order_latency, bot_order_total
-from marketdata import run_bookticker, midprice
-from utils import get_symbol_info, with_rate_limit_retry
+from config import load_config, create_exchange
+from metrics import (start_metrics_server, bot_daily_pnl, order_latency, bot_order_total, stage_timer,
+                     observe_stage, record_cache, monitor_event_loop)
+from marketdata import (run_bookticker, midprice, configure_book, get_book, KlineFeed, ShardedStream,
+                        STREAM_URL, MAX_STREAMS_PER_CONNECTION, bookticker_streams)
+from utils import get_symbol_filters, with_rate_limit_retry, set_scheduler
+from ratelimit import WeightScheduler, PRIORITY_ORDER
 from guards import prepare_order
-from persistence import load as load_state, state as get_state, roll_daily_if_needed, update_realized_pnl
+from persistence import (load as load_state, state as get_state, roll_daily_if_needed, update_realized_pnl,
+                         flush as flush_state, configure_path as configure_state_path, update_paper_balances)
 from positions import get_position, set_position, clear_position
-from indicators import compute_indicators
+from indicators import IndicatorBank
+from panel import close_panel, compute_panel_indicators, panel_signals
 from cache import OHLCVCache
+from candles import CandleBuffer, configure_clock, market_time, refresh_buffer, timeframe_ms
+from archive import configure_archive, get_archive
 from strategies.rsi_sma import RSISMAStrategy
+from universe import Universe
+from scheduler import CandleScheduler
+from profiling import profiler_from_config
+from paper import PaperExchange
+from recorder import RecordingExchange, configure_recorder
+from replay import configure_replay, get_replay
+from execution import OrderPipeline
+from ml_signals import MLSignalGenerator, panel_features, retrain_loop
+from triggers import TriggerIndex, configure_triggers, get_triggers
+from warmstart import configure_warmstart, get_warmstart
+from account import UserDataStream, ensure_account
 
-# Configuration logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(message)s',
-    handlers=[
-        logging.FileHandler('trading_bot.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
-CONFIG_PATH = os.environ.get("BOT_CONFIG", "config.yml")
+# Clé de dédup des ventes TP/SL dans l'OrderPipeline, distincte des SELL de stratégie
+TPSL_ACTION = "SELL_TPSL"
+# Intervalle de re-vérification du kill-switch, indépendant des clôtures de bougie
+KILL_SWITCH_RECHECK_SECONDS = 60
 
-def load_config() -> Dict[str, Any]:
-    """Charge la configuration depuis config.yml"""
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
-
-async def create_exchange(cfg: Dict[str, Any]):
-    """Initialise l'exchange avec gestion testnet"""
-    ex_name = cfg["bot"].get("exchange", "binance")
-    klass = getattr(ccxt, ex_name)
-    exchange = klass({
-        "apiKey": os.environ.get("API_KEY", ""),
-        "secret": os.environ.get("API_SECRET", ""),
-        "enableRateLimit": True,
-    })
-    if cfg["bot"].get("testnet") or os.environ.get("TESTNET") == "1":
-        exchange.set_sandbox_mode(True)
-        logger.info("Mode testnet activé")
-    return exchange
+def setup_logging():
+    """Logs du bot (fichier + console), configurés au lancement uniquement : importer main n'écrit rien"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s %(levelname)s %(message)s',
+        handlers=[
+            logging.FileHandler('trading_bot.log'),
+            logging.StreamHandler()
+        ]
+    )
 
 async def risk_gate(exchange, cfg: Dict[str, Any]) -> bool:
     """Kill-switch basé sur la perte journalière. Retourne True si trading autorisé"""
@@ -60,8 +65,8 @@ async def risk_gate(exchange, cfg: Dict[str, Any]) -> bool:
     if limit_pct <= 0:
         return True
     try:
-        bal = await exchange.fetch_balance()
-        quote_equity = bal["total"].get("USDT") or bal["total"].get("EUR") or 0.0
+        account = await ensure_account(exchange)
+        quote_equity = account.total("USDT") or account.total("EUR") or 0.0
         st = get_state()
         pnl = float(st["daily"]["realized_pnl_quote"])
         bot_daily_pnl.set(pnl)
@@ -73,48 +78,139 @@ async def risk_gate(exchange, cfg: Dict[str, Any]) -> bool:
         return False
     return True
 
+async def fetch_candles(exchange, symbol: str, timeframe: str, limit: int, cache: OHLCVCache) -> Optional[CandleBuffer]:
+    """Buffer de bougies du symbole, rafraîchi de façon incrémentale à l'expiration du TTL"""
+    buf = cache.store.buffer(symbol, timeframe)
+    if buf.live:
+        record_cache("ohlcv", True)
+        return buf
+    # Le TTL ne suffit pas : après une clôture, la nouvelle bougie doit être téléchargée
+    current = market_time() * 1000 // timeframe_ms(timeframe) * timeframe_ms(timeframe)
+    if cache.is_fresh(symbol, timeframe) and (buf.last_open_time or 0) >= current:
+        record_cache("ohlcv", True)
+        return buf
+    record_cache("ohlcv", False)
+    try:
+        with stage_timer("ohlcv_fetch"):
+            await refresh_buffer(exchange, buf, symbol, timeframe, limit, get_archive())
+        cache.touch(symbol, timeframe)
+        return buf
+    except Exception as e:
+        logger.error(f"Erreur fetch OHLCV {symbol}: {e}")
+        return None
+
 async def fetch_ohlcv_cached(exchange, symbol: str, timeframe: str, limit: int, cache: OHLCVCache) -> pd.DataFrame:
-    """Récupère OHLCV avec cache"""
+    """Récupère OHLCV avec cache (seules les nouvelles bougies sont téléchargées à l'expiration)"""
     cached = cache.get(symbol, timeframe)
     if cached is not None:
         return cached
-    try:
-        data = await with_rate_limit_retry(exchange.fetch_ohlcv, symbol, timeframe, limit)
-        df = pd.DataFrame(data, columns=['timestamp','open','high','low','close','volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        cache.set(symbol, timeframe, df)
-        return df
-    except Exception as e:
-        logger.error(f"Erreur fetch OHLCV {symbol}: {e}")
+    buf = await fetch_candles(exchange, symbol, timeframe, limit, cache)
+    if buf is None:
         return None
+    df = buf.to_frame()
+    cache.set(symbol, timeframe, df)
+    return df
 
-async def analyze_symbol(exchange, symbol: str, cfg: Dict[str, Any], cache: OHLCVCache, strategy) -> Dict[str, Any]:
+async def analyze_symbol(exchange, symbol: str, cfg: Dict[str, Any], cache: OHLCVCache, strategy,
+                         indicators: IndicatorBank) -> Dict[str, Any]:
     """Analyse un symbole et génère un signal de trading"""
     try:
-        df = await fetch_ohlcv_cached(exchange, symbol, cfg["bot"]["timeframe"], cfg["bot"]["limit"], cache)
-        if df is None or len(df) < 50:
-            return None
-        df = compute_indicators(df, cfg["strategy"])
-        if df['RSI'].isna().any() or df['SMA_short'].isna().any():
+        timeframe = cfg["bot"]["timeframe"]
+        buf = await fetch_candles(exchange, symbol, timeframe, cfg["bot"]["limit"], cache)
+        if buf is None or len(buf) < 50:
             return None
-        signal = await strategy.generate_signal(df, None)
+        with stage_timer("indicators"):
+            values = indicators.engine(symbol, timeframe).sync(buf.timestamps(), buf.close)
+        with stage_timer("signal"):
+            signal = strategy.evaluate(values)
         if signal['action'] == 'HOLD':
             return None
-        latest = df.iloc[-1]
-        current_price = midprice(symbol) or latest['close']
+        current_price = midprice(symbol) or float(buf.close[-1])
         return {
             'symbol': symbol,
             'signal': signal,
             'price': current_price,
-            'rsi': latest['RSI'],
-            'sma_short': latest['SMA_short'],
-            'sma_long': latest['SMA_long'],
-            'volume': latest['volume']
+            'rsi': values['RSI'],
+            'sma_short': values['SMA_short'],
+            'sma_long': values['SMA_long'],
+            'volume': float(buf.column('volume')[-1]),
+            'created_at': time.monotonic(),
         }
     except Exception as e:
         logger.error(f"Erreur analyse {symbol}: {e}")
         return None
 
+async def analyze_panel(exchange, symbols: List[str], cfg: Dict[str, Any], cache: OHLCVCache,
+                        strategy) -> List[Dict[str, Any]]:
+    """Mode panel : tout l'univers évalué en une passe vectorielle (symbole x temps)"""
+    timeframe, limit = cfg["bot"]["timeframe"], cfg["bot"]["limit"]
+    await refresh_candles(exchange, symbols, cfg, cache)
+    bufs = [(s, cache.store.get(s, timeframe)) for s in symbols]
+    bufs = [(s, b) for s, b in bufs if b is not None and len(b) >= 50]
+    if not bufs:
+        return []
+    ready = [s for s, _ in bufs]
+    closes = close_panel(cache.store, ready, timeframe, limit)
+    prices = np.array([midprice(s) or np.nan for s in ready])
+    prices = np.where(np.isnan(prices), closes[:, -1], prices)
+    volumes = np.array([b.column('volume')[-1] for _, b in bufs])
+    with stage_timer("indicators"):
+        ind = compute_panel_indicators(closes, strategy.config)
+    with stage_timer("signal"):
+        results = panel_signals(ready, closes, strategy, prices, volumes, ind)
+    created = time.monotonic()
+    for result in results:
+        result['created_at'] = created
+    return results
+
+async def confirm_with_ml(ml: MLSignalGenerator, results: List[Dict[str, Any]], cfg: Dict[str, Any],
+                          cache: OHLCVCache) -> List[Dict[str, Any]]:
+    """Garde les entrées (BUY) confirmées par le modèle ML, scorées en un seul predict_proba.
+
+    Les sorties de stratégie (SELL) ne sont jamais filtrées : le modèle ne
+    doit pas retenir une position que la stratégie veut fermer.
+    """
+    entries = [r for r in results if r['signal']['action'] == 'BUY']
+    if not entries:
+        return results
+    timeframe, limit = cfg["bot"]["timeframe"], cfg["bot"]["limit"]
+    symbols = [r['symbol'] for r in entries]
+    with stage_timer("signal"):
+        # Features de tous les symboles signalés en une passe vectorielle (mêmes que l'entraînement)
+        features = panel_features(close_panel(cache.store, symbols, timeframe, limit),
+                                  close_panel(cache.store, symbols, timeframe, 5, column='volume'), cfg["strategy"])
+        signals = await ml.get_signals(symbols, features)
+    if not ml.is_trained:
+        return results
+    kept = []
+    for r in results:
+        if r['signal']['action'] != 'BUY':
+            kept.append(r)
+            continue
+        ml_signal = signals[r['symbol']]
+        if ml_signal['action'] == 'BUY':
+            r['ml_confidence'] = float(ml_signal['confidence'])
+            kept.append(r)
+    return kept
+
+def order_fill(order: Optional[Dict[str, Any]], symbol: str, price: float, qty: float):
+    """Prix moyen, quantité reçue et frais (en quote) d'un ordre ccxt exécuté.
+
+    Repli sur le prix et la quantité envoyés quand l'exchange ne les renvoie pas ;
+    des frais prélevés en base réduisent la quantité reçue.
+    """
+    order = order or {}
+    base, _, quote = symbol.partition('/')
+    fill_price = float(order.get('average') or order.get('price') or price)
+    filled = float(order.get('filled') or qty)
+    fee = order.get('fee') or {}
+    fee_cost = float(fee.get('cost') or 0.0)
+    if fee.get('currency') == quote:
+        return fill_price, filled, fee_cost
+    if fee.get('currency') == base:
+        return fill_price, filled - fee_cost, fee_cost * fill_price
+    return fill_price, filled, 0.0
+
 async def execute_trade(exchange, analysis: Dict[str, Any], cfg: Dict[str, Any]) -> bool:
     """Exécute un trade basé sur l'analyse"""
     symbol = analysis['symbol']
@@ -125,30 +221,55 @@ async def execute_trade(exchange, analysis: Dict[str, Any], cfg: Dict[str, Any])
         if existing_pos and signal['action'] == 'BUY':
             logger.info(f"Position déjà ouverte sur {symbol}, skip BUY")
             return False
-        balance = await exchange.fetch_balance()
+        if existing_pos and signal['action'] == 'SELL':
+            # Sortie de stratégie : la position entière, comme un TP/SL
+            return await execute_sell(exchange, symbol, existing_pos['qty'], price, "Signal SELL")
+        account = await ensure_account(exchange)
         quote = symbol.split('/')[1] if '/' in symbol else 'USDT'
-        free_quote = float(balance["free"].get(quote, 0))
+        free_quote = account.free_balance(quote)
         position_size_pct = float(cfg["bot"].get("position_size_pct", 0.02))
         notional_target = free_quote * position_size_pct
         if notional_target < 10:
             return False
         qty = notional_target / price
-        symbol_info = await get_symbol_info(exchange, symbol)
-        final_price, final_qty = prepare_order(symbol_info, signal['action'], price, price, qty)
+        symbol_info = await get_symbol_filters(exchange, symbol)
+        with stage_timer("guards"):
+            final_price, final_qty = prepare_order(symbol_info, signal['action'], price, price, qty)
         if cfg["bot"].get("dry_run") or os.environ.get("DRY_RUN") == "1":
             logger.info(f"DRY RUN: {signal['action']} {final_qty} {symbol} @ {final_price}")
             return True
+        client_id = f"bot_{uuid.uuid4().hex[:24]}"
+        if signal['action'] == 'BUY':
+            # Notionnel réservé jusqu'à l'executionReport : les BUY concurrents voient le solde restant
+            account.reserve(client_id, quote, final_qty * final_price)
         t0 = time.monotonic()
-        order = await exchange.create_order(symbol, 'market', signal['action'].lower(), final_qty, final_price)
+        try:
+            order = await with_rate_limit_retry(exchange.create_order, symbol, 'market', signal['action'].lower(),
+                                                final_qty, final_price, {"newClientOrderId": client_id},
+                                                priority=PRIORITY_ORDER)
+        except Exception:
+            account.release(client_id)
+            raise
+        if not account.streaming:
+            account.release(client_id)  # pas d'executionReport attendu : soldes relus en REST
         order_latency.observe(time.monotonic() - t0)
+        observe_stage("order", time.monotonic() - t0)
         bot_order_total.labels(action=signal['action'].lower()).inc()
+        fill_price, filled, fee = order_fill(order, symbol, final_price, final_qty)
+        triggers = get_triggers()
         if signal['action'] == 'BUY':
-            set_position(symbol, final_qty, final_price)
-            logger.info(f"Position ouverte: {final_qty} {symbol} @ {final_price}")
+            set_position(symbol, filled, fill_price)
+            if fee:
+                update_realized_pnl(-fee)  # frais d'entrée réalisés dès l'exécution
+            if triggers is not None:
+                triggers.arm(symbol, filled, fill_price)
+            logger.info(f"Position ouverte: {filled} {symbol} @ {fill_price}")
         else:
             clear_position(symbol)
+            if triggers is not None:
+                triggers.disarm(symbol)
             if existing_pos:
-                pnl = (final_price - existing_pos['entry_price']) * existing_pos['qty']
+                pnl = (fill_price - existing_pos['entry_price']) * filled - fee
                 update_realized_pnl(pnl)
                 logger.info(f"Position fermée: {symbol}, PnL: {pnl:.2f}")
         return True
@@ -156,101 +277,230 @@ async def execute_trade(exchange, analysis: Dict[str, Any], cfg: Dict[str, Any])
         logger.error(f"Erreur exécution trade {symbol}: {e}")
         return False
 
-async def manage_existing_positions(exchange, cfg: Dict[str, Any], cache: OHLCVCache):
-    """Gère les positions ouvertes (take-profit, stop-loss)"""
-    st = get_state()
-    positions = st.get("positions", {})
-    for symbol, pos_data in list(positions.items()):
+async def manage_existing_positions(exchange, cfg: Dict[str, Any], cache: OHLCVCache,
+                                    pipeline: Optional[OrderPipeline] = None,
+                                    triggers: Optional[TriggerIndex] = None):
+    """Filet de sécurité des TP/SL : réaligne l'index des déclencheurs sur les positions
+    et teste en REST les symboles sans prix bookTicker frais (les autres sont traités au tick)"""
+    triggers = triggers or get_triggers() or TriggerIndex(cfg["strategy"].get("take_profit_pct", 0.05),
+                                                          cfg["strategy"].get("trailing_stop_pct", 0.02))
+    positions = get_state().get("positions", {})
+    triggers.sync(positions, skip=pipeline.pending if pipeline is not None else None)
+    for symbol in list(positions):
         try:
-            current_price = midprice(symbol)
-            if current_price is None:
-                ticker = await exchange.fetch_ticker(symbol)
-                current_price = float(ticker.get("last") or ticker.get("close"))
-            entry_price = pos_data['entry_price']
-            qty = pos_data['qty']
-            pnl_pct = (current_price - entry_price) / entry_price
-            tp_pct = cfg["strategy"].get("take_profit_pct", 0.05)
-            if pnl_pct >= tp_pct:
-                logger.info(f"Take profit {symbol}: {pnl_pct:.2%}")
-                await execute_sell(exchange, symbol, qty, current_price, "TAKE_PROFIT")
-            sl_pct = cfg["strategy"].get("trailing_stop_pct", 0.02)
-            if pnl_pct <= -sl_pct:
-                logger.info(f"Stop loss {symbol}: {pnl_pct:.2%}")
-                await execute_sell(exchange, symbol, qty, current_price, "STOP_LOSS")
+            if pipeline is not None and pipeline.pending(symbol):
+                continue  # un ordre est déjà en file sur ce symbole
+            if midprice(symbol) is not None:
+                continue
+            ticker = await with_rate_limit_retry(exchange.fetch_ticker, symbol)
+            fired = triggers.check(symbol, float(ticker.get("bid") or ticker.get("last") or ticker.get("close")))
+            if fired is not None:
+                logger.info(f"{fired[3]} {symbol} @ {fired[2]}")
+                await submit_sell(exchange, pipeline, *fired)
         except Exception as e:
             logger.error(f"Erreur gestion position {symbol}: {e}")
 
-async def execute_sell(exchange, symbol: str, qty: float, price: float, reason: str):
-    """Exécute une vente"""
+async def execute_sell(exchange, symbol: str, qty: float, price: float, reason: str) -> bool:
+    """Vend une position ouverte ; rien à faire si elle a déjà été fermée (TP/SL et signal SELL en file)"""
+    if not get_position(symbol):
+        logger.info(f"{reason}: aucune position ouverte sur {symbol}, vente ignorée")
+        return False
     try:
-        symbol_info = await get_symbol_info(exchange, symbol)
-        final_price, final_qty = prepare_order(symbol_info, "SELL", price, price, qty)
-        order = await exchange.create_order(symbol, 'market', 'sell', final_qty, final_price)
+        symbol_info = await get_symbol_filters(exchange, symbol)
+        with stage_timer("guards"):
+            final_price, final_qty = prepare_order(symbol_info, "SELL", price, price, qty)
+        t0 = time.monotonic()
+        order = await with_rate_limit_retry(exchange.create_order, symbol, 'market', 'sell', final_qty, final_price,
+                                            priority=PRIORITY_ORDER)
+        order_latency.observe(time.monotonic() - t0)
+        observe_stage("order", time.monotonic() - t0)
         bot_order_total.labels(action='sell').inc()
+        fill_price, filled, fee = order_fill(order, symbol, final_price, final_qty)
         pos = get_position(symbol)
         if pos:
-            pnl = (final_price - pos['entry_price']) * final_qty
+            pnl = (fill_price - pos['entry_price']) * filled - fee
             update_realized_pnl(pnl)
         clear_position(symbol)
-        logger.info(f"{reason}: Vendu {final_qty} {symbol} @ {final_price}")
+        triggers = get_triggers()
+        if triggers is not None:
+            triggers.disarm(symbol)
+        logger.info(f"{reason}: Vendu {filled} {symbol} @ {fill_price}")
+        return True
     except Exception as e:
         logger.error(f"Erreur vente {symbol}: {e}")
+        return False
+
+async def submit_sell(exchange, pipeline: Optional[OrderPipeline], symbol: str, qty: float, price: float,
+                      reason: str):
+    """Vente TP/SL : passe par le pipeline (verrou du symbole partagé avec les BUY) s'il est actif"""
+    if pipeline is None:
+        await execute_sell(exchange, symbol, qty, price, reason)
+    else:
+        pipeline.submit(symbol, TPSL_ACTION, execute_sell, exchange, symbol, qty, price, reason)
+
+async def position_loop(exchange, cfg: Dict[str, Any], cache: OHLCVCache,
+                        pipeline: Optional[OrderPipeline] = None):
+    """Réconciliation des déclencheurs TP/SL à sa propre cadence, indépendante des clôtures de bougie"""
+    interval = float(cfg["bot"].get("position_check_seconds", 5))
+    while True:
+        try:
+            await manage_existing_positions(exchange, cfg, cache, pipeline)
+        except Exception as e:
+            logger.error(f"Erreur gestion des positions: {e}")
+        await asyncio.sleep(interval)
+
+async def refresh_candles(exchange, symbols: List[str], cfg: Dict[str, Any], cache: OHLCVCache):
+    """Rafraîchit en REST les buffers non alimentés par le flux klines"""
+    timeframe, limit = cfg["bot"]["timeframe"], cfg["bot"]["limit"]
+    batch_size = cfg.get("performance", {}).get("batch_size", 10)
+    for i in range(0, len(symbols), batch_size):
+        await asyncio.gather(*(fetch_candles(exchange, s, timeframe, limit, cache)
+                               for s in symbols[i:i+batch_size]), return_exceptions=True)
 
-async def get_tradable_symbols(exchange, cfg: Dict[str, Any]) -> List[str]:
+async def get_tradable_symbols(exchange, cfg: Dict[str, Any], universe: Optional[Universe] = None) -> List[str]:
     """Sélectionne les symboles tradables selon critères config"""
     symbols = cfg["bot"].get("symbols")
     if symbols:
         return symbols
-    markets = await exchange.load_markets()
-    tradable = []
-    for symbol, market in markets.items():
-        if not market.get('active', True):
-            continue
-        base, quote = market['base'], market['quote']
-        if not any(b in [base, quote] for b in cfg["bot"].get("filter_bases", [])):
-            continue
-        volume_threshold = cfg["bot"].get("volume_threshold", 0)
-        if volume_threshold > 0:
-            try:
-                ticker = await exchange.fetch_ticker(symbol)
-                if float(ticker.get('quoteVolume', 0)) < volume_threshold:
-                    continue
-            except:
-                continue
-        tradable.append(symbol)
-        if len(tradable) >= 50:
-            break
-    return tradable
+    universe = universe or Universe(exchange, cfg)
+    return await universe.refresh()
+
+def resume_paper(exchange) -> bool:
+    """Reprend les soldes papier persistés, cohérents avec les positions restaurées"""
+    if not isinstance(exchange, PaperExchange):
+        return False
+    restored = exchange.restore(get_state().get("paper_balances"))
+    if restored:
+        logger.info(f"Soldes papier repris: {exchange.balances}")
+    return restored
 
 async def trading_loop(exchange, cfg: Dict[str, Any]):
     """Boucle principale de trading"""
     start_metrics_server(int(cfg["bot"].get("metrics_port", 8000)))
+    asyncio.create_task(monitor_event_loop())
     load_state()
-    cache = OHLCVCache(ttl_seconds=cfg.get("performance", {}).get("cache_ttl", 300))
+    resume_paper(exchange)
+    set_scheduler(WeightScheduler(exchange, weight_limit=int(cfg.get("performance", {}).get("weight_limit", 6000))))
+    cache = OHLCVCache(
+        ttl_seconds=cfg.get("performance", {}).get("cache_ttl", 300),
+        capacity=int(cfg["bot"].get("limit", 200)),
+    )
     strategy = RSISMAStrategy(cfg["strategy"])
-    symbols = await get_tradable_symbols(exchange, cfg)
+    indicators = IndicatorBank(cfg["strategy"])
+    perf = cfg.get("performance", {})
+    # Les ordres partent au fil de l'eau ; la cadence est bornée par la limite d'ordres, pas par un sleep
+    pipeline = OrderPipeline(concurrency=int(perf.get("order_concurrency", 4)),
+                             orders_per_second=float(perf.get("orders_per_second", 10)))
+    pipeline.start()
+    # TP/SL testés à chaque tick bookTicker ; les ventes passent par le pipeline
+    triggers = configure_triggers(cfg["strategy"], on_trigger=lambda symbol, qty, price, reason: pipeline.submit(
+        symbol, TPSL_ACTION, execute_sell, exchange, symbol, qty, price, reason))
+    triggers.sync(get_state()["positions"])
+    get_book().listeners.append(triggers.on_tick)
+    if cfg.get("archive", {}).get("enabled", False):
+        # Warm-up des buffers depuis le disque : seul le delta est téléchargé
+        configure_archive(cfg["archive"].get("root", "data/candles"))
+    universe = Universe(exchange, cfg)
+    warm_cfg = cfg.get("warmstart", {})
+    # En replay, un snapshot (pris au temps réel) fausserait bougies, univers et filtres rejoués
+    if warm_cfg.get("enabled", False) and not cfg.get("replay", {}).get("enabled", False):
+        # exchangeInfo, univers, bougies et indicateurs repris du dernier snapshot : seul le delta est téléchargé
+        warm_path = warm_cfg.get("path", "data/warmstart.pkl")
+        if isinstance(exchange, PaperExchange):
+            warm_path = cfg.get("paper", {}).get("warmstart_path", "data/warmstart.paper.pkl")
+        warm = configure_warmstart(warm_path,
+                                   float(warm_cfg.get("max_age_minutes", 360)) * 60)
+        warm.restore(cache, cfg, universe, indicators)
+        warm.attach(cache, cfg, universe, indicators)
+        asyncio.create_task(warm.run(float(warm_cfg.get("interval_minutes", 5)) * 60))
+    if universe.symbols and not cfg["bot"].get("symbols"):
+        symbols = universe.symbols  # rafraîchi par universe.run() à l'échéance habituelle
+    else:
+        symbols = await get_tradable_symbols(exchange, cfg, universe)
+    if not cfg["bot"].get("symbols"):
+        asyncio.create_task(universe.run())
+    feed = None
+    replay = get_replay()
+    if replay is not None:
+        # Flux rejoués par un serveur local : les clients WebSocket restent ceux du live
+        await replay.start()
+        cfg["bot"]["stream_url"] = replay.url
+    configure_book(cfg.get("performance", {}).get("book_max_age_seconds"))
     if cfg.get("performance", {}).get("websocket_enabled", True):
-        asyncio.create_task(run_bookticker(symbols[:20]))
+        stream_url = cfg["bot"].get("stream_url", STREAM_URL)
+        per_connection = int(cfg.get("performance", {}).get("streams_per_connection", MAX_STREAMS_PER_CONNECTION))
+        # Univers complet réparti en shards ; les positions ouvertes restent suivies hors univers
+        def watched(syms: List[str]) -> List[str]:
+            return list(syms) + [s for s in get_state()["positions"] if s not in syms]
+
+        book_stream = ShardedStream(get_book().handle, stream_url, per_connection, name="bookticker")
+        asyncio.create_task(run_bookticker(watched(symbols), stream=book_stream))
+        feed = KlineFeed(exchange, cache.store, symbols, cfg["bot"]["timeframe"], cfg["bot"]["limit"],
+                         base_url=stream_url, max_streams=per_connection)
+        asyncio.create_task(feed.run())
+
+        def follow_universe(syms: List[str]):
+            book_stream.set_streams(bookticker_streams(watched(syms)))
+            feed.set_symbols(syms)
+        universe.listeners.append(follow_universe)
+        try:
+            await asyncio.wait_for(feed.ready.wait(), timeout=60)
+        except asyncio.TimeoutError:
+            logger.warning("Flux klines indisponible, repli sur le polling REST")
+        paper = isinstance(exchange, PaperExchange)
+        if not (cfg["bot"].get("dry_run") or os.environ.get("DRY_RUN") == "1" or paper):
+            # Soldes poussés par le user data stream : plus de fetch_balance avant chaque ordre
+            asyncio.create_task(UserDataStream(
+                exchange, base_url=stream_url,
+                reconcile_interval=float(cfg.get("performance", {}).get("account_reconcile_seconds", 300)),
+            ).run())
+    ml = None
+    if cfg.get("ml", {}).get("enabled", False):
+        # Modèle chargé à la première inférence, réentraîné en tâche de fond
+        ml = MLSignalGenerator(cfg["ml"].get("model_path", "data/models/ml_signals.joblib"),
+                               threshold=float(cfg["ml"].get("confidence_threshold", 0.6)))
+        if get_archive() is not None:
+            asyncio.create_task(retrain_loop(ml, cfg))
+    scheduler = CandleScheduler(cfg["bot"]["timeframe"], offset=float(perf.get("candle_close_offset_seconds", 2.0)),
+                                grace=float(perf.get("candle_close_grace_seconds", 10.0)))
+    asyncio.create_task(position_loop(exchange, cfg, cache, pipeline))
+    profiler = profiler_from_config(cfg)
+    profiler.install_signal_handler(int(cfg.get("profiling", {}).get("cycles_on_signal", 3)))
     logger.info(f"Bot démarré - {len(symbols)} symboles surveillés")
     while True:
         try:
             roll_daily_if_needed(datetime.now(timezone.utc).date().isoformat())
             if not await risk_gate(exchange, cfg):
                 logger.warning("Trading suspendu par kill-switch")
-                await asyncio.sleep(60)
+                await asyncio.sleep(KILL_SWITCH_RECHECK_SECONDS)
                 continue
-            await manage_existing_positions(exchange, cfg, cache)
-            batch_size = cfg.get("performance", {}).get("batch_size", 10)
-            for i in range(0, len(symbols), batch_size):
-                batch = symbols[i:i+batch_size]
-                tasks = [analyze_symbol(exchange, sym, cfg, cache, strategy) for sym in batch]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
+            cycle_start = time.perf_counter()
+            with profiler.cycle() as meta:
+                symbols = universe.symbols or symbols
+                await refresh_candles(exchange, symbols, cfg, cache)
+                # Un signal ne change qu'à la clôture d'une bougie : seuls ces symboles sont réévalués
+                due = scheduler.due(cache.store, symbols)
+                if perf.get("panel_mode", False):
+                    results = await analyze_panel(exchange, due, cfg, cache, strategy)
+                else:
+                    results = await asyncio.gather(
+                        *(analyze_symbol(exchange, sym, cfg, cache, strategy, indicators) for sym in due),
+                        return_exceptions=True)
+                scheduler.mark(cache.store, due)
+                if ml is not None:
+                    results = await confirm_with_ml(
+                        ml, [r for r in results if r and not isinstance(r, Exception)], cfg, cache)
                 for result in results:
                     if result and not isinstance(result, Exception):
-                        await execute_trade(exchange, result, cfg)
-                        await asyncio.sleep(1)
-                await asyncio.sleep(2)
-            await asyncio.sleep(cfg["bot"].get("cycle_interval", 30))
+                        pipeline.submit(result['symbol'], result['signal']['action'], execute_trade,
+                                        exchange, result, cfg, created=result.get('created_at'))
+                meta.update(symbols=len(symbols), due=len(due),
+                            signals=sum(1 for r in results if r and not isinstance(r, Exception)))
+            observe_stage("cycle", time.perf_counter() - cycle_start)
+            # Clôtures publiées par le flux : décident des symboles dus au prochain cycle
+            closed = await scheduler.wait(feed)
+            if closed:
+                logger.debug(f"Bougies clôturées (flux): {len(closed)} symboles")
         except Exception as e:
             logger.error(f"Erreur boucle principale: {e}")
             await asyncio.sleep(10)
@@ -258,7 +508,29 @@ async def trading_loop(exchange, cfg: Dict[str, Any]):
 async def main():
     try:
         cfg = load_config()
-        exchange = await create_exchange(cfg)
+        replay_cfg = cfg.get("replay", {})
+        paper_cfg = cfg.get("paper", {})
+        if paper_cfg.get("enabled", False) or replay_cfg.get("enabled", False):
+            # Positions, PnL et soldes simulés ne doivent jamais se mêler à l'état live
+            configure_state_path(paper_cfg.get("state_path", "state.paper.json"))
+        if replay_cfg.get("enabled", False):
+            replay = configure_replay(replay_cfg.get("dir", "data/recordings"), float(replay_cfg.get("speed", 1)))
+            exchange = replay.exchange()
+            # Bougies clôturées, fraîcheur du cache et cadence des cycles suivent le temps rejoué
+            configure_clock(replay.clock.now, replay.clock.speed)
+        else:
+            exchange = await create_exchange(cfg)
+        rec_cfg = cfg.get("recorder", {})
+        if rec_cfg.get("enabled", False):
+            recorder = configure_recorder(rec_cfg.get("dir", "data/recordings"),
+                                          float(rec_cfg.get("segment_minutes", 60)) * 60)
+            exchange = RecordingExchange(exchange, recorder)
+        if paper_cfg.get("enabled", False):
+            # Ordres exécutés localement contre le carnet ; données de marché réelles ou rejouées
+            exchange = PaperExchange(exchange, balances=paper_cfg.get("balances"),
+                                     fee_pct=float(paper_cfg.get("fee_pct", 0.001)),
+                                     latency=float(paper_cfg.get("latency_ms", 0)) / 1000,
+                                     on_fill=update_paper_balances)
         await trading_loop(exchange, cfg)
     except KeyboardInterrupt:
         logger.info("Arrêt demandé par utilisateur")
@@ -266,8 +538,14 @@ async def main():
         logger.error(f"Erreur fatale: {e}")  
         raise
     finally:
+        flush_state()
+        warm = get_warmstart()
+        if warm is not None:
+            warm.save()
+        configure_recorder(None)  # ferme les segments en cours
         if 'exchange' in locals():
             await exchange.close()
 
 if __name__ == "__main__":
+    setup_logging()
     asyncio.run(main())
@@ -1,43 +1,492 @@
 # src/marketdata.py
 import asyncio
 import json
-from typing import Dict, Optional, List
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, List, Set, Tuple
+
+import numpy as np
 import websockets
 
-# Cache des derniers prix (bid/ask) par symbole, ex: "BTCUSDT"
-_BOOK: Dict[str, Dict[str, float]] = {}
+from archive import get_archive
+from candles import CandleStore, refresh_buffer
+from metrics import ws_messages, ws_reconnects
+from recorder import get_recorder
 
-def midprice(symbol: str) -> Optional[float]:
-    sym = symbol.replace("/", "").upper()
-    b = _BOOK.get(sym, {}).get("b")
-    a = _BOOK.get(sym, {}).get("a")
-    if b is None or a is None:
-        return None
-    return (b + a) / 2.0
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # décodeur standard si orjson n'est pas installé
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+STREAM_URL = "wss://stream.binance.com:9443"
+# Limites Binance : 1024 streams par connexion, 5 messages entrants / seconde
+MAX_STREAMS_PER_CONNECTION = 1024
+_CONTROL_INTERVAL = 0.25
+# Streams par SUBSCRIBE/UNSUBSCRIBE (garde les messages de contrôle courts)
+_CONTROL_BATCH = 200
+
+def stream_id(symbol: str) -> str:
+    """'BTC/USDT' -> 'BTCUSDT' (identifiant des payloads Binance)"""
+    return symbol.replace("/", "").upper()
+
+class BookStore:
+    """Meilleurs bid/ask par symbole dans des tableaux NumPy préalloués.
+
+    Chaque symbole reçoit un slot fixe ; la table symbole -> slot accepte
+    'BTCUSDT' comme 'BTC/USDT' pour éviter toute normalisation à la lecture.
+    """
+
+    def __init__(self, capacity: int = 2048):
+        self._slots: Dict[str, int] = {}
+        self._count = 0
+        self._alloc(capacity)
+        # Appelés à chaque tick accepté : fn(symbole du payload, bid, ask)
+        self.listeners: List[Callable[[str, float, float], None]] = []
+
+    # Champ -> (valeur initiale, dtype)
+    _FIELDS = {
+        "bid": (np.nan, np.float64),
+        "ask": (np.nan, np.float64),
+        "bid_qty": (np.nan, np.float64),
+        "ask_qty": (np.nan, np.float64),
+        "update_id": (-1, np.int64),
+        "recv_time": (-np.inf, np.float64),  # time.monotonic() à la réception
+    }
+
+    def _alloc(self, capacity: int):
+        for name, (fill, dtype) in self._FIELDS.items():
+            arr = np.full(capacity, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                arr[:len(old)] = old
+            setattr(self, name, arr)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def slot(self, symbol: str) -> int:
+        """Slot du symbole, créé (et aliasé) au premier appel"""
+        slot = self._slots.get(symbol)
+        if slot is not None:
+            return slot
+        sid = stream_id(symbol)
+        slot = self._slots.get(sid)
+        if slot is None:
+            if self._count == len(self.bid):
+                self._alloc(2 * len(self.bid))
+            slot = self._count
+            self._count += 1
+            self._slots[sid] = slot
+        self._slots[symbol] = slot
+        return slot
+
+    def register(self, symbols: List[str]):
+        for s in symbols:
+            self.slot(s)
+
+    def update(self, symbol: str, bid: float, bid_qty: float, ask: float, ask_qty: float,
+               update_id: int = 0, now: Optional[float] = None) -> bool:
+        """Retourne False si la mise à jour est plus ancienne que celle stockée"""
+        i = self.slot(symbol)
+        if update_id and update_id <= self.update_id[i]:
+            return False
+        self.bid[i] = bid
+        self.ask[i] = ask
+        self.bid_qty[i] = bid_qty
+        self.ask_qty[i] = ask_qty
+        self.update_id[i] = update_id
+        self.recv_time[i] = time.monotonic() if now is None else now
+        return True
+
+    def handle(self, raw) -> Optional[str]:
+        """Décode un message bookTicker ; retourne le symbole mis à jour"""
+        msg = _loads(raw)
+        data = msg.get("data", msg)
+        # payload keys: u (update id), s (symbol), b/B (bid prix/qty), a/A (ask prix/qty)
+        s = data.get("s")
+        if not s:
+            return None
+        try:
+            bid, ask = float(data["b"]), float(data["a"])
+            ok = self.update(s, bid, float(data["B"]), ask, float(data["A"]), int(data.get("u") or 0))
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not ok:
+            return None
+        for fn in self.listeners:
+            fn(s, bid, ask)
+        return s
+
+    def _lookup(self, symbol: str) -> Optional[int]:
+        slot = self._slots.get(symbol)
+        if slot is None:
+            slot = self._slots.get(stream_id(symbol))
+            if slot is not None:
+                self._slots[symbol] = slot  # alias mémorisé pour les lectures suivantes
+        return slot
+
+    def age(self, symbol: str, now: Optional[float] = None) -> Optional[float]:
+        slot = self._lookup(symbol)
+        if slot is None or self.update_id[slot] < 0:
+            return None
+        return (time.monotonic() if now is None else now) - self.recv_time[slot]
+
+    def midprice(self, symbol: str, max_age: Optional[float] = None, now: Optional[float] = None) -> Optional[float]:
+        slot = self._lookup(symbol)
+        if slot is None:
+            return None
+        if max_age is not None and (time.monotonic() if now is None else now) - self.recv_time[slot] > max_age:
+            return None
+        mid = (self.bid[slot] + self.ask[slot]) / 2.0
+        return None if mid != mid else float(mid)
+
+# Carnet partagé (top of book) alimenté par run_bookticker
+_BOOK = BookStore()
+# Âge max (secondes) d'un prix accepté par midprice ; None = pas de limite
+_MAX_AGE: Optional[float] = None
+
+def configure_book(max_age: Optional[float]):
+    global _MAX_AGE
+    _MAX_AGE = max_age
+
+def get_book() -> BookStore:
+    return _BOOK
+
+def midprice(symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+    """Mid bid/ask du symbole, None si inconnu ou plus vieux que max_age (défaut configuré)"""
+    return _BOOK.midprice(symbol, _MAX_AGE if max_age is None else max_age)
+
+class _StreamShard:
+    """Une connexion combined-stream portant un sous-ensemble des streams"""
+
+    def __init__(self, owner: "ShardedStream", index: int):
+        self.owner = owner
+        self.index = index
+        self.streams: Dict[str, None] = {}  # ensemble ordonné
+        self.ws = None
+        self.task: Optional[asyncio.Task] = None
+        self.reconnects = 0
+        self._subscribed: Set[str] = set()  # streams actifs côté serveur
+        self._control_lock = asyncio.Lock()
+        self._next_id = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def url(self) -> str:
+        return f"{self.owner.base_url}/stream?streams={'/'.join(self.streams)}"
+
+    def add(self, streams: List[str]):
+        for s in streams:
+            self.streams[s] = None
+        self._changed.set()
+
+    def remove(self, streams: List[str]):
+        for s in streams:
+            self.streams.pop(s, None)
+        self._changed.set()
 
-async def run_bookticker(symbols: Optional[List[str]] = None):
-    # Streams multiplexés si une liste est fournie, sinon !bookTicker global
+    async def _control(self, method: str, streams: List[str]):
+        """SUBSCRIBE/UNSUBSCRIBE espacés pour respecter 5 messages / seconde"""
+        async with self._control_lock:
+            for i in range(0, len(streams), _CONTROL_BATCH):
+                chunk = streams[i:i + _CONTROL_BATCH]
+                self._next_id += 1
+                await self.ws.send(json.dumps({"method": method, "params": chunk, "id": self._next_id}))
+                if method == "SUBSCRIBE":
+                    self._subscribed.update(chunk)
+                else:
+                    self._subscribed.difference_update(chunk)
+                await asyncio.sleep(_CONTROL_INTERVAL)
+
+    async def _sync_subscriptions(self):
+        """Aligne les abonnements de la connexion ouverte sur self.streams"""
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            removed = sorted(s for s in self._subscribed if s not in self.streams)
+            added = [s for s in self.streams if s not in self._subscribed]
+            if removed:
+                await self._control("UNSUBSCRIBE", removed)
+                if self.owner.on_disconnect:
+                    self.owner.on_disconnect(removed)
+            if added:
+                await self._control("SUBSCRIBE", added)
+                if self.owner.on_connect:
+                    await self.owner.on_connect(added)
+
+    def _backoff(self, failures: int) -> float:
+        """Backoff exponentiel avec jitter : les shards ne se reconnectent pas en rafale"""
+        delay = min(self.owner.max_backoff, self.owner.backoff * (2 ** failures))
+        return delay * random.uniform(0.5, 1.5)
+
+    async def run(self):
+        failures = 0
+        while True:
+            if not self.streams:
+                self._changed.clear()
+                await self._changed.wait()
+                continue
+            sync = None
+            try:
+                initial = list(self.streams)  # streams portés par l'URL de cette connexion
+                async with websockets.connect(self.url, ping_interval=20, ping_timeout=60) as ws:
+                    self.ws = ws
+                    self._subscribed = set(initial)
+                    failures = 0
+                    # Connexion ouverte avant on_connect : aucun message perdu pendant le backfill
+                    if self.owner.on_connect:
+                        await self.owner.on_connect(initial)
+                    self._changed.set()  # rattrape les changements survenus pendant la connexion
+                    sync = asyncio.create_task(self._sync_subscriptions())
+                    messages = self.owner.messages
+                    recorder = get_recorder()
+                    async for raw in ws:
+                        messages.inc()
+                        if recorder is not None:
+                            recorder.ws(raw)
+                        try:
+                            self.owner.handler(raw)
+                        except Exception as e:
+                            logger.error(f"Message stream invalide (shard {self.index}): {e}")
+            except asyncio.CancelledError:
+                self._close(sync)
+                raise
+            except Exception as e:
+                logger.warning(f"Shard {self.index} interrompu: {e}")
+            self._close(sync)
+            self.reconnects += 1
+            self.owner.reconnect_counter.inc()
+            await asyncio.sleep(self._backoff(failures))
+            failures += 1
+
+    def _close(self, sync: Optional[asyncio.Task]):
+        if sync:
+            sync.cancel()
+        self.ws = None
+        if self._subscribed and self.owner.on_disconnect:
+            self.owner.on_disconnect(list(self._subscribed))
+        self._subscribed = set()
+
+class ShardedStream:
+    """Répartit un ensemble arbitraire de streams sur plusieurs connexions combinées.
+
+    Chaque shard porte au plus `max_streams` streams et se reconnecte seul
+    (backoff avec jitter) : une socket morte ne fige que ses propres symboles.
+    `set_streams` ajoute/retire des abonnements à chaud via SUBSCRIBE/UNSUBSCRIBE.
+    `on_connect(streams)` est attendu à chaque (ré)abonnement, `on_disconnect(streams)`
+    est appelé quand des streams cessent d'être reçus.
+    """
+
+    def __init__(self, handler: Callable[[Any], Any], base_url: str = STREAM_URL,
+                 max_streams: int = MAX_STREAMS_PER_CONNECTION,
+                 on_connect: Optional[Callable[[List[str]], Awaitable[None]]] = None,
+                 on_disconnect: Optional[Callable[[List[str]], None]] = None,
+                 backoff: float = 1.0, max_backoff: float = 60.0, name: str = "stream"):
+        self.handler = handler
+        self.name = name
+        self.messages = ws_messages.labels(stream=name)
+        self.reconnect_counter = ws_reconnects.labels(stream=name)
+        self.base_url = base_url
+        self.max_streams = max(1, min(int(max_streams), MAX_STREAMS_PER_CONNECTION))
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.shards: List[_StreamShard] = []
+        self._running = False
+
+    @property
+    def streams(self) -> List[str]:
+        return [s for shard in self.shards for s in shard.streams]
+
+    @property
+    def reconnects(self) -> int:
+        return sum(shard.reconnects for shard in self.shards)
+
+    def set_streams(self, streams: Iterable[str]):
+        """Remplace l'ensemble des streams ; seuls les écarts sont (dés)abonnés"""
+        wanted = list(dict.fromkeys(streams))
+        keep = set(wanted)
+        for shard in self.shards:
+            removed = [s for s in shard.streams if s not in keep]
+            if removed:
+                shard.remove(removed)
+        current = set(self.streams)
+        added = [s for s in wanted if s not in current]
+        for shard in self.shards:
+            room = self.max_streams - len(shard.streams)
+            if room > 0 and added:
+                shard.add(added[:room])
+                added = added[room:]
+        while added:
+            shard = _StreamShard(self, len(self.shards))
+            shard.add(added[:self.max_streams])
+            added = added[self.max_streams:]
+            self.shards.append(shard)
+            if self._running:
+                shard.task = asyncio.create_task(shard.run())
+
+    async def run(self):
+        self._running = True
+        for shard in self.shards:
+            if shard.task is None:
+                shard.task = asyncio.create_task(shard.run())
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._running = False
+            for shard in self.shards:
+                if shard.task:
+                    shard.task.cancel()
+            await asyncio.gather(*(s.task for s in self.shards if s.task), return_exceptions=True)
+            for shard in self.shards:
+                shard.task = None
+
+def bookticker_streams(symbols: Iterable[str]) -> List[str]:
+    return [f"{stream_id(s).lower()}@bookTicker" for s in symbols]
+
+async def run_bookticker(symbols: Optional[List[str]] = None, base_url: str = STREAM_URL,
+                         stream: Optional[ShardedStream] = None):
+    """Alimente le carnet partagé ; `stream` permet de modifier les symboles à chaud"""
+    if not symbols and stream is None:
+        # !bookTicker global sur une seule connexion
+        messages = ws_messages.labels(stream="bookticker")
+        while True:
+            try:
+                async with websockets.connect(f"{base_url}/ws/!bookTicker", ping_interval=20, ping_timeout=60) as ws:
+                    recorder = get_recorder()
+                    async for raw in ws:
+                        messages.inc()
+                        if recorder is not None:
+                            recorder.ws(raw)
+                        _BOOK.handle(raw)
+            except Exception:
+                ws_reconnects.labels(stream="bookticker").inc()
+                await asyncio.sleep(3)  # reconnexion douce
+    stream = stream or ShardedStream(_BOOK.handle, base_url, name="bookticker")
     if symbols:
-        streams = "/".join([f"{s.replace('/','').lower()}@bookTicker" for s in symbols])
-        url = f"wss://stream.binance.com:9443/stream?streams={streams}"
-    else:
-        url = "wss://stream.binance.com:9443/ws/!bookTicker"
+        _BOOK.register(symbols)
+        stream.set_streams(bookticker_streams(symbols))
+    await stream.run()
 
-    while True:
+class KlineFeed:
+    """Flux <symbol>@kline_<interval> alimentant le CandleStore, réparti en shards.
+
+    A chaque (re)connexion d'un shard, les trous de ses symboles sont comblés
+    en REST depuis la dernière bougie connue, puis leurs buffers sont marqués
+    `live` (plus de polling REST). Les clôtures (k.x) sont publiées dans `closed`.
+    """
+
+    def __init__(self, exchange, store: CandleStore, symbols: List[str], timeframe: str,
+                 limit: int, base_url: str = STREAM_URL, reconnect_delay: float = 3.0,
+                 max_streams: int = MAX_STREAMS_PER_CONNECTION):
+        self.exchange = exchange
+        self.store = store
+        self.timeframe = timeframe
+        self.limit = limit
+        self.closed: asyncio.Queue = asyncio.Queue()
+        self.ready = asyncio.Event()  # premier backfill de tous les symboles terminé
+        self.stream = ShardedStream(self.handle, base_url, max_streams,
+                                    on_connect=self._on_connect, on_disconnect=self._on_disconnect,
+                                    backoff=reconnect_delay, name="kline")
+        self.symbols: List[str] = []
+        self._by_id: Dict[str, str] = {}
+        self._by_stream: Dict[str, str] = {}  # jamais purgé : sert aussi aux désabonnements
+        self._pending: Set[str] = set()  # symboles jamais backfillés
+        self.set_symbols(symbols)
+
+    @property
+    def reconnects(self) -> int:
+        return self.stream.reconnects
+
+    def _stream_name(self, symbol: str) -> str:
+        return f"{stream_id(symbol).lower()}@kline_{self.timeframe}"
+
+    def set_symbols(self, symbols: List[str]):
+        """Change l'univers suivi ; les nouveaux symboles sont backfillés à leur abonnement"""
+        previous = set(self.symbols)
+        self.symbols = list(dict.fromkeys(symbols))
+        self._pending.update(s for s in self.symbols if s not in previous)
+        self._pending &= set(self.symbols)
+        self._by_id = {stream_id(s): s for s in self.symbols}
+        names = [self._stream_name(s) for s in self.symbols]
+        self._by_stream.update(zip(names, self.symbols))
+        self.stream.set_streams(names)
+        if not self._pending:
+            self.ready.set()
+
+    def _symbols_of(self, streams: List[str]) -> List[str]:
+        return [self._by_stream[s] for s in streams if s in self._by_stream]
+
+    async def _on_connect(self, streams: List[str]):
+        symbols = self._symbols_of(streams)
+        await self.backfill(symbols)
+        for s in symbols:
+            self.store.buffer(s, self.timeframe).live = True
+        self._pending.difference_update(symbols)
+        if not self._pending:
+            self.ready.set()
+
+    def _on_disconnect(self, streams: List[str]):
+        for symbol in self._symbols_of(streams):
+            buf = self.store.get(symbol, self.timeframe)
+            if buf is not None:
+                buf.live = False
+
+    async def backfill(self, symbols: Optional[List[str]] = None):
+        """Rattrape en REST les bougies manquées (une requête par symbole)"""
+        async def one(symbol):
+            try:
+                buf = self.store.buffer(symbol, self.timeframe)
+                await refresh_buffer(self.exchange, buf, symbol, self.timeframe, self.limit, get_archive())
+            except Exception as e:
+                logger.error(f"Erreur backfill klines {symbol}: {e}")
+        await asyncio.gather(*(one(s) for s in (self.symbols if symbols is None else symbols)))
+
+    def handle(self, raw) -> Optional[Tuple[str, int]]:
+        """Intègre un message kline ; retourne (symbole, open time) si la bougie est clôturée"""
+        msg = _loads(raw)
+        data = msg.get("data", msg)
+        k = data.get("k")
+        if not k:
+            return None
+        symbol = self._by_id.get(k.get("s") or data.get("s"))
+        if symbol is None:
+            return None
+        row = [k["t"], float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"])]
+        self.store.buffer(symbol, self.timeframe).merge([row])
+        if k.get("x"):
+            event = (symbol, int(k["t"]))
+            self.closed.put_nowait(event)
+            return event
+        return None
+
+    async def wait_closed(self, timeout: float, settle: float = 0.0) -> Dict[str, int]:
+        """Attend une clôture de bougie (ou le timeout) ; retourne symbole -> open time clôturé.
+
+        Après la première clôture, les suivantes sont collectées tant qu'il en
+        arrive à moins de `settle` secondes d'intervalle (rafale de frontière).
+        """
+        closed: Dict[str, int] = {}
         try:
-            async with websockets.connect(url, ping_interval=20, ping_timeout=60) as ws:
-                async for raw in ws:
-                    msg = json.loads(raw)
-                    data = msg.get("data", msg)
-                    # payload keys: s (symbol), b (best bid price), B (bid qty), a (best ask price), A (ask qty)
-                    s = data.get("s")
-                    if not s:
-                        continue
-                    try:
-                        bid = float(data.get("b"))
-                        ask = float(data.get("a"))
-                    except Exception:
-                        continue
-                    _BOOK[s] = {"b": bid, "a": ask}
-        except Exception:
-            await asyncio.sleep(3)  # reconnexion douce
+            symbol, open_time = await asyncio.wait_for(self.closed.get(), timeout)
+        except asyncio.TimeoutError:
+            return closed
+        while True:
+            closed[symbol] = max(open_time, closed.get(symbol, open_time))
+            if not self.closed.empty():
+                symbol, open_time = self.closed.get_nowait()
+                continue
+            if settle <= 0:
+                return closed
+            try:
+                symbol, open_time = await asyncio.wait_for(self.closed.get(), settle)
+            except asyncio.TimeoutError:
+                return closed
+
+    async def run(self):
+        await self.stream.run()
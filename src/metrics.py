@@ -1,4 +1,6 @@
 # src/metrics.py
+import asyncio
+import time
 
 from prometheus_client import Counter, Gauge, Histogram, start_http_server
 
@@ -28,6 +30,91 @@ order_latency = Histogram(
     "bot_order_latency_seconds",
     "Temps de latence pour placer un ordre (secondes)"
 )
+signal_to_ack_latency = Histogram(
+    "bot_signal_to_ack_seconds",
+    "Délai entre la création d’un signal et l’acquittement de l’ordre (secondes)",
+    ["action"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+order_queue_depth = Gauge(
+    "bot_order_queue_depth",
+    "Nombre d’ordres en attente dans le pipeline d’exécution"
+)
+
+# Instrumentation du pipeline (enfants labellisés pré-résolus : un observe coûte ~1 µs)
+STAGES = ("ohlcv_fetch", "indicators", "signal", "guards", "order", "cycle")
+stage_latency = Histogram(
+    "bot_stage_seconds",
+    "Durée de chaque étape du pipeline (secondes)",
+    ["stage"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+cache_requests = Counter(
+    "bot_cache_requests_total",
+    "Accès aux caches (hit/miss)",
+    ["cache", "result"]  # cache: 'ohlcv' ou 'exchange_info'
+)
+ws_messages = Counter(
+    "bot_ws_messages_total",
+    "Messages WebSocket reçus",
+    ["stream"]  # 'bookticker', 'kline', 'user'
+)
+ws_reconnects = Counter(
+    "bot_ws_reconnects_total",
+    "Reconnexions WebSocket",
+    ["stream"]
+)
+event_loop_lag = Gauge(
+    "bot_event_loop_lag_seconds",
+    "Retard de la boucle asyncio sur un réveil programmé (secondes)"
+)
+
+_STAGE = {stage: stage_latency.labels(stage=stage) for stage in STAGES}
+_CACHE = {(cache, hit): cache_requests.labels(cache=cache, result="hit" if hit else "miss")
+          for cache in ("ohlcv", "exchange_info") for hit in (True, False)}
+
+class _StageTimer:
+    __slots__ = ("_hist", "_t0")
+
+    def __init__(self, hist):
+        self._hist = hist
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._hist.observe(time.perf_counter() - self._t0)
+        return False
+
+def stage_timer(stage: str) -> _StageTimer:
+    """
+    Chronomètre une étape : `with stage_timer("indicators"): ...`
+    :param stage: une des valeurs de STAGES
+    """
+    return _StageTimer(_STAGE[stage])
+
+def observe_stage(stage: str, seconds: float) -> None:
+    _STAGE[stage].observe(seconds)
+
+def record_cache(cache: str, hit: bool) -> None:
+    """
+    Compte un accès cache.
+    :param cache: 'ohlcv' ou 'exchange_info'
+    :param hit: True si la donnée a été servie sans appel REST
+    """
+    _CACHE[(cache, hit)].inc()
+
+async def monitor_event_loop(interval: float = 0.5) -> None:
+    """
+    Mesure en continu le retard de la boucle asyncio (tâches bloquantes, CPU saturé).
+    :param interval: période d'échantillonnage en secondes
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        event_loop_lag.set(max(0.0, loop.time() - t0 - interval))
 
 # Indicateur global pour éviter de relancer plusieurs serveurs HTTP
 _metrics_started = False
@@ -51,6 +138,14 @@ def record_order(action: str, latency: float) -> None:
     bot_order_total.labels(action=action).inc()
     order_latency.observe(latency)
 
+def record_signal_latency(action: str, latency: float) -> None:
+    """
+    Enregistre le délai signal -> acquittement d’un ordre.
+    :param action: 'buy' ou 'sell'
+    :param latency: délai (en secondes) depuis la création du signal
+    """
+    signal_to_ack_latency.labels(action=action).observe(latency)
+
 def record_rate_limit() -> None:
     """
     Incrémente le compteur de rate limits.
@@ -1,31 +1,177 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import joblib
 import numpy as np
+import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 
+from indicators import compute_indicators
+from panel import compute_panel_indicators, rolling_mean_2d
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ['RSI', 'SMA_ratio', 'volume_mean_5']
+
+def feature_frame(df):
+    """Features de toutes les lignes (df avec RSI, SMA_short, SMA_long, volume)"""
+    return pd.DataFrame({
+        'RSI': df['RSI'],
+        'SMA_ratio': df['SMA_short'] / df['SMA_long'],
+        'volume_mean_5': df['volume'].rolling(5).mean(),
+    }, index=df.index)
+
+def panel_features(closes, volumes, strat_cfg):
+    """Features de la dernière bougie de chaque symbole d'un panel (symbole x temps), en une passe"""
+    ind = compute_panel_indicators(closes, strat_cfg)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = ind['SMA_short'][:, -1] / ind['SMA_long'][:, -1]
+    return np.column_stack([ind['RSI'][:, -1], ratio, rolling_mean_2d(volumes[:, -5:], 5)[:, -1]])
+
+def build_dataset(archive, symbols, timeframe, strat_cfg, horizon=1, start=None, end=None):
+    """Jeu d'entraînement lu dans la CandleArchive : label 1 si la clôture monte sur `horizon` bougies"""
+    xs, ys = [], []
+    for symbol in symbols:
+        df = archive.to_frame(symbol, timeframe, start, end)
+        if len(df) <= horizon:
+            continue
+        feats = feature_frame(compute_indicators(df, strat_cfg))
+        future = df['close'].shift(-horizon) / df['close'] - 1
+        valid = feats.notna().all(axis=1) & future.notna()
+        xs.append(feats[valid].to_numpy())
+        ys.append((future[valid] > 0).astype(int).to_numpy())
+    if not xs:
+        return np.empty((0, len(FEATURES))), np.empty(0, dtype=int)
+    return np.vstack(xs), np.concatenate(ys)
+
 class MLSignalGenerator:
-    def __init__(self):
+    """Classifieur BUY/SELL entraîné hors ligne sur l'archive de bougies.
+
+    Le modèle est persisté avec joblib dans `model_path` et chargé à la
+    première demande de signal. `get_signals` score tout un lot de symboles
+    avec un seul predict_proba, exécuté hors de la boucle asyncio.
+    """
+
+    def __init__(self, model_path=None, threshold=0.6):
         self.model = RandomForestClassifier(n_estimators=100)
         self.is_trained = False
-    
+        self.trained_at = None
+        self.model_path = model_path
+        self.threshold = float(threshold)
+        self._load_attempted = False
+
     def prepare_features(self, df):
-        features = []
-        # RSI
-        features.append(df['RSI'].iloc[-1])
-        # SMA ratio
-        features.append(df['SMA_short'].iloc[-1] / df['SMA_long'].iloc[-1])
-        # Volume trend
-        features.append(df['volume'].rolling(5).mean().iloc[-1])
-        return np.array(features).reshape(1, -1)
-    
+        return feature_frame(df).iloc[[-1]].to_numpy()
+
+    def train_from_archive(self, archive, symbols, timeframe, strat_cfg, horizon=1, start=None, end=None):
+        X, y = build_dataset(archive, symbols, timeframe, strat_cfg, horizon, start, end)
+        if len(np.unique(y)) < 2:
+            return False
+        model = RandomForestClassifier(n_estimators=100)
+        model.fit(X, y)
+        # Remplacement d'une seule référence : un predict en cours garde l'ancien modèle
+        self.model, self.is_trained, self.trained_at = model, True, time.time()
+        return True
+
+    def save(self, path=None):
+        path = path or self.model_path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        joblib.dump({'model': self.model, 'features': FEATURES, 'trained_at': self.trained_at}, tmp)
+        os.replace(tmp, path)
+
+    def load(self, path=None):
+        """Charge un modèle persisté ; False si absent ou entraîné sur d'autres features"""
+        path = path or self.model_path
+        self._load_attempted = True
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            saved = joblib.load(path)
+        except Exception as e:
+            logger.error(f"Modèle ML illisible {path}: {e}")
+            return False
+        if saved.get('features') != FEATURES:
+            logger.warning(f"Modèle ML {path} ignoré : features différentes")
+            return False
+        self.model, self.is_trained, self.trained_at = saved['model'], True, saved.get('trained_at')
+        return True
+
+    def _decide(self, prediction):
+        if prediction[1] > self.threshold:
+            return {'action': 'BUY', 'confidence': prediction[1]}
+        elif prediction[0] > self.threshold:
+            return {'action': 'SELL', 'confidence': prediction[0]}
+        return {'action': 'HOLD', 'confidence': max(prediction)}
+
     async def get_signal(self, df):
         if not self.is_trained:
             return {'action': 'HOLD', 'confidence': 0.0}
-        
+
         features = self.prepare_features(df)
         prediction = self.model.predict_proba(features)[0]
-        
-        if prediction[1] > 0.7:  # Buy probability > 70%
-            return {'action': 'BUY', 'confidence': prediction[1]}
-        elif prediction[0] > 0.7:  # Sell probability > 70%
-            return {'action': 'SELL', 'confidence': prediction[0]}
-        
-        return {'action': 'HOLD', 'confidence': max(prediction)}
+        return self._decide(prediction)
+
+    async def get_signals(self, symbols, features):
+        """Signaux d'un lot (features: matrice symbole x FEATURES) ; lignes incomplètes -> HOLD"""
+        loop = asyncio.get_running_loop()
+        if not self.is_trained and not self._load_attempted and self.model_path:
+            await loop.run_in_executor(None, self.load)
+        hold = {'action': 'HOLD', 'confidence': 0.0}
+        signals = {s: hold for s in symbols}
+        features = np.asarray(features, dtype=float).reshape(len(symbols), len(FEATURES))
+        rows = np.flatnonzero(np.isfinite(features).all(axis=1))
+        if not self.is_trained or len(rows) == 0:
+            return signals
+        model = self.model
+        proba = await loop.run_in_executor(None, model.predict_proba, features[rows])
+        for i, prediction in zip(rows, proba):
+            signals[symbols[i]] = self._decide(prediction)
+        return signals
+
+def train_job(cfg, symbols=None, generator=None):
+    """Entraînement hors ligne sur l'archive (tous ses symboles par défaut) puis persistance du modèle"""
+    from archive import CandleArchive
+    ml_cfg = cfg.get("ml", {})
+    timeframe = cfg["bot"]["timeframe"]
+    archive = CandleArchive(cfg.get("archive", {}).get("root", "data/candles"))
+    symbols = symbols or [s for s, tf in archive.keys() if tf == timeframe]
+    generator = generator or MLSignalGenerator(ml_cfg.get("model_path", "data/models/ml_signals.joblib"))
+    if not generator.train_from_archive(archive, symbols, timeframe, cfg["strategy"],
+                                        int(ml_cfg.get("horizon", 1))):
+        return False
+    generator.save()
+    return True
+
+async def retrain_loop(generator, cfg):
+    """Réentraînement en tâche de fond toutes les ml.model_retrain_hours heures"""
+    period = float(cfg.get("ml", {}).get("model_retrain_hours", 24)) * 3600
+    loop = asyncio.get_running_loop()
+    if not generator.is_trained and not generator._load_attempted:
+        await loop.run_in_executor(None, generator.load)
+    last = generator.trained_at or 0.0  # pas de modèle persisté : entraînement immédiat
+    while True:
+        await asyncio.sleep(max(0.0, last + period - time.time()))
+        last = time.time()
+        try:
+            ok = await loop.run_in_executor(None, train_job, cfg, None, generator)
+            logger.info("Modèle ML réentraîné" if ok else "Réentraînement ML : données insuffisantes")
+        except Exception as e:
+            logger.error(f"Erreur réentraînement ML: {e}")
+
+def _main(argv):
+    from config import load_config
+    parser = argparse.ArgumentParser(description="Entraînement du modèle ML depuis l'archive de bougies")
+    parser.add_argument("--symbols", nargs="+", default=None, help="défaut : tous les symboles archivés")
+    args = parser.parse_args(argv)
+    if not train_job(load_config(), args.symbols):
+        print("Données insuffisantes pour entraîner le modèle")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,175 @@
+# src/optimize.py
+"""Optimisation des paramètres de la stratégie par backtests parallèles.
+
+Les bougies sont copiées une seule fois en mémoire partagée ; chaque process
+du pool s'y attache sans copie et garde en cache les séries d'indicateurs
+(SMA par fenêtre, RSI par fenêtre) communes à plusieurs combinaisons. Les
+combinaisons sont triées par fenêtres puis envoyées par paquets pour que
+celles qui partagent des indicateurs tombent dans le même process.
+
+Usage:
+  python src/optimize.py --grid rsi_window=10,14,21 sma_short_window=5,10 \\
+      sma_long_window=30,50 take_profit_pct=0.03,0.05 [--random 50] \\
+      [--data historical.csv|BTC/USDT] [--start 2023-01-01] [--end 2024-01-01] \\
+      [--metric total_return] [--workers 8] [--out optimize_results.csv]
+"""
+import argparse
+import copy
+import itertools
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest import backtest_arrays, load_data
+from guards import SymbolInfo
+from indicators import rsi_series, sma_series
+
+# Nombre max de séries d'indicateurs gardées par process
+_CACHE_SIZE = 64
+
+def _check_space(space: Dict[str, Sequence[Any]], strat_cfg: Dict[str, Any]):
+    unknown = [k for k in space if k not in strat_cfg]
+    if unknown:
+        raise ValueError(f"Paramètres inconnus dans la section strategy: {unknown}")
+
+def _valid(params: Dict[str, Any], strat_cfg: Dict[str, Any]) -> bool:
+    merged = {**strat_cfg, **params}
+    return (merged['sma_short_window'] < merged['sma_long_window']
+            and merged['rsi_buy'] < merged['rsi_sell'])
+
+def param_grid(space: Dict[str, Sequence[Any]], strat_cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Produit cartésien des valeurs, sans les combinaisons incohérentes (SMA courte >= longue...)"""
+    _check_space(space, strat_cfg)
+    keys = list(space)
+    combos = (dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys)))
+    return [c for c in combos if _valid(c, strat_cfg)]
+
+def random_search(space: Dict[str, Sequence[Any]], strat_cfg: Dict[str, Any], n: int,
+                  seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """n combinaisons distinctes tirées au hasard dans la grille (sans l'énumérer)"""
+    _check_space(space, strat_cfg)
+    rng = random.Random(seed)
+    total = int(np.prod([len(v) for v in space.values()]))
+    seen, combos = set(), []
+    attempts = 0
+    while len(combos) < n and attempts < 20 * n and len(seen) < total:
+        attempts += 1
+        combo = {k: rng.choice(list(v)) for k, v in space.items()}
+        key = tuple(combo.values())
+        if key in seen:
+            continue
+        seen.add(key)
+        if _valid(combo, strat_cfg):
+            combos.append(combo)
+    return combos
+
+# Etat d'un process du pool (initialisé par _init_worker)
+_WORKER: Dict[str, Any] = {}
+
+def _init_worker(shm_name: str, n: int, cfg: Dict[str, Any], symbol_info: Optional[SymbolInfo]):
+    shm = shared_memory.SharedMemory(name=shm_name)  # le parent reste seul à faire unlink
+    prices = np.ndarray((2, n), dtype=np.float64, buffer=shm.buf)
+    _WORKER.update(shm=shm, opens=prices[0], closes=prices[1], cfg=cfg, symbol_info=symbol_info,
+                   cache={}, hits=0, misses=0)
+
+def _series(kind: str, window: int) -> np.ndarray:
+    cache = _WORKER["cache"]
+    key = (kind, int(window))
+    values = cache.get(key)
+    if values is not None:
+        _WORKER["hits"] += 1
+        return values
+    _WORKER["misses"] += 1
+    close = pd.Series(_WORKER["closes"], copy=False)
+    values = sma_series(close, window) if kind == "SMA" else rsi_series(close, window)
+    if len(cache) >= _CACHE_SIZE:
+        cache.pop(next(iter(cache)))
+    cache[key] = values
+    return values
+
+def _evaluate(params: Dict[str, Any]) -> Dict[str, Any]:
+    cfg = copy.deepcopy(_WORKER["cfg"])
+    cfg["strategy"].update(params)
+    s = cfg["strategy"]
+    indicators = {
+        "SMA_short": _series("SMA", s["sma_short_window"]),
+        "SMA_long": _series("SMA", s["sma_long_window"]),
+        "RSI": _series("RSI", s["rsi_window"]),
+    }
+    closes = _WORKER["closes"]
+    result = backtest_arrays(_WORKER["opens"], closes, np.arange(len(closes)), cfg,
+                             _WORKER["symbol_info"], indicators=indicators)
+    return {**params, **result.stats, "cache_hits": _WORKER["hits"], "cache_misses": _WORKER["misses"]}
+
+def _sort_key(params: Dict[str, Any]) -> Tuple:
+    return tuple(params.get(k, 0) for k in ("rsi_window", "sma_long_window", "sma_short_window"))
+
+def optimize(df: pd.DataFrame, cfg: Dict[str, Any], combos: List[Dict[str, Any]],
+             metric: str = "total_return", workers: Optional[int] = None,
+             symbol_info: Optional[SymbolInfo] = None) -> pd.DataFrame:
+    """Backteste chaque combinaison en parallèle ; retourne le tableau trié par `metric` décroissant"""
+    if not combos:
+        return pd.DataFrame()
+    workers = workers or os.cpu_count() or 1
+    n = len(df)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, 2 * n * 8))
+    try:
+        prices = np.ndarray((2, n), dtype=np.float64, buffer=shm.buf)
+        prices[0] = df["open"].to_numpy(dtype=np.float64)
+        prices[1] = df["close"].to_numpy(dtype=np.float64)
+        ordered = sorted(combos, key=_sort_key)
+        chunksize = max(1, len(ordered) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shm.name, n, cfg, symbol_info)) as pool:
+            rows = list(pool.map(_evaluate, ordered, chunksize=chunksize))
+        del prices
+    finally:
+        shm.close()
+        shm.unlink()
+    results = pd.DataFrame(rows).sort_values(metric, ascending=False, kind="stable")
+    results.insert(0, "rank", range(1, len(results) + 1))
+    return results.reset_index(drop=True)
+
+def _parse_values(raw: str) -> List[Any]:
+    values = []
+    for v in raw.split(","):
+        number = float(v)
+        values.append(int(number) if number.is_integer() and "." not in v else number)
+    return values
+
+def main(argv: Optional[List[str]] = None):
+    from config import load_config
+    parser = argparse.ArgumentParser(description="Optimisation des paramètres RSI/SMA")
+    parser.add_argument("--grid", nargs="+", required=True, help="param=v1,v2,... (section strategy)")
+    parser.add_argument("--random", type=int, default=0, help="nombre de combinaisons tirées au hasard")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--data", default=None, help="CSV ou symbole de l'archive")
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--metric", default="total_return")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="optimize_results.csv")
+    args = parser.parse_args(argv)
+
+    cfg = load_config()
+    space = {}
+    for item in args.grid:
+        key, _, raw = item.partition("=")
+        space[key] = _parse_values(raw)
+    if args.random:
+        combos = random_search(space, cfg["strategy"], args.random, args.seed)
+    else:
+        combos = param_grid(space, cfg["strategy"])
+    df = load_data(args.data or cfg.get("backtest", {}).get("data", "historical.csv"), cfg, args.start, args.end)
+    results = optimize(df, cfg, combos, args.metric, args.workers)
+    results.to_csv(args.out, index=False)
+    print(results.head(20).to_string(index=False))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,111 @@
+# src/panel.py
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+from candles import CandleStore
+
+def close_panel(store: CandleStore, symbols: Sequence[str], timeframe: str, length: int,
+                column: str = 'close') -> np.ndarray:
+    """Matrice (symbole x temps) des clôtures (ou de `column`), alignée à droite sur la dernière bougie.
+
+    Les symboles à l'historique plus court sont complétés par des NaN à gauche.
+    """
+    panel = np.full((len(symbols), length), np.nan)
+    for i, symbol in enumerate(symbols):
+        buf = store.get(symbol, timeframe)
+        if buf is None or len(buf) == 0:
+            continue
+        values = buf.column(column)[-length:]
+        panel[i, length - len(values):] = values
+    return panel
+
+def rolling_mean_2d(values: np.ndarray, window: int) -> np.ndarray:
+    """Moyenne glissante par ligne ; NaN tant que la fenêtre n'est pas pleine de valeurs"""
+    if window <= 0:
+        raise ValueError("window doit être > 0")
+    n, t = values.shape
+    out = np.full((n, t), np.nan)
+    if t < window:
+        return out
+    valid = ~np.isnan(values)
+    csum = np.cumsum(np.where(valid, values, 0.0), axis=1)
+    ccount = np.cumsum(valid, axis=1)
+    pad = np.zeros((n, 1))
+    csum = np.hstack([pad, csum])
+    ccount = np.hstack([pad, ccount])
+    sums = csum[:, window:] - csum[:, :-window]
+    counts = ccount[:, window:] - ccount[:, :-window]
+    out[:, window - 1:] = np.where(counts == window, sums / window, np.nan)
+    return out
+
+def wilder_rsi_2d(closes: np.ndarray, window: int) -> np.ndarray:
+    """RSI de Wilder par ligne, même récurrence que WilderRSI (ta / pandas ewm adjust=False).
+
+    La boucle porte sur le temps ; chaque pas est une opération vectorielle
+    sur tous les symboles. Seuls des NaN de tête (historique court) sont admis.
+    """
+    if window <= 0:
+        raise ValueError("window doit être > 0")
+    n, t = closes.shape
+    com = (1 - 1 / window) / (1 / window)
+    alpha = 1.0 / (1.0 + com)
+    keep = 1.0 - alpha
+    norm = keep + alpha
+    valid = ~np.isnan(closes)
+    with np.errstate(invalid='ignore'):
+        diff = np.diff(closes, axis=1, prepend=np.nan)
+        # ta : la 1ère diff (NaN) compte pour 0 ; tableaux (temps x symbole) contigus par pas
+        gains = np.ascontiguousarray(np.where(diff > 0, diff, 0.0).T)
+        losses = np.ascontiguousarray(np.where(diff < 0, -diff, 0.0).T)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), t)
+    starts = {j: first == j for j in np.unique(first) if j < t}
+    up_hist = np.empty((t, n))
+    down_hist = np.empty((t, n))
+    up = np.full(n, np.nan)
+    down = np.full(n, np.nan)
+    for j in range(t):
+        g, l = gains[j], losses[j]
+        up = np.where(up != g, (keep * up + alpha * g) / norm, up)
+        down = np.where(down != l, (keep * down + alpha * l) / norm, down)
+        start = starts.get(j)
+        if start is not None:
+            np.copyto(up, g, where=start)
+            np.copyto(down, l, where=start)
+        up_hist[j] = up
+        down_hist[j] = down
+    up_hist, down_hist = up_hist.T, down_hist.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = np.where(down_hist == 0, 100.0, 100 - (100 / (1 + up_hist / down_hist)))
+    return np.where(valid & (np.cumsum(valid, axis=1) >= window), rsi, np.nan)
+
+def compute_panel_indicators(closes: np.ndarray, strat_cfg: dict) -> Dict[str, np.ndarray]:
+    """Indicateurs de toute la matrice en une passe (mêmes clés que compute_indicators)"""
+    return {
+        'SMA_short': rolling_mean_2d(closes, strat_cfg['sma_short_window']),
+        'SMA_long': rolling_mean_2d(closes, strat_cfg['sma_long_window']),
+        'RSI': wilder_rsi_2d(closes, strat_cfg['rsi_window']),
+    }
+
+def panel_signals(symbols: Sequence[str], closes: np.ndarray, strategy,
+                  prices: Optional[np.ndarray] = None, volumes: Optional[np.ndarray] = None,
+                  ind: Optional[Dict[str, np.ndarray]] = None) -> List[Dict[str, Any]]:
+    """Candidats BUY/SELL de tout l'univers, au format retourné par analyze_symbol"""
+    ind = compute_panel_indicators(closes, strategy.config) if ind is None else ind
+    latest = {name: values[:, -1] for name, values in ind.items()} if closes.shape[1] else {}
+    if not latest:
+        return []
+    actions, confidence = strategy.evaluate_batch(latest['RSI'], latest['SMA_short'], latest['SMA_long'])
+    prices = closes[:, -1] if prices is None else prices
+    results = []
+    for i in np.flatnonzero(actions != 'HOLD'):
+        results.append({
+            'symbol': symbols[i],
+            'signal': {'action': str(actions[i]), 'confidence': float(confidence[i])},
+            'price': float(prices[i]),
+            'rsi': float(latest['RSI'][i]),
+            'sma_short': float(latest['SMA_short'][i]),
+            'sma_long': float(latest['SMA_long'][i]),
+            'volume': float(volumes[i]) if volumes is not None else 0.0,
+        })
+    return results
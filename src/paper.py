@@ -0,0 +1,134 @@
+# src/paper.py
+import asyncio
+import itertools
+import math
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+from ccxt.base.errors import BadSymbol, InsufficientFunds, InvalidOrder, NotSupported
+
+from guards import FilterTable
+from marketdata import BookStore, get_book
+
+# Tolérance relative sur le multiple de stepSize (représentation binaire)
+_STEP_EPS = 1e-9
+
+class PaperExchange:
+    """Exchange papier : les ordres market sont exécutés localement.
+
+    Les données de marché (fetch_ohlcv, fetch_ticker, exchangeInfo, ...) sont
+    déléguées à `upstream` (exchange ccxt live, ReplayExchange ou
+    RecordingExchange). Un ordre attend `latency` secondes puis s'exécute au
+    meilleur prix du carnet partagé (ask à l'achat, bid à la vente ; repli sur
+    fetch_ticker si le carnet est vide ou trop vieux). LOT_SIZE, NOTIONAL et
+    le solde disponible sont vérifiés comme le ferait Binance, et les frais
+    (`fee_pct` du notionnel) sont prélevés en quote. `on_fill` reçoit les
+    soldes après chaque exécution (persistance) ; restore() les reprend.
+    """
+
+    def __init__(self, upstream, balances: Optional[Dict[str, float]] = None, fee_pct: float = 0.001,
+                 latency: float = 0.0, book: Optional[BookStore] = None, book_max_age: Optional[float] = 5.0,
+                 filters: Optional[FilterTable] = None,
+                 on_fill: Optional[Callable[[Dict[str, float]], None]] = None):
+        self._upstream = upstream
+        self.balances: Dict[str, float] = {a: float(v) for a, v in (balances or {"USDT": 10_000.0}).items()}
+        self.fee_pct = float(fee_pct)
+        self.latency = float(latency)
+        self.book = book if book is not None else get_book()
+        self.book_max_age = book_max_age
+        self.filters = filters
+        self.fees_paid: Dict[str, float] = {}
+        self.stats: Counter = Counter()  # ordres exécutés / rejetés par motif
+        self._ids = itertools.count(1)
+        self.on_fill = on_fill
+
+    def restore(self, balances: Optional[Dict[str, float]]) -> bool:
+        """Reprend des soldes persistés ; sans soldes, les soldes initiaux sont conservés"""
+        if not balances:
+            return False
+        self.balances = {a: float(v) for a, v in balances.items()}
+        return True
+
+    def __getattr__(self, name: str):
+        return getattr(self._upstream, name)
+
+    async def _filter_table(self) -> FilterTable:
+        if self.filters is None:
+            self.filters = FilterTable.from_exchange_info(await self._upstream.publicGetExchangeInfo())
+        return self.filters
+
+    async def _top_of_book(self, symbol: str):
+        age = self.book.age(symbol)
+        if age is not None and (self.book_max_age is None or age <= self.book_max_age):
+            slot = self.book.slot(symbol)
+            return float(self.book.bid[slot]), float(self.book.ask[slot])
+        ticker = await self._upstream.fetch_ticker(symbol)
+        last = ticker.get("last") or ticker.get("close")
+        return float(ticker.get("bid") or last), float(ticker.get("ask") or last)
+
+    def _reject(self, exc_type, reason: str):
+        self.stats[f"rejected_{reason}"] += 1
+        raise exc_type(f"Filter failure: {reason}" if exc_type is InvalidOrder else reason)
+
+    async def fetch_balance(self, params=None) -> Dict[str, Any]:
+        free = dict(self.balances)
+        used = {a: 0.0 for a in free}
+        balance: Dict[str, Any] = {"free": free, "used": used, "total": dict(free)}
+        for asset, amount in free.items():
+            balance[asset] = {"free": amount, "used": 0.0, "total": amount}
+        return balance
+
+    async def create_order(self, symbol: str, type: str, side: str, amount: float, price: Optional[float] = None,
+                           params=None) -> Dict[str, Any]:
+        if type != "market":
+            raise NotSupported("Exchange papier : seuls les ordres market sont simulés")
+        side = side.lower()
+        base, _, quote = symbol.partition("/")
+        f = (await self._filter_table()).get(symbol)
+        if f is None or not quote:
+            self.stats["rejected_UNKNOWN_SYMBOL"] += 1
+            raise BadSymbol(f"Symbole inconnu : {symbol}")
+        qty = float(amount)
+        if f.has_lot_size:
+            if qty < f.min_qty or qty > f.max_qty:
+                self._reject(InvalidOrder, "LOT_SIZE")
+            if f.step_units > 0:
+                steps = qty * f.step_scale / f.step_units
+                if abs(steps - round(steps)) > _STEP_EPS * max(1.0, steps):
+                    self._reject(InvalidOrder, "LOT_SIZE")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        bid, ask = await self._top_of_book(symbol)
+        fill = ask if side == "buy" else bid
+        if not fill or math.isnan(fill):
+            self._reject(InvalidOrder, "NO_PRICE")
+        cost = fill * qty
+        if cost < f.min_notional:
+            self._reject(InvalidOrder, "NOTIONAL")
+        fee = cost * self.fee_pct
+        if side == "buy":
+            if self.balances.get(quote, 0.0) < cost + fee:
+                self._reject(InsufficientFunds, "INSUFFICIENT_BALANCE")
+            self.balances[quote] = self.balances.get(quote, 0.0) - cost - fee
+            self.balances[base] = self.balances.get(base, 0.0) + qty
+        else:
+            if self.balances.get(base, 0.0) < qty * (1 - _STEP_EPS):
+                self._reject(InsufficientFunds, "INSUFFICIENT_BALANCE")
+            self.balances[base] = max(0.0, self.balances.get(base, 0.0) - qty)
+            self.balances[quote] = self.balances.get(quote, 0.0) + cost - fee
+        self.fees_paid[quote] = self.fees_paid.get(quote, 0.0) + fee
+        self.stats["filled"] += 1
+        if self.on_fill is not None:
+            self.on_fill(self.balances)
+        now = int(time.time() * 1000)
+        return {
+            "id": str(next(self._ids)), "timestamp": now, "symbol": symbol, "type": type, "side": side,
+            "amount": qty, "filled": qty, "remaining": 0.0, "price": fill, "average": fill, "cost": cost,
+            "status": "closed", "fee": {"cost": fee, "currency": quote}, "trades": [],
+        }
+
+    async def close(self):
+        close = getattr(self._upstream, "close", None)
+        if close is not None:
+            await close()
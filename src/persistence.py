@@ -1,38 +1,190 @@
 # src/persistence.py
+import copy
 import json
 import os
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, Optional
 
-_STATE_PATH = os.environ.get("BOT_STATE_PATH", "state.json")
-
-_state: Dict[str, Any] = {
+_DEFAULT_STATE: Dict[str, Any] = {
     "positions": {},              # par symbole
     "entries": {},                # infos d'entrée par symbole
     "daily": {"date": None, "realized_pnl_quote": 0.0},
+    "paper_balances": {},         # soldes de l'exchange papier (mode paper uniquement)
 }
 
+# Compaction du journal en snapshot après ce nombre d'enregistrements
+_COMPACT_EVERY = 1000
+# Délai max entre deux fsync groupés du journal (secondes)
+_FSYNC_INTERVAL = 0.2
+
+_state: Dict[str, Any] = copy.deepcopy(_DEFAULT_STATE)
+_path: Optional[str] = None  # chemin imposé (paper / replay), prioritaire sur BOT_STATE_PATH
+_seq = 0  # numéro du dernier enregistrement appliqué
+
+def configure_path(path: Optional[str]):
+    """Impose le fichier d'état : les runs paper et replay ne touchent pas à l'état live"""
+    global _path
+    _path = path
+
+def _state_path() -> str:
+    return _path or os.environ.get("BOT_STATE_PATH", "state.json")
+
+def _journal_path() -> str:
+    return _state_path() + ".journal"
+
+class _Journal:
+    """Journal append-only : écriture immédiate, fsync groupés en tâche de fond"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._f = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._sync_loop, name="journal-fsync", daemon=True)
+        self._thread.start()
+
+    def append(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()  # visible par l'OS : survit à un crash du process
+            self.count += 1
+        self._dirty.set()
+
+    def sync(self):
+        with self._lock:
+            if not self._closed:
+                self._f.flush()
+                os.fsync(self._f.fileno())
+
+    def _sync_loop(self):
+        while not self._closed:
+            self._dirty.wait()
+            self._dirty.clear()
+            try:
+                self.sync()
+            except (OSError, ValueError):
+                pass
+            time.sleep(_FSYNC_INTERVAL)
+
+    def truncate(self):
+        with self._lock:
+            self._f.truncate(0)
+            self._f.seek(0)
+            self.count = 0
+
+    def close(self):
+        self.sync()
+        with self._lock:
+            self._closed = True
+            self._f.close()
+        self._dirty.set()
+
+_journal: Optional[_Journal] = None
+
+def _get_journal() -> _Journal:
+    global _journal
+    if _journal is None or _journal.path != _journal_path():
+        if _journal is not None:
+            _journal.close()
+        _journal = _Journal(_journal_path())
+    return _journal
+
+def _apply(st: Dict[str, Any], rec: Dict[str, Any]):
+    """Applique un enregistrement du journal à l'état (live et replay)"""
+    op = rec["op"]
+    if op == "set_position":
+        st["positions"][rec["symbol"]] = rec["position"]
+    elif op == "update_position":
+        pos = st["positions"].get(rec["symbol"])
+        if pos is not None:
+            pos.update(rec["fields"])
+    elif op == "clear_position":
+        st["positions"].pop(rec["symbol"], None)
+    elif op == "clear_positions":
+        st["positions"] = {}
+    elif op == "roll_daily":
+        st["daily"] = {"date": rec["date"], "realized_pnl_quote": 0.0}
+    elif op == "realized_pnl":
+        st["daily"]["realized_pnl_quote"] += rec["delta"]
+    elif op == "paper_balances":
+        st["paper_balances"] = rec["balances"]
+    else:
+        raise ValueError(f"Opération de journal inconnue: {op}")
+
+def record(op: str, **fields):
+    """Applique une mutation en mémoire et l'ajoute au journal (O(1) disque)"""
+    global _seq
+    rec = {"seq": _seq + 1, "op": op, **fields}
+    _apply(_state, rec)
+    _seq += 1
+    journal = _get_journal()
+    journal.append(rec)
+    if journal.count >= _COMPACT_EVERY:
+        save()
+
 def load() -> Dict[str, Any]:
-    global _state
-    if os.path.exists(_STATE_PATH):
+    """Snapshot + replay du journal ; un enregistrement tronqué (crash) arrête le replay"""
+    global _state, _seq, _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+    _state, _seq = copy.deepcopy(_DEFAULT_STATE), 0
+    if os.path.exists(_state_path()):
         try:
-            with open(_STATE_PATH, "r", encoding="utf-8") as f:
+            with open(_state_path(), "r", encoding="utf-8") as f:
                 _state = json.load(f)
+            _seq = int(_state.pop("_seq", 0))
         except Exception:
             pass
+    if os.path.exists(_journal_path()):
+        with open(_journal_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                if rec.get("seq", 0) <= _seq:
+                    continue  # déjà inclus dans le snapshot
+                _apply(_state, rec)
+                _seq = rec["seq"]
+        if os.path.getsize(_journal_path()) > 0:
+            # Repart d'un journal vide (élimine aussi une éventuelle ligne tronquée)
+            save()
     return _state
 
 def save():
-    with open(_STATE_PATH, "w", encoding="utf-8") as f:
-        json.dump(_state, f, ensure_ascii=False, indent=2)
+    """Snapshot complet atomique (tmp + fsync + rename) puis remise à zéro du journal"""
+    path = _state_path()
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({**_state, "_seq": _seq}, f, ensure_ascii=False, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    # Les enregistrements de seq <= _seq sont ignorés au replay : un crash ici reste sûr
+    if _journal is not None:
+        _journal.truncate()
+    elif os.path.exists(_journal_path()):
+        open(_journal_path(), "w").close()
+
+def flush():
+    """Force le fsync du journal (arrêt propre)"""
+    if _journal is not None:
+        _journal.sync()
 
 def state() -> Dict[str, Any]:
     return _state
 
 def roll_daily_if_needed(today_iso: str):
     if _state["daily"]["date"] != today_iso:
-        _state["daily"] = {"date": today_iso, "realized_pnl_quote": 0.0}
-        save()
+        record("roll_daily", date=today_iso)
 
 def update_realized_pnl(delta_quote: float):
-    _state["daily"]["realized_pnl_quote"] += float(delta_quote)
-    save()
+    record("realized_pnl", delta=float(delta_quote))
+
+def update_paper_balances(balances: Dict[str, float]):
+    record("paper_balances", balances=dict(balances))
@@ -1,28 +1,24 @@
 # src/positions.py
 import time
 from typing import Dict, Any, Optional, Union
-from persistence import state, save
+from persistence import state, record
 from metrics import open_positions
 
 def set_position(symbol: str, qty: float, entry_price: float):
     """Enregistre une nouvelle position"""
-    st = state()
-    st["positions"][symbol] = {
+    record("set_position", symbol=symbol, position={
         "qty": float(qty),
         "entry_price": float(entry_price),
         "timestamp": time.time(),
         "symbol": symbol
-    }
-    open_positions.set(len(st["positions"]))
-    save()
+    })
+    open_positions.set(len(state()["positions"]))
 
 def clear_position(symbol: str):
     """Supprime une position"""
-    st = state()
-    if symbol in st["positions"]:
-        del st["positions"][symbol]
-    open_positions.set(len(st["positions"]))
-    save()
+    if symbol in state()["positions"]:
+        record("clear_position", symbol=symbol)
+    open_positions.set(len(state()["positions"]))
 
 def get_position(symbol: str) -> Union[Dict[str, Any], None]:
     """Récupère les informations d'une position"""
@@ -34,13 +30,17 @@ def get_all_positions() -> Dict[str, Dict[str, Any]]:
 
 def update_position_qty(symbol: str, new_qty: float):
     """Met à jour la quantité d'une position"""
-    st = state()
-    if symbol in st["positions"]:
-        st["positions"][symbol]["qty"] = float(new_qty)
+    if symbol in state()["positions"]:
         if new_qty <= 0:
-            del st["positions"][symbol]
-        open_positions.set(len(st["positions"]))
-        save()
+            record("clear_position", symbol=symbol)
+        else:
+            record("update_position", symbol=symbol, fields={"qty": float(new_qty)})
+        open_positions.set(len(state()["positions"]))
+
+def update_position_high(symbol: str, high: float):
+    """Persiste le plus haut atteint depuis l'entrée (trailing stop)"""
+    if symbol in state()["positions"]:
+        record("update_position", symbol=symbol, fields={"high": float(high)})
 
 def get_position_pnl(symbol: str, current_price: float) -> Optional[float]:
     """Calcule le PnL d'une position"""
@@ -61,7 +61,5 @@ def get_total_portfolio_value(current_prices: Dict[str, float]) -> float:
 
 def close_all_positions():
     """Ferme toutes les positions (emergency stop)"""
-    st = state()
-    st["positions"] = {}
+    record("clear_positions")
     open_positions.set(0)
-    save()
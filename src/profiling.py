@@ -0,0 +1,122 @@
+# src/profiling.py
+import asyncio
+import cProfile
+import faulthandler
+import io
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+class CycleProfiler:
+    """Profilage à la demande des cycles de trading_loop.
+
+    `request(n)` (variable BOT_PROFILE_CYCLES, config ou SIGUSR1) arme un
+    cProfile sur les n cycles suivants ; chaque cycle est écrit dans `out_dir`
+    (cycle-<horodatage>-<n>.prof + métadonnées .json, lisibles par pstats ou
+    snakeviz). Avec `slow_threshold`, un cycle qui dépasse le seuil déclenche
+    une capture des piles de tous les threads pendant qu'il est encore en
+    cours, complétée par les piles des tâches asyncio à sa fin.
+    Désarmé et sans seuil, `cycle()` ne coûte qu'un appel de générateur.
+    """
+
+    def __init__(self, out_dir: str = "data/profiles", cycles: int = 0, slow_threshold: Optional[float] = None):
+        self.out_dir = out_dir
+        self.slow_threshold = slow_threshold if slow_threshold and slow_threshold > 0 else None
+        self.count = 0  # cycles exécutés
+        self._remaining = max(0, int(cycles))
+
+    @property
+    def armed(self) -> bool:
+        return self._remaining > 0
+
+    def request(self, cycles: int = 1):
+        """Profile les `cycles` prochains cycles (appelable depuis un handler de signal)"""
+        self._remaining = max(self._remaining, int(cycles))
+        logger.info(f"Profilage demandé pour {self._remaining} cycle(s)")
+
+    def _path(self, kind: str, ext: str) -> str:
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.out_dir, f"{kind}-{stamp}-{self.count}.{ext}")
+
+    def _snapshot(self, meta: Dict[str, Any], path: str):
+        """Piles de tous les threads (exécuté par le timer : la boucle est peut-être bloquée)"""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# cycle {self.count} > {self.slow_threshold}s, {json.dumps(meta, default=str)}\n")
+            f.flush()
+            faulthandler.dump_traceback(file=f, all_threads=True)
+        logger.warning(f"Cycle lent : piles écrites dans {path}")
+
+    @staticmethod
+    def _task_stacks() -> str:
+        buf = io.StringIO()
+        try:
+            tasks = asyncio.all_tasks()
+        except RuntimeError:
+            return ""
+        for task in tasks:
+            task.print_stack(limit=20, file=buf)
+        return buf.getvalue()
+
+    @contextmanager
+    def cycle(self, **meta) -> Iterator[Dict[str, Any]]:
+        """Enveloppe un cycle ; le dict produit reçoit les métadonnées du cycle"""
+        self.count += 1
+        if not self._remaining and self.slow_threshold is None:
+            yield meta
+            return
+        meta.update(cycle=self.count, started=time.time())
+        profile = None
+        if self._remaining:
+            self._remaining -= 1
+            profile = cProfile.Profile()
+        timer = None
+        slow_path = None
+        if self.slow_threshold is not None:
+            slow_path = self._path("slow", "txt")
+            timer = threading.Timer(self.slow_threshold, self._snapshot, (dict(meta), slow_path))
+            timer.daemon = True
+            timer.start()
+        t0 = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield meta
+        finally:
+            if profile is not None:
+                profile.disable()
+            meta["duration"] = time.perf_counter() - t0
+            if timer is not None:
+                timer.cancel()
+                timer.join()  # une capture en cours se termine avant l'ajout des tâches
+                if os.path.exists(slow_path):
+                    with open(slow_path, "a", encoding="utf-8") as f:
+                        f.write(f"\n# durée {meta['duration']:.3f}s - tâches asyncio\n{self._task_stacks()}")
+            if profile is not None:
+                path = self._path("cycle", "prof")
+                profile.dump_stats(path)
+                with open(path[:-len("prof")] + "json", "w", encoding="utf-8") as f:
+                    json.dump(meta, f, default=str)
+                logger.info(f"Profil du cycle {self.count} ({meta['duration']:.3f}s) écrit dans {path}")
+
+    def install_signal_handler(self, cycles: int = 3, signum: int = getattr(signal, "SIGUSR1", 0)) -> bool:
+        """`kill -USR1 <pid>` profile les `cycles` cycles suivants (POSIX uniquement)"""
+        if not signum:
+            return False
+        try:
+            asyncio.get_running_loop().add_signal_handler(signum, self.request, cycles)
+        except (NotImplementedError, RuntimeError, ValueError):
+            return False
+        return True
+
+def profiler_from_config(cfg: Dict[str, Any]) -> CycleProfiler:
+    prof_cfg = cfg.get("profiling", {})
+    cycles = int(os.environ.get("BOT_PROFILE_CYCLES", prof_cfg.get("cycles", 0)) or 0)
+    return CycleProfiler(prof_cfg.get("dir", "data/profiles"), cycles, prof_cfg.get("slow_cycle_seconds"))
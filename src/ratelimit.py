@@ -0,0 +1,197 @@
+# src/ratelimit.py
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ccxt.base.errors import DDoSProtection, RateLimitExceeded
+
+from metrics import record_rate_limit, record_ban
+
+logger = logging.getLogger(__name__)
+
+# Priorités d'admission (plus petit = servi en premier)
+PRIORITY_ORDER = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_MARKET_DATA = 2
+
+# Poids REST Binance spot par méthode ccxt ; les méthodes absentes valent DEFAULT_WEIGHT
+ENDPOINT_WEIGHTS: Dict[str, int] = {
+    "create_order": 1,
+    "cancel_order": 1,
+    "fetch_ohlcv": 2,
+    "fetch_ticker": 2,
+    "fetch_order_book": 5,
+    "fetch_balance": 20,
+    "fetch_open_orders": 6,
+    "load_markets": 20,
+    "fetch_tickers": 80,
+}
+DEFAULT_WEIGHT = 1
+
+# Code d'erreur Binance des dépassements de poids (429) ; son message annonce aussi les bans IP (418)
+BINANCE_WEIGHT_ERROR = -1003
+_BANNED_UNTIL = re.compile(r"banned until (\d+)")
+
+def _error_payload(text: Any) -> Dict[str, Any]:
+    """Corps d'erreur Binance {"code": ..., "msg": ...} d'une réponse ou d'une exception ccxt, {} sinon"""
+    if not isinstance(text, str) or "{" not in text:
+        return {}
+    try:
+        payload = json.loads(text[text.find("{"):text.rfind("}") + 1])
+    except ValueError:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+def _http_status(error: Exception) -> Optional[int]:
+    """Statut HTTP d'une erreur ccxt, de la forme « <exchange> <statut> <raison> <corps> »"""
+    parts = str(error).split(" ", 2)
+    return int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+
+class WeightScheduler:
+    """Ordonnanceur central des appels REST selon le poids Binance.
+
+    Les appels sont admis par un token bucket (poids / minute) ; la file est
+    triée par priorité, et une réserve de poids n'est accessible qu'aux
+    ordres pour qu'ils ne patientent jamais derrière un backfill de bougies.
+    Le poids consommé est recalé sur l'en-tête X-MBX-USED-WEIGHT-1M, et un
+    429/418 suspend toutes les admissions pendant Retry-After.
+    """
+
+    def __init__(self, exchange=None, weight_limit: int = 6000, window: float = 60.0,
+                 safety: float = 0.9, order_reserve: float = 0.1, retries: int = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        self.exchange = exchange
+        self.capacity = weight_limit * safety
+        self.rate = self.capacity / window
+        self.reserve = self.capacity * order_reserve
+        self.retries = retries
+        self._clock = clock
+        self._tokens = self.capacity
+        self._last = clock()
+        self.paused_until = 0.0
+        self._queue: List[list] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def _admissible(self, priority: int, weight: float) -> float:
+        """Délai avant admission possible (0 si admissible maintenant)"""
+        floor = 0.0 if priority == PRIORITY_ORDER else self.reserve
+        missing = weight + floor - self._tokens
+        return max(0.0, missing / self.rate)
+
+    async def _dispatch(self):
+        while self._queue:
+            self._refill()
+            pause = self.paused_until - self._clock()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            priority, _, weight, fut = self._queue[0]
+            if fut.done():
+                heapq.heappop(self._queue)
+                continue
+            delay = self._admissible(priority, weight)
+            if delay > 0:
+                # Réveillé plus tôt si un ordre (plus prioritaire) arrive entre-temps
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._queue)
+            self._tokens -= weight
+            fut.set_result(None)
+        self._dispatcher = None
+
+    async def acquire(self, weight: float, priority: int = PRIORITY_MARKET_DATA):
+        """Attend que `weight` soit disponible pour ce niveau de priorité"""
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, [priority, next(self._seq), weight, fut])
+        self._wakeup.set()
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await fut
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+
+    def _headers(self) -> Dict[str, Any]:
+        hdrs = getattr(self.exchange, "last_response_headers", None)
+        if not isinstance(hdrs, dict):
+            return {}
+        return {str(k).lower(): v for k, v in hdrs.items()}
+
+    def sync_used_weight(self, headers: Optional[Dict[str, Any]] = None):
+        """Recale le bucket sur le poids réellement consommé côté Binance"""
+        headers = headers if headers is not None else self._headers()
+        used = headers.get("x-mbx-used-weight-1m")
+        if used is None:
+            return
+        try:
+            remaining = self.capacity - float(used)
+        except (TypeError, ValueError):
+            return
+        self._refill()
+        self._tokens = min(self._tokens, remaining)
+
+    def _on_limit(self, error: Exception) -> bool:
+        """Suspend les admissions ; retourne True pour un ban (HTTP 418 ou -1003 "banned")"""
+        payload = _error_payload(str(error)) or _error_payload(getattr(self.exchange, "last_http_response", None))
+        msg = str(payload.get("msg", ""))
+        banned = _http_status(error) == 418 or (payload.get("code") == BINANCE_WEIGHT_ERROR and "banned" in msg)
+        retry_after = 120.0 if banned else 60.0
+        ra = self._headers().get("retry-after")
+        until = _BANNED_UNTIL.search(msg)
+        if ra is not None:
+            try:
+                retry_after = float(ra)
+            except (TypeError, ValueError):
+                pass
+        elif banned and until:
+            retry_after = max(0.0, int(until.group(1)) / 1000 - time.time())
+        self.paused_until = max(self.paused_until, self._clock() + retry_after)
+        self._tokens = min(self._tokens, 0.0)
+        if banned:
+            record_ban()
+            logger.critical(f"Ban IP (418) détecté, pause {retry_after:.0f}s")
+        else:
+            record_rate_limit()
+            logger.warning(f"Rate limit (429) atteint, pause {retry_after:.0f}s")
+        return banned
+
+    async def call(self, fn: Callable[..., Awaitable], *args, weight: Optional[float] = None,
+                   priority: int = PRIORITY_MARKET_DATA, **kwargs):
+        """Exécute `fn` une fois son poids admis ; réessaie les 429 hors ordres"""
+        if weight is None:
+            weight = ENDPOINT_WEIGHTS.get(getattr(fn, "__name__", ""), DEFAULT_WEIGHT)
+        attempts = 0
+        while True:
+            await self.acquire(weight, priority)
+            try:
+                result = await fn(*args, **kwargs)
+            except (RateLimitExceeded, DDoSProtection) as e:
+                banned = self._on_limit(e)
+                if banned or priority == PRIORITY_ORDER or attempts >= self.retries:
+                    raise
+                attempts += 1
+                continue
+            self.sync_used_weight()
+            return result
@@ -0,0 +1,171 @@
+# src/recorder.py
+import functools
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Méthodes REST enregistrées (réponses ccxt déjà décodées)
+RECORDED_METHODS = ("load_markets", "fetch_tickers", "fetch_ticker", "fetch_ohlcv", "fetch_balance",
+                    "publicGetExchangeInfo")
+# Délai max (secondes) avant qu'un enregistrement soit compressé et visible sur disque
+_FLUSH_INTERVAL = 1.0
+
+def rest_key(args: tuple) -> str:
+    """Clé d'une réponse REST : arguments positionnels (symbole, timeframe), sans since/limit"""
+    return "|".join(str(a) for a in args if not isinstance(a, dict))
+
+class _Segment:
+    def __init__(self, path: str, opened: float):
+        self.path = path
+        self.opened = opened
+        self.f = gzip.open(path, "at", encoding="utf-8", compresslevel=6)
+
+class Recorder:
+    """Enregistre les messages WebSocket bruts et les réponses REST.
+
+    Segments gzip horodatés par type : `<root>/ws-<epoch ms>.tsv.gz` (une
+    ligne `t<TAB>message brut`) et `<root>/rest-<epoch ms>.tsv.gz`
+    (`t<TAB>méthode<TAB>clé<TAB>réponse JSON`), t en secondes epoch à la
+    réception. Un segment est fermé toutes les `segment_seconds`. La boucle
+    asyncio ne fait que mettre les lignes en file : compression et écriture
+    ont lieu dans un thread, qui vide les segments sur disque au moins une
+    fois par seconde même sans nouveau message ; un crash ne perd donc que
+    la dernière seconde (le lecteur s'arrête au bloc tronqué).
+    """
+
+    def __init__(self, root: str, segment_seconds: float = 3600.0, clock: Callable[[], float] = time.time):
+        self.root = root
+        self.segment_seconds = segment_seconds
+        self._clock = clock
+        self._segments: Dict[str, _Segment] = {}
+        self._queue: "queue.SimpleQueue[Optional[Tuple[str, str, float]]]" = queue.SimpleQueue()
+        os.makedirs(root, exist_ok=True)
+        self._thread = threading.Thread(target=self._write_loop, name="recorder", daemon=True)
+        self._thread.start()
+
+    def _segment(self, kind: str, now: float) -> _Segment:
+        seg = self._segments.get(kind)
+        if seg is not None and now - seg.opened < self.segment_seconds:
+            return seg
+        if seg is not None:
+            seg.f.close()
+        path = os.path.join(self.root, f"{kind}-{int(now * 1000):013d}.tsv.gz")
+        seg = self._segments[kind] = _Segment(path, now)
+        return seg
+
+    def _flush(self):
+        for seg in self._segments.values():
+            seg.f.flush()
+
+    def _write_loop(self):
+        flushed = time.monotonic()
+        dirty = False
+        while True:
+            try:
+                item = self._queue.get(timeout=_FLUSH_INTERVAL)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            try:
+                if item:
+                    kind, line, now = item
+                    self._segment(kind, now).f.write(line)
+                    dirty = True
+                if dirty and time.monotonic() - flushed >= _FLUSH_INTERVAL:
+                    self._flush()
+                    flushed, dirty = time.monotonic(), False
+            except (OSError, ValueError) as e:
+                logger.error(f"Écriture de l'enregistrement impossible: {e}")
+        for seg in self._segments.values():
+            seg.f.close()
+        self._segments = {}
+
+    def ws(self, raw):
+        now = self._clock()
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        self._queue.put(("ws", f"{now:.6f}\t{raw}\n", now))
+
+    def rest(self, method: str, key: str, response: Any):
+        now = self._clock()
+        payload = json.dumps(response, separators=(",", ":"), default=str)
+        self._queue.put(("rest", f"{now:.6f}\t{method}\t{key}\t{payload}\n", now))
+
+    def close(self):
+        """Écrit les lignes en file puis ferme les segments"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+def _lines(path: str) -> Iterator[str]:
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.endswith("\n"):
+                    yield line[:-1]
+    except (EOFError, OSError, zlib.error):
+        logger.warning(f"Segment tronqué {path} : lecture arrêtée au dernier bloc valide")
+
+def read_segments(root: str, kind: str, start: Optional[float] = None,
+                  end: Optional[float] = None) -> Iterator[Tuple[float, ...]]:
+    """Enregistrements d'un type, dans l'ordre chronologique.
+
+    ws : (t, message brut) ; rest : (t, méthode, clé, réponse décodée)
+    """
+    for path in sorted(glob.glob(os.path.join(root, f"{kind}-*.tsv.gz"))):
+        for line in _lines(path):
+            t_str, _, rest = line.partition("\t")
+            t = float(t_str)
+            if start is not None and t < start:
+                continue
+            if end is not None and t >= end:
+                return
+            if kind == "rest":
+                method, key, payload = rest.split("\t", 2)
+                yield t, method, key, json.loads(payload)
+            else:
+                yield t, rest
+
+class RecordingExchange:
+    """Exchange ccxt dont les réponses REST de RECORDED_METHODS sont enregistrées"""
+
+    def __init__(self, exchange, recorder: Recorder):
+        self._exchange = exchange
+        self._recorder = recorder
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._exchange, name)
+        if name not in RECORDED_METHODS:
+            return attr
+
+        @functools.wraps(attr)
+        async def recorded(*args, **kwargs):
+            result = await attr(*args, **kwargs)
+            try:
+                self._recorder.rest(name, rest_key(args), result)
+            except Exception as e:
+                logger.error(f"Enregistrement {name} impossible: {e}")
+            return result
+        return recorded
+
+_RECORDER: Optional[Recorder] = None
+
+def configure_recorder(root: Optional[str], segment_seconds: float = 3600.0) -> Optional[Recorder]:
+    global _RECORDER
+    if _RECORDER is not None:
+        _RECORDER.close()
+    _RECORDER = Recorder(root, segment_seconds) if root else None
+    return _RECORDER
+
+def get_recorder() -> Optional[Recorder]:
+    return _RECORDER
@@ -0,0 +1,259 @@
+# src/replay.py
+import argparse
+import asyncio
+import bisect
+import copy
+import json
+import logging
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+from ccxt.base.errors import ExchangeError, NotSupported
+
+from recorder import RECORDED_METHODS, read_segments, rest_key
+
+logger = logging.getLogger(__name__)
+
+# Accélérations acceptées par le serveur de replay
+MIN_SPEED, MAX_SPEED = 1.0, 1000.0
+
+class ReplayClock:
+    """Temps enregistré <-> temps réel, accéléré `speed` fois à partir de start()"""
+
+    def __init__(self, t0: float, speed: float = 1.0):
+        self.t0 = t0
+        self.speed = max(float(speed), 1e-9)
+        self.wall0: Optional[float] = None
+
+    def start(self):
+        self.wall0 = time.time()
+
+    def now(self) -> float:
+        if self.wall0 is None:
+            return self.t0
+        return self.t0 + (time.time() - self.wall0) * self.speed
+
+    def wall_at(self, t: float) -> float:
+        return (self.wall0 or time.time()) + (t - self.t0) / self.speed
+
+def stream_name(data: Dict[str, Any]) -> str:
+    """Nom du stream d'un payload non combiné (/ws/<stream>)"""
+    s = str(data.get("s", "")).lower()
+    event = data.get("e")
+    if event == "kline":
+        return f"{s}@kline_{data['k']['i']}"
+    if event is None and "b" in data and "a" in data:
+        return f"{s}@bookTicker"
+    return f"{s}@{str(event).lower()}" if event else ""
+
+class _Client:
+    __slots__ = ("ws", "streams", "raw", "all_book")
+
+    def __init__(self, ws, streams: Set[str], raw: bool, all_book: bool = False):
+        self.ws = ws
+        self.streams = streams
+        self.raw = raw  # /ws/... : payload seul ; /stream : {"stream", "data"}
+        self.all_book = all_book
+
+    def wants(self, stream: str) -> bool:
+        return stream in self.streams or (self.all_book and stream.endswith("@bookTicker"))
+
+class ReplayServer:
+    """Serveur WebSocket local rejouant un enregistrement (src/recorder.py).
+
+    Même interface que stream.binance.com : /stream?streams=a/b (messages
+    combinés, SUBSCRIBE/UNSUBSCRIBE acceptés) et /ws/<stream> ou
+    /ws/!bookTicker. Les messages sont émis à leur horodatage d'origine,
+    accéléré `speed` fois (1 à 1000) ; tous les clients partagent la même
+    horloge, également utilisée par `exchange()` pour les réponses REST.
+    """
+
+    def __init__(self, root: str, speed: float = 1.0, host: str = "127.0.0.1", port: int = 0,
+                 start: Optional[float] = None, end: Optional[float] = None):
+        self.root = root
+        self.host = host
+        self.port = port
+        self.start_time = start
+        self.end_time = end
+        first = [rec[0] for kind in ("ws", "rest") for rec in self._first(kind)]
+        if not MIN_SPEED <= speed <= MAX_SPEED:
+            logger.warning(f"Accélération {speed:g} hors de [{MIN_SPEED:g}, {MAX_SPEED:g}], bornée")
+            speed = min(max(float(speed), MIN_SPEED), MAX_SPEED)
+        self.clock = ReplayClock(start if start is not None else min(first, default=time.time()), speed)
+        self.done = asyncio.Event()
+        self.sent = 0
+        self._clients: List[_Client] = []
+        self._server = None
+        self._pump_task: Optional[asyncio.Task] = None
+
+    def _first(self, kind: str):
+        for rec in read_segments(self.root, kind, self.start_time, self.end_time):
+            return [rec]
+        return []
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def exchange(self) -> "ReplayExchange":
+        return ReplayExchange(self.root, self.clock, self.end_time)
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.clock.start()
+        self._pump_task = asyncio.create_task(self._pump())
+        logger.info(f"Replay {self.root} x{self.clock.speed:g} sur {self.url}")
+
+    async def stop(self):
+        if self._pump_task:
+            self._pump_task.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, ws):
+        parts = urlsplit(ws.request.path)
+        if parts.path == "/stream":
+            streams = (parse_qs(parts.query).get("streams") or [""])[0]
+            client = _Client(ws, {s for s in streams.split("/") if s}, raw=False)
+        elif parts.path.startswith("/ws/"):
+            name = parts.path[len("/ws/"):]
+            client = _Client(ws, {name}, raw=True, all_book=name == "!bookTicker")
+        else:
+            await ws.close(code=1008, reason="chemin inconnu")
+            return
+        self._clients.append(client)
+        try:
+            async for raw in ws:
+                try:
+                    msg = json.loads(raw)
+                    params = msg.get("params") or []
+                    if msg.get("method") == "SUBSCRIBE":
+                        client.streams.update(params)
+                    elif msg.get("method") == "UNSUBSCRIBE":
+                        client.streams.difference_update(params)
+                    await ws.send(json.dumps({"result": None, "id": msg.get("id")}))
+                except (ValueError, AttributeError):
+                    continue
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._clients.remove(client)
+
+    async def _pump(self):
+        for t, raw in read_segments(self.root, "ws", self.start_time, self.end_time):
+            delay = self.clock.wall_at(t) - time.time()
+            if delay > 0.001:
+                await asyncio.sleep(delay)
+            if not self._clients:
+                continue
+            msg = json.loads(raw)
+            data = msg.get("data", msg) if "stream" in msg else msg
+            stream = msg.get("stream") or stream_name(data)
+            combined = raw if "stream" in msg else None
+            payload = None
+            for client in list(self._clients):
+                if not client.wants(stream):
+                    continue
+                if client.raw:
+                    payload = payload or json.dumps(data, separators=(",", ":"))
+                    out = payload
+                else:
+                    combined = combined or json.dumps({"stream": stream, "data": data}, separators=(",", ":"))
+                    out = combined
+                try:
+                    await client.ws.send(out)
+                    self.sent += 1
+                except websockets.ConnectionClosed:
+                    pass
+        self.done.set()
+        logger.info(f"Replay terminé : {self.sent} messages émis")
+
+class ReplayExchange:
+    """Stand-in ccxt : chaque appel REST retourne la dernière réponse enregistrée
+    à l'instant de l'horloge de replay (ou la première si aucune n'est antérieure)"""
+
+    def __init__(self, root: str, clock: ReplayClock, end: Optional[float] = None):
+        self._clock = clock
+        self._index: Dict[Tuple[str, str], Tuple[List[float], List[Any]]] = {}
+        for t, method, key, response in read_segments(root, "rest", None, end):
+            times, responses = self._index.setdefault((method, key), ([], []))
+            times.append(t)
+            responses.append(response)
+        self.calls: Counter = Counter()
+        self.last_response_headers: Dict[str, str] = {}
+
+    def _lookup(self, method: str, args: tuple):
+        self.calls[method] += 1
+        key = rest_key(args)
+        entry = self._index.get((method, key))
+        if entry is None:
+            raise ExchangeError(f"Replay : aucune réponse enregistrée pour {method}({key})")
+        times, responses = entry
+        i = bisect.bisect_right(times, self._clock.now()) - 1
+        return copy.deepcopy(responses[max(i, 0)])
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str = "1m", since: Optional[int] = None,
+                          limit: Optional[int] = None, params=None):
+        rows = self._lookup("fetch_ohlcv", (symbol, timeframe))
+        if since is not None:
+            rows = [r for r in rows if r[0] >= since]
+        return rows[-limit:] if limit else rows
+
+    def __getattr__(self, name: str):
+        if name not in RECORDED_METHODS:
+            raise AttributeError(name)
+
+        async def replayed(*args, **kwargs):
+            return self._lookup(name, args)
+        replayed.__name__ = name
+        return replayed
+
+    async def create_order(self, *args, **kwargs):
+        raise NotSupported("Replay : pas d'exécution d'ordres (dry_run ou exchange papier)")
+
+    async def close(self):
+        pass
+
+_REPLAY: Optional[ReplayServer] = None
+
+def configure_replay(root: Optional[str], speed: float = 1.0, port: int = 0) -> Optional[ReplayServer]:
+    global _REPLAY
+    _REPLAY = ReplayServer(root, speed, port=port) if root else None
+    return _REPLAY
+
+def get_replay() -> Optional[ReplayServer]:
+    return _REPLAY
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        import pandas as pd
+        return pd.Timestamp(value, tz="UTC").timestamp()
+
+async def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="Serveur de replay d'un enregistrement de marché")
+    parser.add_argument("--dir", default="data/recordings")
+    parser.add_argument("--speed", type=float, default=1.0, help="accélération (1 à 1000)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--start", default=None, help="epoch ou date (ex: 2024-05-01T00:00)")
+    parser.add_argument("--end", default=None)
+    args = parser.parse_args(argv)
+    server = ReplayServer(args.dir, args.speed, port=args.port,
+                          start=_parse_time(args.start), end=_parse_time(args.end))
+    await server.start()
+    print(f"Replay disponible sur {server.url} (bot.stream_url)")
+    await server.done.wait()
+    await server.stop()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(sys.argv[1:]))
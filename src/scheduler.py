@@ -0,0 +1,104 @@
+# src/scheduler.py
+import asyncio
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from candles import CandleBuffer, CandleStore, market_speed, market_time, timeframe_ms
+
+class CandleScheduler:
+    """Cadence de l'analyse calée sur les clôtures de bougie.
+
+    Réveil à chaque frontière de timeframe + `offset` secondes (latence de
+    publication de la bougie côté exchange), ou plus tôt sur un événement de
+    clôture du flux klines. Seuls les symboles ayant une nouvelle bougie
+    clôturée depuis leur dernière évaluation sont retournés par `due`.
+    Pour un buffer alimenté par le flux (`live`), la clôture est celle
+    publiée par le flux (k.x) : un symbole dont la clôture n'est pas encore
+    arrivée est différé, puis repris à l'horloge après `grace` secondes.
+    Sans `clock`, l'horloge du marché (candles.market_time) est utilisée : en
+    replay accéléré, les attentes sont raccourcies d'autant.
+    """
+
+    def __init__(self, timeframe: str, offset: float = 2.0, clock: Optional[Callable[[], float]] = None,
+                 grace: float = 10.0, settle: float = 0.25):
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_ms(timeframe)
+        self.offset = offset
+        self.grace = grace
+        self.settle = settle
+        self._clock = clock or market_time
+        self._speed = market_speed if clock is None else (lambda: 1.0)
+        self._evaluated: Dict[str, int] = {}  # symbole -> open time de la dernière bougie clôturée évaluée
+        self._reported: Dict[str, int] = {}  # symbole -> dernière clôture publiée par le flux klines
+        self._deferred_until: Optional[float] = None  # fin du délai de grâce des symboles différés
+
+    def next_wakeup(self, now: Optional[float] = None) -> float:
+        """Prochain instant (epoch, secondes) frontière de bougie + offset, strictement après `now`"""
+        now = self._clock() if now is None else now
+        tf = self.tf_ms / 1000.0
+        wake = (now - self.offset) // tf * tf + tf + self.offset
+        wake = wake if wake > now else wake + tf
+        if self._deferred_until is not None and now < self._deferred_until < wake:
+            return self._deferred_until
+        return wake
+
+    def on_closed(self, closed: Dict[str, int]):
+        """Enregistre les clôtures (symbole -> open time) publiées par le flux klines"""
+        for symbol, open_time in closed.items():
+            if open_time > self._reported.get(symbol, -1):
+                self._reported[symbol] = int(open_time)
+
+    async def wait(self, feed=None) -> Dict[str, int]:
+        """Attend la prochaine frontière ; avec un KlineFeed, retourne dès les premières clôtures reçues"""
+        delay = max(0.0, self.next_wakeup() - self._clock()) / self._speed()
+        if feed is None:
+            await asyncio.sleep(delay)
+            return {}
+        closed = await feed.wait_closed(delay, self.settle / self._speed())
+        self.on_closed(closed)
+        return closed
+
+    def last_closed(self, buf: Optional[CandleBuffer], now: Optional[float] = None) -> Optional[int]:
+        """Open time de la dernière bougie clôturée du buffer"""
+        if buf is None or len(buf) == 0:
+            return None
+        now_ms = (self._clock() if now is None else now) * 1000
+        ts = buf.timestamps()
+        i = int(np.searchsorted(ts, now_ms - self.tf_ms, side='right')) - 1
+        return int(ts[i]) if i >= 0 else None
+
+    def closed_open_time(self, store: CandleStore, symbol: str, now: Optional[float] = None) -> Optional[int]:
+        """Dernière clôture à évaluer : publiée par le flux si le buffer est live, sinon déduite de l'horloge"""
+        buf = store.get(symbol, self.timeframe)
+        now = self._clock() if now is None else now
+        last = self.last_closed(buf, now)
+        if buf is None or not buf.live:
+            return last
+        reported = self._reported.get(symbol)
+        if last is None or (reported is not None and reported >= last):
+            return reported
+        deadline = (last + self.tf_ms) / 1000.0 + self.grace
+        if now < deadline:
+            # Clôture pas encore reçue du flux : la bougie du buffer peut être incomplète
+            if self._deferred_until is None or deadline < self._deferred_until:
+                self._deferred_until = deadline
+            return reported
+        return last  # flux muet au-delà du délai de grâce : repli sur l'horloge
+
+    def due(self, store: CandleStore, symbols: Sequence[str], now: Optional[float] = None) -> List[str]:
+        """Symboles à évaluer : nouvelle bougie clôturée, ou jamais évalués"""
+        self._deferred_until = None
+        due = []
+        for symbol in symbols:
+            last = self.closed_open_time(store, symbol, now)
+            seen = self._evaluated.get(symbol)
+            if seen is None or (last is not None and last > seen):
+                due.append(symbol)
+        return due
+
+    def mark(self, store: CandleStore, symbols: Sequence[str], now: Optional[float] = None):
+        for symbol in symbols:
+            last = self.closed_open_time(store, symbol, now)
+            if last is not None and last > self._evaluated.get(symbol, -1):
+                self._evaluated[symbol] = last
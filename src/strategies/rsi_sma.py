@@ -1,4 +1,5 @@
 # src/strategies/rsi_sma.py
+import numpy as np
 import pandas as pd
 from strategies.base import BaseStrategy
 
@@ -12,8 +13,10 @@ class RSISMAStrategy(BaseStrategy):
         """Génère un signal de trading basé sur RSI < 30 et SMA_short > SMA_long"""
         if df is None or len(df) == 0:
             return {'action': 'HOLD', 'confidence': 0.0}
+        return self.evaluate(df.iloc[-1])
 
-        latest = df.iloc[-1]
+    def evaluate(self, latest):
+        """Applique les règles sur les dernières valeurs d'indicateurs (ligne ou dict)"""
         if any(pd.isna(latest[ind]) for ind in self.get_required_indicators()):
             return {'action': 'HOLD', 'confidence': 0.0}
 
@@ -35,6 +38,24 @@ class RSISMAStrategy(BaseStrategy):
 
         return {'action': 'HOLD', 'confidence': 0.5}
 
+    def evaluate_batch(self, rsi, sma_short, sma_long):
+        """Mêmes règles qu'evaluate sur des tableaux : retourne (actions, confidences)"""
+        rsi = np.asarray(rsi, dtype=np.float64)
+        sma_short = np.asarray(sma_short, dtype=np.float64)
+        sma_long = np.asarray(sma_long, dtype=np.float64)
+        rsi_buy, rsi_sell = self.config['rsi_buy'], self.config['rsi_sell']
+        known = ~(np.isnan(rsi) | np.isnan(sma_short) | np.isnan(sma_long))
+        buy = known & (rsi < rsi_buy) & (sma_short > sma_long)
+        sell = known & ~buy & (rsi > rsi_sell) & (sma_short < sma_long)
+
+        actions = np.full(len(rsi), 'HOLD', dtype=object)
+        actions[buy] = 'BUY'
+        actions[sell] = 'SELL'
+        confidence = np.where(known, 0.5, 0.0)
+        confidence = np.where(buy, np.minimum(0.9, (rsi_buy - rsi) / rsi_buy * 0.5 + 0.4), confidence)
+        confidence = np.where(sell, np.minimum(0.9, (rsi - rsi_sell) / (100 - rsi_sell) * 0.5 + 0.4), confidence)
+        return actions, confidence
+
     def validate_signal(self, signal, symbol_info=None):
         """Validation du signal (peut être étendue)"""
         return signal['confidence'] >= 0.3
@@ -0,0 +1,117 @@
+# src/triggers.py
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from marketdata import stream_id
+from positions import update_position_high
+
+logger = logging.getLogger(__name__)
+
+# Hausse relative du plus haut avant de le réécrire dans le journal
+_PERSIST_STEP = 0.001
+
+class _Levels:
+    __slots__ = ("symbol", "qty", "entry", "take_profit", "high", "stop", "persisted", "fired")
+
+    def __init__(self, symbol: str, qty: float, entry: float, take_profit: float, high: float, stop: float):
+        self.symbol = symbol
+        self.qty = qty
+        self.entry = entry
+        self.take_profit = take_profit
+        self.high = high
+        self.stop = stop
+        self.persisted = high
+        self.fired = False
+
+class TriggerIndex:
+    """Niveaux TP/SL précalculés par symbole, testés à chaque tick bookTicker.
+
+    Le take-profit est fixe depuis l'entrée ; le stop suit le plus haut atteint
+    (trailing_stop_pct sous le high-water mark, persisté dans l'état). Un tick
+    coûte une recherche dans un dict et deux comparaisons ; un niveau franchi
+    est désarmé et `on_trigger(symbol, qty, price, reason)` est appelé une fois.
+    """
+
+    def __init__(self, take_profit_pct: float = 0.05, trailing_stop_pct: float = 0.02,
+                 on_trigger: Optional[Callable[[str, float, float, str], Any]] = None):
+        self.take_profit_pct = float(take_profit_pct)
+        self.trailing_stop_pct = float(trailing_stop_pct)
+        self.on_trigger = on_trigger
+        self._levels: Dict[str, _Levels] = {}  # 'BTCUSDT' -> niveaux
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def __contains__(self, symbol: str) -> bool:
+        return stream_id(symbol) in self._levels
+
+    def levels(self, symbol: str) -> Optional[Tuple[float, float]]:
+        """(take-profit, stop) courants du symbole"""
+        lv = self._levels.get(stream_id(symbol))
+        return None if lv is None else (lv.take_profit, lv.stop)
+
+    def arm(self, symbol: str, qty: float, entry_price: float, high: Optional[float] = None):
+        high = max(float(entry_price), float(high or 0.0))
+        self._levels[stream_id(symbol)] = _Levels(
+            symbol, float(qty), float(entry_price), float(entry_price) * (1 + self.take_profit_pct),
+            high, high * (1 - self.trailing_stop_pct))
+
+    def disarm(self, symbol: str):
+        self._levels.pop(stream_id(symbol), None)
+
+    def sync(self, positions: Dict[str, Dict[str, Any]], skip: Optional[Callable[[str], bool]] = None):
+        """Aligne l'index sur les positions ; réarme un déclencheur dont la vente a échoué"""
+        wanted = {stream_id(s): s for s in positions}
+        for sid in [sid for sid in self._levels if sid not in wanted]:
+            del self._levels[sid]
+        for sid, symbol in wanted.items():
+            pos = positions[symbol]
+            lv = self._levels.get(sid)
+            if lv is not None and not lv.fired and lv.qty == pos["qty"] and lv.entry == pos["entry_price"]:
+                continue
+            if lv is not None and lv.fired and skip is not None and skip(symbol):
+                continue  # vente encore en cours
+            self.arm(symbol, pos["qty"], pos["entry_price"], pos.get("high"))
+
+    def check(self, symbol: str, price: float) -> Optional[Tuple[str, float, float, str]]:
+        """Teste un prix ; retourne (symbole, qty, prix, raison) si un niveau est franchi"""
+        lv = self._levels.get(symbol)
+        if lv is None:
+            lv = self._levels.get(stream_id(symbol))
+            if lv is None:
+                return None
+        if lv.fired:
+            return None
+        if price >= lv.take_profit:
+            reason = "TAKE_PROFIT"
+        elif price <= lv.stop:
+            reason = "STOP_LOSS"
+        else:
+            if price > lv.high:
+                lv.high = price
+                lv.stop = price * (1 - self.trailing_stop_pct)
+                if price >= lv.persisted * (1 + _PERSIST_STEP):
+                    lv.persisted = price
+                    update_position_high(lv.symbol, price)
+            return None
+        lv.fired = True
+        return lv.symbol, lv.qty, price, reason
+
+    def on_tick(self, symbol: str, bid: float, ask: float):
+        """Listener BookStore : une vente se fait au bid"""
+        fired = self.check(symbol, bid)
+        if fired is not None and self.on_trigger is not None:
+            logger.info(f"{fired[3]} {fired[0]} @ {bid}")
+            self.on_trigger(*fired)
+
+_TRIGGERS: Optional[TriggerIndex] = None
+
+def configure_triggers(strat_cfg: Dict[str, Any],
+                       on_trigger: Optional[Callable[[str, float, float, str], Any]] = None) -> TriggerIndex:
+    global _TRIGGERS
+    _TRIGGERS = TriggerIndex(strat_cfg.get("take_profit_pct", 0.05), strat_cfg.get("trailing_stop_pct", 0.02),
+                             on_trigger)
+    return _TRIGGERS
+
+def get_triggers() -> Optional[TriggerIndex]:
+    return _TRIGGERS
@@ -0,0 +1,87 @@
+# src/universe.py
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Any, List, Optional
+
+import numpy as np
+
+from utils import with_rate_limit_retry
+
+logger = logging.getLogger(__name__)
+
+def select_universe(markets: Dict[str, Dict[str, Any]], tickers: Dict[str, Dict[str, Any]],
+                    filter_bases: List[str], volume_threshold: float = 0.0, max_symbols: int = 50) -> List[str]:
+    """Filtre vectoriel des marchés spot actifs, triés par volume quote décroissant"""
+    if not markets:
+        return []
+    symbols = np.array(list(markets), dtype=object)
+    values = list(markets.values())
+    active = np.fromiter((bool(m.get('active', True)) and m.get('type', 'spot') == 'spot' for m in values),
+                         dtype=bool, count=len(values))
+    bases = set(filter_bases or [])
+    in_bases = np.fromiter((m.get('base') in bases or m.get('quote') in bases for m in values),
+                           dtype=bool, count=len(values))
+    volume = np.fromiter((float((tickers.get(s) or {}).get('quoteVolume') or 0.0) for s in symbols),
+                         dtype=np.float64, count=len(symbols))
+    mask = active & in_bases
+    if volume_threshold > 0:
+        mask &= volume >= volume_threshold
+    idx = np.flatnonzero(mask)
+    # Tri stable : à volume égal, l'ordre de load_markets est conservé
+    idx = idx[np.argsort(-volume[idx], kind='stable')][:max_symbols]
+    return symbols[idx].tolist()
+
+class Universe:
+    """Univers de symboles tradables, sélectionné en un seul appel fetch_tickers.
+
+    Le résultat est mis en cache et rafraîchi périodiquement en tâche de fond.
+    """
+
+    def __init__(self, exchange, cfg: Dict[str, Any]):
+        self.exchange = exchange
+        self.cfg = cfg
+        self.symbols: List[str] = []
+        self.updated_at = 0.0
+        # Appelés avec la nouvelle liste quand l'univers change (abonnements WS...)
+        self.listeners: List[Callable[[List[str]], None]] = []
+
+    @property
+    def refresh_seconds(self) -> float:
+        return float(self.cfg["bot"].get("universe_refresh_minutes", 60)) * 60
+
+    async def refresh(self) -> List[str]:
+        bot = self.cfg["bot"]
+        # reload : sans lui ccxt resert ses marchés en cache (ni nouveaux listings ni delistings)
+        markets = await with_rate_limit_retry(self.exchange.load_markets, reload=True)
+        tickers: Dict[str, Dict[str, Any]] = {}
+        if float(bot.get("volume_threshold", 0)) > 0:
+            # Un seul appel /ticker/24hr pour tout le marché au lieu d'un fetch_ticker par symbole
+            tickers = await with_rate_limit_retry(self.exchange.fetch_tickers)
+        self.symbols = select_universe(
+            markets, tickers,
+            bot.get("filter_bases", []),
+            float(bot.get("volume_threshold", 0)),
+            int(bot.get("max_symbols", 50)),
+        )
+        self.updated_at = time.time()
+        return self.symbols
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        return (time.time() if now is None else now) - self.updated_at >= self.refresh_seconds
+
+    async def run(self):
+        """Rafraîchit l'univers en tâche de fond"""
+        while True:
+            await asyncio.sleep(max(0.0, self.updated_at + self.refresh_seconds - time.time()))
+            try:
+                before = set(self.symbols)
+                await self.refresh()
+                added, removed = set(self.symbols) - before, before - set(self.symbols)
+                if added or removed:
+                    logger.info(f"Univers mis à jour: +{len(added)} -{len(removed)} ({len(self.symbols)} symboles)")
+                    for listener in self.listeners:
+                        listener(self.symbols)
+            except Exception as e:
+                logger.error(f"Erreur rafraîchissement univers: {e}")
+                self.updated_at = time.time()  # nouvelle tentative au prochain intervalle
@@ -3,35 +3,82 @@ import asyncio
 import time
 from typing import Dict, Any, Callable, Awaitable, Optional
 
-from ccxt.base.errors import ExchangeError
+from ccxt.base.errors import DDoSProtection, RateLimitExceeded
+
+from guards import FilterTable, SymbolFilters
+from metrics import record_cache
+from ratelimit import WeightScheduler, PRIORITY_MARKET_DATA
 
 _EXINFO_CACHE: Dict[str, Any] = {}
 _EXINFO_TS = 0.0
 _EXINFO_TTL = 600.0  # 10 minutes
+# Index symbole -> entrée brute et filtres compilés, reconstruits à chaque rafraîchissement
+_EXINFO_INDEX: Dict[str, Dict[str, Any]] = {}
+_FILTER_TABLE = FilterTable({})
+_SCHEDULER: Optional[WeightScheduler] = None
 
 async def get_exchange_info(exchange) -> Dict[str, Any]:
-    global _EXINFO_CACHE, _EXINFO_TS
     now = time.time()
     if _EXINFO_CACHE and now - _EXINFO_TS < _EXINFO_TTL:
+        record_cache("exchange_info", True)
         return _EXINFO_CACHE
+    record_cache("exchange_info", False)
     # ccxt binance: endpoint brut
-    info = await exchange.publicGetExchangeInfo()
-    _EXINFO_CACHE = info
-    _EXINFO_TS = now
+    info = await with_rate_limit_retry(exchange.publicGetExchangeInfo, weight=20)
+    prime_exchange_info(info, now)
     return info
 
+def prime_exchange_info(info: Dict[str, Any], ts: Optional[float] = None):
+    """Installe un exchangeInfo (réponse fraîche ou snapshot de démarrage), valable _EXINFO_TTL après ts"""
+    global _EXINFO_CACHE, _EXINFO_TS, _EXINFO_INDEX, _FILTER_TABLE
+    _EXINFO_INDEX = {s["symbol"]: s for s in info.get("symbols", []) if s.get("symbol")}
+    _FILTER_TABLE = FilterTable.from_exchange_info(info)
+    _EXINFO_CACHE = info
+    _EXINFO_TS = time.time() if ts is None else ts
+
+def cached_exchange_info() -> Dict[str, Any]:
+    """Dernier exchangeInfo téléchargé, {} si aucun"""
+    return _EXINFO_CACHE
+
+def exchange_info_timestamp() -> float:
+    """Instant (epoch, secondes) du téléchargement de l'exchangeInfo en cache, 0 si aucun"""
+    return _EXINFO_TS
+
 async def get_symbol_info(exchange, symbol: str) -> Dict[str, Any]:
-    info = await get_exchange_info(exchange)
-    for s in info.get("symbols", []):
-        if s.get("symbol") == symbol.replace("/", ""):
-            return s
-    raise KeyError(f"Symbol info not found for {symbol}")
+    await get_exchange_info(exchange)
+    s = _EXINFO_INDEX.get(symbol.replace("/", ""))
+    if s is None:
+        raise KeyError(f"Symbol info not found for {symbol}")
+    return s
+
+async def get_filter_table(exchange) -> FilterTable:
+    await get_exchange_info(exchange)
+    return _FILTER_TABLE
+
+async def get_symbol_filters(exchange, symbol: str) -> SymbolFilters:
+    """Filtres compilés du symbole, directement utilisables par prepare_order"""
+    await get_exchange_info(exchange)
+    f = _FILTER_TABLE.get(symbol)
+    if f is None:
+        raise KeyError(f"Symbol info not found for {symbol}")
+    return f
+
+def set_scheduler(scheduler: Optional[WeightScheduler]):
+    """Installe l'ordonnanceur de poids utilisé par with_rate_limit_retry"""
+    global _SCHEDULER
+    _SCHEDULER = scheduler
+
+def get_scheduler() -> Optional[WeightScheduler]:
+    return _SCHEDULER
 
-async def with_rate_limit_retry(fn: Callable[..., Awaitable], *args, **kwargs):
+async def with_rate_limit_retry(fn: Callable[..., Awaitable], *args, weight: Optional[float] = None,
+                                priority: int = PRIORITY_MARKET_DATA, **kwargs):
     """Enveloppe d'appel avec respect de Retry-After en cas de 429/418."""
+    if _SCHEDULER is not None:
+        return await _SCHEDULER.call(fn, *args, weight=weight, priority=priority, **kwargs)
     try:
         return await fn(*args, **kwargs)
-    except ExchangeError as e:
+    except (RateLimitExceeded, DDoSProtection) as e:
         # ccxt n'expose pas toujours headers; fallback 60s
         retry_after = 60
         hdrs = getattr(e, "response_headers", None)
@@ -0,0 +1,167 @@
+# src/warmstart.py
+import asyncio
+import logging
+import os
+import pickle
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from cache import OHLCVCache
+from candles import timeframe_ms
+from indicators import IndicatorBank
+from utils import cached_exchange_info, exchange_info_timestamp, prime_exchange_info
+
+logger = logging.getLogger(__name__)
+
+# Incrémenté à chaque changement de format : un snapshot d'une autre version est ignoré
+SNAPSHOT_VERSION = 2
+
+class WarmStart:
+    """Snapshot de démarrage à chaud : exchangeInfo, univers, bougies et indicateurs.
+
+    Écrit périodiquement (fichier pickle remplacé atomiquement) et relu au
+    démarrage. Un snapshot plus vieux que `max_age`, d'une autre version ou
+    d'un autre timeframe est ignoré ; les buffers trop anciens pour un
+    rafraîchissement incrémental sont écartés et les moteurs d'indicateurs
+    ne sont repris que si la configuration de stratégie est identique.
+    Seul le delta depuis le snapshot est ensuite téléchargé.
+    """
+
+    def __init__(self, path: str, max_age: float = 6 * 3600.0, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.max_age = max_age
+        self._clock = clock
+        self._sources: Optional[tuple] = None
+
+    def attach(self, cache: OHLCVCache, cfg: Dict[str, Any], universe=None, indicators: Optional[IndicatorBank] = None):
+        """Objets capturés par save() et run()"""
+        self._sources = (cache, cfg, universe, indicators)
+
+    def capture(self) -> Optional[Dict[str, Any]]:
+        """Copie de l'état courant, à prendre dans la boucle asyncio (aucune écriture concurrente)"""
+        if self._sources is None:
+            return None
+        cache, cfg, universe, indicators = self._sources
+        timeframe = cfg["bot"]["timeframe"]
+        candles = {}
+        for symbol, tf in cache.store.keys():
+            buf = cache.store.get(symbol, tf)
+            if tf == timeframe and len(buf):
+                candles[symbol] = (buf.timestamps().copy(), buf.view().copy())
+        engines = b""
+        if indicators is not None:
+            engines = pickle.dumps({s: e for (s, tf), e in indicators._engines.items() if tf == timeframe},
+                                   protocol=pickle.HIGHEST_PROTOCOL)
+        return {
+            "version": SNAPSHOT_VERSION,
+            "written_at": self._clock(),
+            "timeframe": timeframe,
+            "strategy": dict(cfg["strategy"]),
+            "exchange_info": cached_exchange_info(),
+            "exchange_info_at": exchange_info_timestamp(),
+            "universe": list(universe.symbols) if universe is not None else [],
+            "universe_at": universe.updated_at if universe is not None else 0.0,
+            "candles": candles,
+            "indicators": engines,
+        }
+
+    def write(self, snapshot: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def save(self) -> bool:
+        snapshot = self.capture()
+        if snapshot is None:
+            return False
+        self.write(snapshot)
+        return True
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """Snapshot validé (version, âge), None si absent, illisible ou périmé"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Snapshot {self.path} illisible, démarrage à froid: {e}")
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+            logger.warning(f"Snapshot {self.path} d'une autre version, ignoré")
+            return None
+        age = self._clock() - float(snapshot.get("written_at", 0.0))
+        if age > self.max_age:
+            logger.info(f"Snapshot {self.path} trop ancien ({age / 60:.0f} min), ignoré")
+            return None
+        return snapshot
+
+    def restore(self, cache: OHLCVCache, cfg: Dict[str, Any], universe=None,
+                indicators: Optional[IndicatorBank] = None) -> Dict[str, int]:
+        """Recharge le snapshot dans le cache, l'univers, exchangeInfo et les indicateurs.
+
+        Retourne le nombre d'éléments repris par catégorie.
+        """
+        restored = {"exchange_info": 0, "universe": 0, "candles": 0, "indicators": 0}
+        snapshot = self.read()
+        timeframe = cfg["bot"]["timeframe"]
+        if snapshot is None or snapshot.get("timeframe") != timeframe:
+            return restored
+        info = snapshot.get("exchange_info") or {}
+        trading = {s["symbol"] for s in info.get("symbols", []) if s.get("status", "TRADING") == "TRADING"}
+        if trading:
+            # Filtres du snapshot utilisés jusqu'à l'expiration du TTL compté depuis leur téléchargement
+            prime_exchange_info(info, float(snapshot.get("exchange_info_at", 0.0)))
+            restored["exchange_info"] = len(trading)
+        symbols = snapshot.get("universe") or []
+        if universe is not None and symbols and trading and all(s.replace("/", "") in trading for s in symbols):
+            universe.symbols = list(symbols)
+            universe.updated_at = float(snapshot.get("universe_at", 0.0))
+            restored["universe"] = len(symbols)
+        # Au-delà de `limit` bougies manquantes, refresh_buffer recharge tout : inutile de reprendre
+        horizon = self._clock() * 1000 - int(cfg["bot"]["limit"]) * timeframe_ms(timeframe)
+        for symbol, (ts, values) in snapshot.get("candles", {}).items():
+            if not len(ts) or ts[-1] < horizon:
+                continue
+            buf = cache.store.buffer(symbol, timeframe)
+            if len(buf) == 0:
+                buf.merge(np.column_stack([ts, values.T]))
+                restored["candles"] += 1
+        if indicators is not None and snapshot.get("indicators") and snapshot.get("strategy") == cfg["strategy"]:
+            try:
+                engines = pickle.loads(snapshot["indicators"])
+            except Exception as e:
+                logger.warning(f"Indicateurs du snapshot illisibles: {e}")
+                engines = {}
+            for symbol, engine in engines.items():
+                if cache.store.get(symbol, timeframe) is not None:
+                    indicators._engines[(symbol, timeframe)] = engine
+                    restored["indicators"] += 1
+        logger.info(f"Démarrage à chaud depuis {self.path}: {restored}")
+        return restored
+
+    async def run(self, interval: float):
+        """Écrit un snapshot toutes les `interval` secondes (écriture disque hors boucle)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                snapshot = self.capture()
+                if snapshot is not None:
+                    await loop.run_in_executor(None, self.write, snapshot)
+            except Exception as e:
+                logger.error(f"Écriture du snapshot {self.path} impossible: {e}")
+
+_WARMSTART: Optional[WarmStart] = None
+
+def configure_warmstart(path: Optional[str], max_age: float = 6 * 3600.0) -> Optional[WarmStart]:
+    global _WARMSTART
+    _WARMSTART = WarmStart(path, max_age) if path else None
+    return _WARMSTART
+
+def get_warmstart() -> Optional[WarmStart]:
+    return _WARMSTART
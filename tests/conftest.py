@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Les modules de src/ s'importent entre eux en absolu (PYTHONPATH=src en production)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,91 @@
+# tests/test_account.py
+import asyncio
+import json
+
+import pytest
+import websockets
+from src.account import AccountState, UserDataStream
+
+class _FakeExchange:
+    def __init__(self):
+        self.balance_calls = 0
+
+    async def publicPostUserDataStream(self):
+        return {"listenKey": "abc123"}
+
+    async def publicPutUserDataStream(self, params):
+        return {}
+
+    async def fetch_balance(self):
+        self.balance_calls += 1
+        return {"free": {"USDT": 1000.0, "BTC": 0.0}, "used": {"USDT": 0.0}, "total": {"USDT": 1000.0},
+                "timestamp": 1000}
+
+def test_apply_events():
+    acct = AccountState()
+    acct.apply_balance({"free": {"USDT": 100.0}, "used": {"USDT": 5.0}})
+    acct.apply_event({"e": "executionReport", "i": 7, "s": "BTCUSDT", "S": "BUY", "X": "NEW", "q": "0.1", "z": "0"})
+    assert acct.orders[7]["status"] == "NEW"
+    acct.apply_event({"e": "executionReport", "i": 7, "X": "FILLED"})
+    acct.apply_event({"e": "outboundAccountPosition", "B": [{"a": "USDT", "f": "40.5", "l": "0"},
+                                                            {"a": "BTC", "f": "0.1", "l": "0"}]})
+    acct.apply_event({"e": "balanceUpdate", "a": "USDT", "d": "9.5"})
+    assert acct.orders == {}
+    assert acct.free_balance("USDT") == 50.0 and acct.total("BTC") == 0.1
+
+def test_snapshot_and_event_ordering():
+    acct = AccountState()
+    assert acct.apply_balance({"free": {"USDT": 100.0}, "timestamp": 1000})
+    acct.apply_event({"e": "balanceUpdate", "E": 1001, "T": 1000, "a": "USDT", "d": "10"})  # déjà dans le snapshot
+    assert acct.free_balance("USDT") == 100.0
+    acct.apply_event({"e": "balanceUpdate", "E": 1501, "T": 1500, "a": "USDT", "d": "10"})
+    assert acct.free_balance("USDT") == 110.0
+    # Réponse REST arrivée après l'événement mais antérieure à celui-ci : ne l'écrase pas
+    assert not acct.apply_balance({"free": {"USDT": 100.0}, "timestamp": 1200})
+    assert acct.free_balance("USDT") == 110.0
+
+def test_buy_reservation_until_execution_report():
+    acct = AccountState()
+    acct.apply_balance({"free": {"USDT": 1000.0}, "timestamp": 1000})
+    acct.reserve("bot_a", "USDT", 200.0)
+    acct.reserve("bot_b", "USDT", 160.0)
+    assert acct.free_balance("USDT") == 640.0  # un 3e BUY concurrent se dimensionne sur le reste
+    acct.apply_event({"e": "executionReport", "c": "bot_a", "i": 1, "X": "FILLED"})
+    acct.apply_event({"e": "outboundAccountPosition", "u": 2000, "B": [{"a": "USDT", "f": "800.0", "l": "0"}]})
+    assert acct.free_balance("USDT") == 640.0
+    acct.release("bot_b")
+    assert acct.free_balance("USDT") == 800.0
+
+@pytest.mark.asyncio
+async def test_user_stream_against_local_server():
+    paths = []
+    sent = asyncio.Event()
+
+    async def handler(ws):
+        paths.append(ws.request.path)
+        # Déjà inclus dans la réconciliation (updateTime 1000) : ignoré
+        await ws.send(json.dumps({"e": "balanceUpdate", "E": 900, "T": 900, "a": "USDT", "d": "50.0"}))
+        await ws.send(json.dumps({"e": "outboundAccountPosition", "E": 2001, "u": 2000,
+                                  "B": [{"a": "USDT", "f": "750.0", "l": "250.0"}]}))
+        sent.set()
+        await ws.wait_closed()
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        ex = _FakeExchange()
+        acct = AccountState()
+        stream = UserDataStream(ex, acct, base_url=f"ws://127.0.0.1:{port}", reconnect_delay=0.01)
+        task = asyncio.create_task(stream.run())
+        try:
+            await asyncio.wait_for(stream.ready.wait(), 5)
+            await asyncio.wait_for(sent.wait(), 5)
+            for _ in range(200):
+                if acct.free_balance("USDT") == 750.0:
+                    break
+                await asyncio.sleep(0.01)
+            assert acct.streaming and acct.is_fresh(0)
+        finally:
+            task.cancel()
+    assert paths == ["/ws/abc123"]
+    assert ex.balance_calls == 1
+    assert acct.free_balance("USDT") == 750.0 and acct.total("USDT") == 1000.0
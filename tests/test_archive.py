@@ -0,0 +1,70 @@
+# tests/test_archive.py
+import time
+
+import numpy as np
+import pytest
+from src.archive import CandleArchive, download
+from src.candles import CandleBuffer, refresh_buffer
+from src.ml_signals import build_dataset
+
+H = 3_600_000
+
+def _rows(start, n):
+    return [[start + i * H, 1.0 + i, 2.0 + i, 0.5 + i, 1.5 + i, 10.0 + i] for i in range(n)]
+
+class _PagedExchange:
+    """fetch_ohlcv paginé sur une série horaire complète jusqu'à `now`"""
+
+    def __init__(self, first, now):
+        self.series = _rows(first, (now - first) // H + 1)
+        self.calls = []
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls.append(since)
+        rows = [r for r in self.series if since is None or r[0] >= since]
+        return rows[:limit] if since is not None else rows[-limit:]
+
+def test_append_prepend_and_range_reads(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    assert archive.write("BTC/USDT", "1h", _rows(10 * H, 5)) == 5
+    assert archive.write("BTC/USDT", "1h", _rows(12 * H, 6)) == 3  # chevauchement ignoré
+    assert archive.write("BTC/USDT", "1h", _rows(7 * H, 4)) == 3  # réécriture en tête
+    ts = archive.timestamps("BTCUSDT", "1h")
+    assert list(ts) == [i * H for i in range(7, 18)]
+    cols = archive.read("BTC/USDT", "1h", start=9 * H, end=12 * H)
+    assert isinstance(cols["close"], np.memmap)
+    assert list(cols["timestamp"]) == [9 * H, 10 * H, 11 * H]
+    assert list(cols["close"]) == [3.5, 1.5, 2.5]
+    assert archive.tail("BTC/USDT", "1h", 2)[:, 0].tolist() == [16 * H, 17 * H]
+    assert archive.keys() == [("BTCUSDT", "1h")]
+
+    # Crash au milieu d'un append : la colonne la plus courte fait foi puis est réparée
+    with open(tmp_path / "BTCUSDT" / "1h" / "close.bin", "ab") as f:
+        f.write(b"\x00" * 12)
+    assert archive.length("BTC/USDT", "1h") == 11
+    assert archive.write("BTC/USDT", "1h", _rows(18 * H, 1)) == 1
+    assert archive.read("BTC/USDT", "1h", start=18 * H)["close"].tolist() == [1.5]
+
+@pytest.mark.asyncio
+async def test_download_fetches_only_missing_ranges_and_warms_buffers(tmp_path):
+    now = int(time.time() * 1000) // H * H
+    ex = _PagedExchange(now - 100 * H, now)
+    archive = CandleArchive(str(tmp_path))
+    added = await download(ex, archive, "ETH/USDT", "1h", since=now - 50 * H, page=20)
+    assert added == 50  # bougie en cours exclue
+    assert archive.last_timestamp("ETH/USDT", "1h") == now - H
+    ex.calls.clear()
+    assert await download(ex, archive, "ETH/USDT", "1h", since=now - 60 * H, page=20) == 10
+    assert ex.calls == [now - 60 * H]  # seule la plage manquante en tête, rien après la dernière
+    assert archive.first_timestamp("ETH/USDT", "1h") == now - 60 * H
+
+    # Warm-up : buffer amorcé depuis le disque, seul le delta est téléchargé
+    ex.calls.clear()
+    buf = CandleBuffer(30)
+    await refresh_buffer(ex, buf, "ETH/USDT", "1h", 30, archive)
+    assert ex.calls == [now - H]
+    assert len(buf) == 30 and buf.last_open_time == now
+
+    # Entraînement ML lu depuis la même archive
+    X, y = build_dataset(archive, ["ETH/USDT"], "1h", {'rsi_window': 5, 'sma_short_window': 3, 'sma_long_window': 8})
+    assert X.shape == (60 - 8, 3) and len(y) == len(X)
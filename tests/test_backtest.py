@@ -0,0 +1,115 @@
+# tests/test_backtest.py
+import math
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from src.backtest import run_backtest, strategy_indicators
+from src.guards import prepare_order
+
+CFG = {
+    'bot': {'position_size_pct': 0.2},
+    'strategy': {'rsi_window': 14, 'sma_short_window': 10, 'sma_long_window': 50,
+                 'rsi_buy': 45, 'rsi_sell': 70, 'take_profit_pct': 0.03, 'trailing_stop_pct': 0.02},
+    'backtest': {'fee_pct': 0.001, 'initial_cash': 10000.0},
+}
+SYMBOL_INFO = {"symbol": "BTCUSDT", "filters": [
+    {"filterType": "LOT_SIZE", "minQty": "0.001", "maxQty": "9000", "stepSize": "0.001"},
+    {"filterType": "NOTIONAL", "minNotional": "10"},
+]}
+
+def _fixture(n=3000, seed=21):
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))), 2)
+    open_ = np.round(np.r_[100.0, close[:-1]] * (1 + rng.normal(0, 0.002, n)), 2)
+    high = np.maximum(open_, close) * 1.004
+    low = np.minimum(open_, close) * 0.996
+    idx = pd.date_range('2024-01-01', periods=n, freq='h')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': 1.0}, index=idx)
+
+class _Feed(bt.feeds.PandasData):
+    lines = ('rsi', 'sma_short', 'sma_long')
+    params = (('rsi', -1), ('sma_short', -1), ('sma_long', -1), ('openinterest', None))
+
+class _Reference(bt.Strategy):
+    """Stratégie backtrader d'origine, alimentée par les mêmes indicateurs"""
+
+    def __init__(self):
+        self.fills = []
+
+    def notify_order(self, order):
+        if order.status == order.Completed:
+            self.fills.append((order.isbuy(), order.executed.price, abs(order.executed.size)))
+            if order.isbuy():
+                self.peak = order.executed.price
+
+    def next(self):
+        s, d = CFG['strategy'], self.data
+        if not self.position:
+            if d.rsi[0] < s['rsi_buy'] and d.sma_short[0] > d.sma_long[0]:
+                size = self.broker.getcash() * CFG['bot']['position_size_pct'] / d.close[0]
+                try:
+                    _, size = prepare_order(SYMBOL_INFO, 'BUY', d.close[0], d.close[0], size)
+                except ValueError:
+                    return
+                self.buy(size=size)
+        else:
+            change = (d.close[0] / self.position.price) - 1
+            self.peak = max(self.peak, d.close[0])
+            if change >= s['take_profit_pct'] or d.close[0] <= self.peak * (1 - s['trailing_stop_pct']):
+                self.close()
+
+def _backtrader(df):
+    ind = strategy_indicators(df['close'].to_numpy(), CFG['strategy'])
+    data = df.assign(rsi=ind['RSI'], sma_short=ind['SMA_short'], sma_long=ind['SMA_long'])
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.adddata(_Feed(dataname=data))
+    cerebro.addstrategy(_Reference)
+    cerebro.broker.setcash(CFG['backtest']['initial_cash'])
+    cerebro.broker.setcommission(commission=CFG['backtest']['fee_pct'])
+    strat = cerebro.run()[0]
+    return strat.fills, cerebro.broker.getvalue()
+
+def test_matches_backtrader_on_fixture():
+    df = _fixture()
+    fills, value = _backtrader(df)
+    result = run_backtest(df, CFG, symbol_info=SYMBOL_INFO)
+
+    ours = []
+    for t in result.trades.itertuples():
+        ours.append((True, t.entry_price, t.qty))
+        if t.reason != 'OPEN':
+            ours.append((False, t.exit_price, t.qty))
+    assert len(fills) > 20
+    assert [f[0] for f in fills] == [o[0] for o in ours]
+    for (_, bp, bq), (_, op, oq) in zip(fills, ours):
+        assert math.isclose(bp, op, rel_tol=1e-12) and math.isclose(bq, oq, rel_tol=1e-12)
+    assert math.isclose(result.stats['final_equity'], value, rel_tol=1e-9)
+    assert math.isclose(result.equity.iloc[-1], value, rel_tol=1e-9)
+
+def test_trailing_stop_follows_the_highest_close():
+    closes = np.array([100.0, 100.0, 105.0, 110.0, 107.0, 106.0, 90.0])
+    opens = np.r_[100.0, closes[:-1]]
+    idx = pd.date_range('2024-01-01', periods=len(closes), freq='h')
+    n = len(closes)
+    ind = {'RSI': np.r_[30.0, np.full(n - 1, 50.0)], 'SMA_short': np.full(n, 2.0), 'SMA_long': np.full(n, 1.0)}
+    cfg = {**CFG, 'strategy': {**CFG['strategy'], 'take_profit_pct': 0.5}}
+    result = run_backtest(pd.DataFrame({'open': opens, 'close': closes}, index=idx), cfg, fee_pct=0.0,
+                          indicators=ind)
+    trade = result.trades.iloc[0]
+    # 107 <= 110 * 0.98 : sortie à l'ouverture suivante, bien au-dessus du stop fixe 100 * 0.98
+    assert trade['reason'] == 'STOP_LOSS'
+    assert trade['exit_time'] == idx[5] and trade['exit_price'] == 107.0
+
+def test_stats_and_min_notional_rejection():
+    df = _fixture(800, seed=3)
+    tiny = {**CFG, 'backtest': {'fee_pct': 0.0, 'initial_cash': 20.0}}
+    result = run_backtest(df, tiny, symbol_info=SYMBOL_INFO)
+    assert result.trades.empty  # 20 * 20 % = 4 USDT < NOTIONAL 10
+    assert result.stats['final_equity'] == 20.0
+    result = run_backtest(df, CFG)
+    closed = result.trades[result.trades['reason'] != 'OPEN']
+    assert set(closed['reason']) <= {'TAKE_PROFIT', 'STOP_LOSS'}
+    assert 0.0 <= result.stats['max_drawdown'] < 1.0
+    assert math.isclose(result.stats['final_equity'] - 10000.0,
+                        result.trades['pnl'].sum(), rel_tol=1e-9, abs_tol=1e-6)
@@ -0,0 +1,63 @@
+# tests/test_candles.py
+import asyncio
+import time
+
+import numpy as np
+from src.candles import CandleBuffer, refresh_buffer
+
+H = 3_600_000
+
+def _rows(start, n, close0=100.0):
+    return [[start + i * H, close0 + i, close0 + i + 1, close0 + i - 1, close0 + i + 0.5, 10.0 + i] for i in range(n)]
+
+def test_merge_replaces_forming_candle_and_appends():
+    buf = CandleBuffer(5)
+    assert buf.merge(_rows(0, 3)) == 3
+    forming = [[2 * H, 102.0, 110.0, 101.0, 109.0, 99.0]]
+    assert buf.merge(forming + _rows(3 * H, 1, 200.0)) == 1
+    assert len(buf) == 4
+    assert list(buf.timestamps()) == [0, H, 2 * H, 3 * H]
+    assert buf.close[2] == 109.0 and buf.close[3] == 200.5
+
+def test_ring_buffer_wraps_with_contiguous_zero_copy_view():
+    buf = CandleBuffer(4)
+    buf.merge(_rows(0, 3))
+    buf.merge(_rows(3 * H, 3, 103.0))  # 6 bougies pour 4 slots
+    assert len(buf) == 4
+    assert list(buf.timestamps()) == [2 * H, 3 * H, 4 * H, 5 * H]
+    assert list(buf.close) == [102.5, 103.5, 104.5, 105.5]
+    assert buf.view().shape == (5, 4)
+    assert buf.close.flags['C_CONTIGUOUS']
+    assert np.shares_memory(buf.close, buf.view())
+    df = buf.to_frame()
+    assert list(df.columns) == ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    assert df['close'].tolist() == [102.5, 103.5, 104.5, 105.5]
+
+def test_older_candles_are_ignored():
+    buf = CandleBuffer(10)
+    buf.merge(_rows(5 * H, 2))
+    version = buf.version
+    assert buf.merge(_rows(0, 3)) == 0
+    assert buf.version == version
+    assert buf.last_open_time == 6 * H
+
+class _FakeExchange:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls.append(since)
+        rows = [r for r in self.rows if since is None or r[0] >= since]
+        return rows[-limit:] if since is None else rows[:limit]
+
+def test_refresh_fetches_only_new_candles():
+    now = int(time.time() * 1000) // H * H
+    ex = _FakeExchange(_rows(now - 9 * H, 10))
+    buf = CandleBuffer(10)
+    asyncio.run(refresh_buffer(ex, buf, "BTC/USDT", "1h", 10))
+    ex.rows = ex.rows + _rows(now + H, 1, 500.0)
+    added = asyncio.run(refresh_buffer(ex, buf, "BTC/USDT", "1h", 10))
+    assert ex.calls == [None, now]
+    assert added == 1
+    assert buf.last_open_time == now + H
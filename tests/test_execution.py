@@ -0,0 +1,150 @@
+# tests/test_execution.py
+import asyncio
+
+import pytest
+from src.execution import OrderPipeline
+
+@pytest.mark.asyncio
+async def test_same_symbol_orders_are_serialized_and_deduplicated():
+    events = []
+
+    async def order(name):
+        events.append(("start", name))
+        await asyncio.sleep(0.01)
+        events.append(("end", name))
+        return name
+
+    pipeline = OrderPipeline(concurrency=4, orders_per_second=0)
+    pipeline.start()
+    buy = pipeline.submit("BTC/USDT", "BUY", order, "buy")
+    sell = pipeline.submit("BTC/USDT", "SELL", order, "sell")
+    assert pipeline.submit("BTC/USDT", "SELL", order, "dup") is sell
+    other = pipeline.submit("ETH/USDT", "BUY", order, "eth")
+    assert await asyncio.gather(buy, sell, other) == ["buy", "sell", "eth"]
+    btc = [e for e in events if e[1] in ("buy", "sell")]
+    assert btc == [("start", "buy"), ("end", "buy"), ("start", "sell"), ("end", "sell")]
+    assert events.index(("start", "eth")) < events.index(("end", "buy"))  # symboles distincts en parallèle
+    assert not pipeline.pending("BTC/USDT")
+    await pipeline.stop()
+
+@pytest.mark.asyncio
+async def test_order_rate_is_capped_and_errors_do_not_stop_workers():
+    loop = asyncio.get_running_loop()
+    sent = []
+
+    async def order(symbol):
+        sent.append(loop.time())
+        if symbol == "BAD/USDT":
+            raise RuntimeError("rejet")
+        return True
+
+    pipeline = OrderPipeline(concurrency=4, orders_per_second=50)
+    pipeline.start()
+    futures = [pipeline.submit(s, "BUY", order, s) for s in ("A/USDT", "BAD/USDT", "B/USDT", "C/USDT")]
+    assert await asyncio.gather(*futures) == [True, None, True, True]
+    assert sent[-1] - sent[0] >= 3 * 0.02 * 0.9
+    await pipeline.stop()
+
+class _Exchange:
+    def __init__(self):
+        self.orders = []
+
+    async def publicGetExchangeInfo(self, params=None):
+        return {"symbols": [{"symbol": "BTCUSDT", "status": "TRADING", "filters": [
+            {"filterType": "LOT_SIZE", "minQty": "0.001", "maxQty": "100", "stepSize": "0.001"}]}]}
+
+    async def create_order(self, symbol, type, side, amount, price=None, params=None):
+        await asyncio.sleep(0.01)
+        self.orders.append((symbol, side, amount))
+        return {"id": str(len(self.orders)), "status": "closed"}
+
+@pytest.mark.asyncio
+async def test_strategy_sell_and_tpsl_sell_do_not_collide(tmp_path, monkeypatch):
+    import utils
+    from src import main as bot
+
+    monkeypatch.setenv("BOT_STATE_PATH", str(tmp_path / "state.json"))
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    bot.load_state()
+    ex = _Exchange()
+    utils.prime_exchange_info(await ex.publicGetExchangeInfo())
+    bot.set_position("BTC/USDT", 0.5, 100.0)
+    cfg = {"bot": {"dry_run": False, "position_size_pct": 0.5}}
+    pipeline = OrderPipeline(concurrency=2, orders_per_second=0)
+    pipeline.start()
+    analysis = {"symbol": "BTC/USDT", "signal": {"action": "SELL", "confidence": 1.0}, "price": 104.0}
+    strategy_sell = pipeline.submit("BTC/USDT", "SELL", bot.execute_trade, ex, analysis, cfg)
+    await bot.submit_sell(ex, pipeline, "BTC/USDT", 0.5, 105.0, "Take profit")
+    assert pipeline.pending("BTC/USDT", bot.TPSL_ACTION)  # pas absorbé par le SELL de stratégie
+    await pipeline.join()
+    assert await strategy_sell is True
+    # La position entière est vendue une seule fois ; la vente TP/SL trouve la position fermée
+    assert ex.orders == [("BTC/USDT", "sell", 0.5)]
+    assert bot.get_position("BTC/USDT") is None
+    await pipeline.stop()
+    utils.prime_exchange_info({})
+
+@pytest.mark.asyncio
+async def test_positions_and_pnl_follow_paper_fills(tmp_path, monkeypatch):
+    import utils
+    from src import main as bot
+    from src.marketdata import BookStore
+    from src.paper import PaperExchange
+
+    monkeypatch.setenv("BOT_STATE_PATH", str(tmp_path / "state.json"))
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    bot.load_state()
+    upstream = _Exchange()
+    utils.prime_exchange_info(await upstream.publicGetExchangeInfo())
+    book = BookStore(4)
+    book.update("BTCUSDT", 99.0, 1.0, 101.0, 1.0, 1)
+    ex = PaperExchange(upstream, balances={"USDT": 10_000.0}, fee_pct=0.001, book=book)
+    cfg = {"bot": {"dry_run": False, "position_size_pct": 0.01}}
+    analysis = {"symbol": "BTC/USDT", "signal": {"action": "BUY", "confidence": 1.0}, "price": 100.0}
+    assert await bot.execute_trade(ex, analysis, cfg)
+    pos = bot.get_position("BTC/USDT")
+    assert pos["entry_price"] == 101.0 and pos["qty"] == 1.0  # fill à l'ask, pas au prix du signal
+    assert await bot.execute_sell(ex, "BTC/USDT", pos["qty"], 100.0, "Stop")
+    pnl = bot.get_state()["daily"]["realized_pnl_quote"]
+    assert pnl == pytest.approx(ex.balances["USDT"] - 10_000.0)  # spread et frais inclus
+    assert pnl == pytest.approx(-2.0 - 0.101 - 0.099)
+    utils.prime_exchange_info({})
+
+@pytest.mark.asyncio
+async def test_paper_restart_keeps_its_own_state_and_balances(tmp_path, monkeypatch):
+    import utils
+    from src import main as bot
+    from marketdata import BookStore
+    from paper import PaperExchange  # module vu par src.main (resume_paper)
+
+    live = tmp_path / "state.json"
+    monkeypatch.setenv("BOT_STATE_PATH", str(live))
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    bot.configure_state_path(str(tmp_path / "state.paper.json"))
+    try:
+        upstream = _Exchange()
+        utils.prime_exchange_info(await upstream.publicGetExchangeInfo())
+        book = BookStore(4)
+        book.update("BTCUSDT", 99.0, 1.0, 101.0, 1.0, 1)
+        cfg = {"bot": {"dry_run": False, "position_size_pct": 0.01}}
+        analysis = {"symbol": "BTC/USDT", "signal": {"action": "BUY", "confidence": 1.0}, "price": 100.0}
+
+        bot.load_state()
+        ex = PaperExchange(upstream, balances={"USDT": 10_000.0}, book=book, on_fill=bot.update_paper_balances)
+        bot.resume_paper(ex)
+        assert await bot.execute_trade(ex, analysis, cfg)
+        bot.flush_state()
+
+        # Redémarrage : état relu depuis le journal papier, exchange papier reconstruit
+        bot.load_state()
+        restarted = PaperExchange(upstream, balances={"USDT": 10_000.0}, book=book,
+                                  on_fill=bot.update_paper_balances)
+        assert bot.resume_paper(restarted)
+        assert restarted.balances == ex.balances
+        pos = bot.get_position("BTC/USDT")
+        assert await bot.execute_sell(restarted, "BTC/USDT", pos["qty"], 100.0, "Stop")
+        assert bot.get_position("BTC/USDT") is None
+        assert not live.exists() and not (tmp_path / "state.json.journal").exists()
+    finally:
+        bot.configure_state_path(None)
+        utils.prime_exchange_info({})
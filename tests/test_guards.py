@@ -1,6 +1,6 @@
 # tests/test_guards.py
 import pytest
-from src.guards import normalize_price_qty, check_percent_price_filters, check_min_notional, prepare_order
+from src.guards import normalize_price_qty, check_percent_price_filters, check_min_notional, prepare_order, SymbolFilters, FilterTable, prepare_orders, REJECT_REASONS
 
 def test_normalize_and_round():
     symbol_info = {
@@ -32,3 +32,72 @@ def test_prepare_order_min_notional():
     }
     with pytest.raises(ValueError):
         prepare_order(symbol_info, "BUY", 1.0, 1.0, 5.0)  # notional=5 < 10
+
+def test_compiled_filters_round_exactly_in_ticks():
+    symbol_info = {
+        "symbol": "ABCUSDT",
+        "filters": [
+            {"filterType":"PRICE_FILTER","minPrice":"0.01000000","maxPrice":"100000.00000000","tickSize":"0.01000000"},
+            {"filterType":"LOT_SIZE","minQty":"0.10000000","maxQty":"9000.00000000","stepSize":"0.10000000"},
+        ]
+    }
+    f = SymbolFilters(symbol_info)
+    assert (f.tick_units, f.tick_scale) == (1, 100)
+    # 0.29 / 0.01 = 28.999999999999996 en flottant : l'ancien arrondi donnait 0.28
+    p, q = prepare_order(f, "BUY", 0.29, 0.29, 0.3)
+    assert p == 0.29 and q == 0.3
+
+def test_filter_table_lookup():
+    info = {"symbols": [
+        {"symbol": "BTCUSDT", "filters": [{"filterType":"LOT_SIZE","minQty":"0.00001","maxQty":"9000","stepSize":"0.00001"}]},
+        {"symbol": "ETHUSDT", "filters": [{"filterType":"MIN_NOTIONAL","minNotional":"5"}]},
+    ]}
+    table = FilterTable.from_exchange_info(info)
+    assert len(table) == 2 and "BTC/USDT" in table
+    assert table.get("BTC/USDT") is table.get("BTCUSDT")
+    assert table.get("XRP/USDT") is None
+    with pytest.raises(ValueError):
+        prepare_order(table.get("ETH/USDT"), "SELL", 1.0, 1.0, 4.0)
+
+def _random_table(n):
+    import random
+    rnd = random.Random(3)
+    symbols = []
+    for i in range(n):
+        tick = rnd.choice(["0.01000000", "0.00010000", "1.00000000", "0.00000100"])
+        step = rnd.choice(["0.00001000", "0.10000000", "1.00000000"])
+        filters = [
+            {"filterType": "PRICE_FILTER", "minPrice": tick, "maxPrice": "100000", "tickSize": tick},
+            {"filterType": "LOT_SIZE", "minQty": step, "maxQty": "90000", "stepSize": step},
+            {"filterType": "NOTIONAL", "minNotional": "5"},
+        ]
+        if i % 2:
+            filters.append({"filterType": "PERCENT_PRICE_BY_SIDE", "bidMultiplierUp": "1.2", "bidMultiplierDown": "0.8",
+                            "askMultiplierUp": "1.2", "askMultiplierDown": "0.8"})
+        else:
+            filters.append({"filterType": "PERCENT_PRICE", "multiplierUp": "1.1", "multiplierDown": "0.9"})
+        symbols.append({"symbol": f"S{i}USDT", "filters": filters})
+    return FilterTable.from_exchange_info({"symbols": symbols})
+
+def test_prepare_orders_matches_scalar_pipeline():
+    import numpy as np
+    table = _random_table(40)
+    rng = np.random.default_rng(0)
+    n = 2000
+    symbols = [f"S{i}/USDT" for i in rng.integers(0, 41, n)]  # S40 inconnu
+    sides = rng.choice(["BUY", "SELL"], n)
+    last = rng.uniform(0.01, 500, n)
+    prices = last * rng.uniform(0.75, 1.25, n)
+    qtys = rng.uniform(0, 50, n)
+    out_p, out_q, reasons = prepare_orders(table, symbols, sides, last, prices, qtys)
+    for i in range(n):
+        f = table.get(symbols[i])
+        if f is None:
+            assert REJECT_REASONS[reasons[i]] == "UNKNOWN_SYMBOL"
+            continue
+        try:
+            p, q = prepare_order(f, sides[i], last[i], prices[i], qtys[i])
+            assert reasons[i] == 0 and (p, q) == (out_p[i], out_q[i])
+        except ValueError as e:
+            assert str(e) == f"Filter failure: {REJECT_REASONS[reasons[i]]}"
+    assert set(reasons) >= {0, 1, 2, 3, 4}
@@ -0,0 +1,46 @@
+# tests/test_indicators.py
+import numpy as np
+import pandas as pd
+from src.indicators import IndicatorEngine, compute_indicators
+
+CFG = {'rsi_window': 14, 'sma_short_window': 10, 'sma_long_window': 50}
+
+def _closes(seed=7, n=300):
+    rng = np.random.default_rng(seed)
+    closes = np.round(100 + np.cumsum(rng.normal(0, 1, n)), 2)
+    closes[n // 3:n // 2] = closes[n // 3]  # série constante (cas particulier pandas)
+    return closes
+
+def _same(a, b):
+    return (np.isnan(a) and np.isnan(b)) or a == b
+
+def test_streaming_matches_ta_bit_for_bit():
+    closes = _closes()
+    ref = compute_indicators(pd.DataFrame({'close': closes}), CFG)
+    eng = IndicatorEngine(CFG)
+    for i, c in enumerate(closes):
+        live = eng.peek(c)
+        pushed = eng.push(c)
+        for k in ('SMA_short', 'SMA_long', 'RSI'):
+            assert _same(live[k], ref[k].iloc[i]), (k, i)
+            assert _same(pushed[k], ref[k].iloc[i]), (k, i)
+
+def test_sync_commits_closed_candles_and_previews_live_one():
+    closes = _closes(3, 120)
+    ts = np.arange(len(closes), dtype=np.int64) * 60_000
+    eng = IndicatorEngine(CFG)
+    eng.sync(ts[:100], closes[:100])
+    assert eng.last_closed_ts == ts[98]
+    values = eng.sync(ts[:110], closes[:110])
+    ref = compute_indicators(pd.DataFrame({'close': closes[:110]}), CFG).iloc[-1]
+    assert all(values[k] == ref[k] for k in values)
+    assert eng.last_closed_ts == ts[108]
+
+def test_stream_update_ignores_stale_events():
+    eng = IndicatorEngine(CFG)
+    for i, c in enumerate(_closes(5, 60)):
+        eng.update(i, c, closed=True)
+    before = dict(eng.values)
+    assert eng.update(10, 1e6, closed=True) == before
+    assert eng.update(60, 1e6, closed=False)['SMA_short'] != before['SMA_short']
+    assert eng.values == before
@@ -0,0 +1,139 @@
+# tests/test_marketdata.py
+import asyncio
+import json
+import time
+
+import pytest
+import websockets
+from src.candles import CandleStore
+from src.marketdata import KlineFeed, BookStore, ShardedStream
+
+H = 3_600_000
+
+def _kline(symbol, open_time, close, closed):
+    k = {"t": open_time, "T": open_time + H - 1, "s": symbol, "i": "1h",
+         "o": "1.0", "h": str(close + 1), "l": "0.5", "c": str(close), "v": "10", "x": closed}
+    return json.dumps({"stream": f"{symbol.lower()}@kline_1h", "data": {"e": "kline", "s": symbol, "k": k}})
+
+class _FakeExchange:
+    def __init__(self, now):
+        self.now = now
+        self.calls = []
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls.append((symbol, since))
+        return [[self.now - i * H, 1.0, 2.0, 0.5, 1.5, 10.0] for i in range(3, 0, -1)]
+
+@pytest.mark.asyncio
+async def test_kline_feed_backfills_and_signals_closes():
+    now = int(time.time() * 1000) // H * H
+    paths = []
+    connections = []
+
+    async def handler(ws):
+        paths.append(ws.request.path)
+        connections.append(ws)
+        if len(connections) == 1:
+            await ws.send(_kline("BTCUSDT", now - H, 42.0, True))
+            await ws.send(_kline("BTCUSDT", now, 43.0, False))
+            await ws.send(_kline("ETHUSDT", now, 7.0, False))
+            await ws.close()
+        else:
+            await ws.wait_closed()
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        ex = _FakeExchange(now)
+        store = CandleStore(10)
+        feed = KlineFeed(ex, store, ["BTC/USDT", "ETH/USDT"], "1h", 10,
+                         base_url=f"ws://127.0.0.1:{port}", reconnect_delay=0.01)
+        task = asyncio.create_task(feed.run())
+        try:
+            closed = await feed.wait_closed(timeout=5)
+            assert closed == {"BTC/USDT": now - H}
+            for _ in range(500):
+                if len(connections) == 2 and store.get("BTC/USDT", "1h").live:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+
+    assert paths[0] == "/stream?streams=btcusdt@kline_1h/ethusdt@kline_1h"
+    # Backfill complet à la 1ère connexion, puis delta depuis la dernière bougie après reconnexion
+    assert ex.calls[:2] == [("BTC/USDT", None), ("ETH/USDT", None)]
+    assert ("BTC/USDT", now) in ex.calls[2:]
+    buf = store.get("BTC/USDT", "1h")
+    assert buf.last_open_time == now
+    assert buf.close[-2] == 42.0
+    assert feed.reconnects >= 1
+    assert store.get("ETH/USDT", "1h").live is False
+
+@pytest.mark.asyncio
+async def test_sharded_stream_splits_subscribes_live_and_reconnects_independently():
+    paths = []
+    controls = []
+    sockets = []
+
+    async def handler(ws):
+        paths.append(ws.request.path)
+        sockets.append(ws)
+        async for raw in ws:
+            controls.append((ws.request.path, json.loads(raw)))
+
+    async def wait_for(cond):
+        for _ in range(500):
+            if cond():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("condition jamais atteinte")
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        received = []
+        stream = ShardedStream(received.append, f"ws://127.0.0.1:{port}", max_streams=2, backoff=0.01)
+        stream.set_streams(["a@bookTicker", "b@bookTicker", "c@bookTicker"])
+        task = asyncio.create_task(stream.run())
+        try:
+            await wait_for(lambda: len(paths) == 2)
+            assert sorted(paths) == ["/stream?streams=a@bookTicker/b@bookTicker", "/stream?streams=c@bookTicker"]
+
+            # Changement d'univers : abonnements modifiés sans reconnexion
+            stream.set_streams(["b@bookTicker", "c@bookTicker", "d@bookTicker"])
+            await wait_for(lambda: len(controls) == 2)
+            methods = {m["method"]: (path, m["params"]) for path, m in controls}
+            assert methods["UNSUBSCRIBE"] == ("/stream?streams=a@bookTicker/b@bookTicker", ["a@bookTicker"])
+            assert methods["SUBSCRIBE"] == ("/stream?streams=a@bookTicker/b@bookTicker", ["d@bookTicker"])
+            assert len(stream.shards) == 2 and stream.reconnects == 0
+
+            # Une socket coupée : seul son shard se reconnecte, l'autre continue de recevoir
+            await sockets[1].close()
+            await wait_for(lambda: len(paths) == 3)
+            assert [s.reconnects for s in stream.shards] in ([0, 1], [1, 0])
+            await sockets[0].send("tick")
+            await wait_for(lambda: received == ["tick"])
+        finally:
+            task.cancel()
+
+def _book_msg(symbol, u, bid, ask):
+    return json.dumps({"stream": f"{symbol.lower()}@bookTicker",
+                       "data": {"u": u, "s": symbol, "b": str(bid), "B": "1.5", "a": str(ask), "A": "2.0"}})
+
+def test_book_store_decodes_and_aliases_symbols():
+    book = BookStore(capacity=2)
+    book.register(["BTC/USDT"])
+    assert book.handle(_book_msg("BTCUSDT", 10, 100.0, 101.0)) == "BTCUSDT"
+    assert book.handle(_book_msg("ETHUSDT", 3, 10.0, 10.2)) == "ETHUSDT"
+    assert book.handle(_book_msg("XRPUSDT", 1, 0.5, 0.6)) == "XRPUSDT"  # agrandit les tableaux
+    assert len(book) == 3
+    assert book.midprice("BTC/USDT") == 100.5
+    assert book.midprice("ETH/USDT") == book.midprice("ETHUSDT") == 10.1
+    assert book.midprice("DOGE/USDT") is None
+
+def test_book_store_drops_out_of_order_updates_and_stale_prices():
+    book = BookStore()
+    book.update("BTCUSDT", 100.0, 1.0, 101.0, 1.0, update_id=5, now=1000.0)
+    assert not book.update("BTCUSDT", 90.0, 1.0, 91.0, 1.0, update_id=4, now=1001.0)
+    assert book.midprice("BTCUSDT", now=1001.0) == 100.5
+    assert book.age("BTC/USDT", now=1003.0) == 3.0
+    assert book.midprice("BTCUSDT", max_age=2.0, now=1003.0) is None
+    assert book.midprice("BTCUSDT", max_age=5.0, now=1003.0) == 100.5
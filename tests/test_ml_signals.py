@@ -0,0 +1,62 @@
+# tests/test_ml_signals.py
+import numpy as np
+import pytest
+from src.archive import CandleArchive
+from src.indicators import compute_indicators
+from src.ml_signals import MLSignalGenerator, feature_frame, panel_features, train_job
+
+H = 3_600_000
+
+@pytest.mark.asyncio
+async def test_ml_model_is_persisted_and_scores_a_batch_in_one_call(tmp_path):
+    rng = np.random.default_rng(0)
+    archive = CandleArchive(str(tmp_path / "candles"))
+    for symbol in ("BTC/USDT", "ETH/USDT"):
+        close = 100 + np.cumsum(rng.normal(0, 1, 300))
+        archive.write(symbol, "1h", [[i * H, c, c + 1, c - 1, c, 10.0 + rng.random()] for i, c in enumerate(close)])
+    strat = {'rsi_window': 5, 'sma_short_window': 3, 'sma_long_window': 8}
+    cfg = {'bot': {'timeframe': '1h'}, 'strategy': strat,
+           'archive': {'root': str(tmp_path / "candles")}, 'ml': {'model_path': str(tmp_path / "model.joblib")}}
+    assert train_job(cfg)
+
+    df = archive.to_frame("BTC/USDT", "1h")
+    feats = panel_features(df['close'].to_numpy()[None, :], df['volume'].to_numpy()[None, :], strat)
+    np.testing.assert_allclose(feats[0], feature_frame(compute_indicators(df, strat)).iloc[-1].to_numpy())
+
+    ml = MLSignalGenerator(str(tmp_path / "model.joblib"), threshold=0.5)
+    assert not ml.is_trained  # chargement paresseux à la première inférence
+    symbols = ["BTC/USDT", "ETH/USDT", "XRP/USDT"]
+    batch = np.vstack([feats, feats, [np.nan] * 3])
+    await ml.get_signals(symbols, batch)
+    assert ml.is_trained
+
+    calls = []
+    predict = ml.model.predict_proba
+    ml.model.predict_proba = lambda X: calls.append(len(X)) or predict(X)
+    signals = await ml.get_signals(symbols, batch)
+    assert calls == [2]  # un seul appel pour tout le lot, lignes incomplètes exclues
+    assert signals["XRP/USDT"] == {'action': 'HOLD', 'confidence': 0.0}
+    assert signals["BTC/USDT"] == signals["ETH/USDT"] == await ml.get_signal(compute_indicators(df, strat))
+
+@pytest.mark.asyncio
+async def test_ml_confirms_entries_but_never_blocks_exits():
+    from src import main as bot
+    from src.cache import OHLCVCache
+
+    class _Model:
+        is_trained = True
+
+        async def get_signals(self, symbols, features):
+            self.symbols = list(symbols)
+            return {s: {'action': 'HOLD', 'confidence': 0.0} for s in symbols}
+
+    cache = OHLCVCache(capacity=50)
+    for symbol in ("BTC/USDT", "ETH/USDT"):
+        cache.store.merge(symbol, "1h", [[i * H, 1.0, 2.0, 0.5, 100.0 + i, 10.0] for i in range(50)])
+    cfg = {'bot': {'timeframe': '1h', 'limit': 50},
+           'strategy': {'rsi_window': 5, 'sma_short_window': 3, 'sma_long_window': 8}}
+    buy = {'symbol': "BTC/USDT", 'signal': {'action': 'BUY', 'confidence': 1.0}, 'price': 149.0}
+    sell = {'symbol': "ETH/USDT", 'signal': {'action': 'SELL', 'confidence': 1.0}, 'price': 149.0}
+    model = _Model()
+    assert await bot.confirm_with_ml(model, [buy, sell], cfg, cache) == [sell]
+    assert model.symbols == ["BTC/USDT"]  # seules les entrées sont scorées
@@ -0,0 +1,42 @@
+# tests/test_optimize.py
+import numpy as np
+import pandas as pd
+from src.backtest import run_backtest
+from src.optimize import optimize, param_grid, random_search
+
+CFG = {
+    'bot': {'position_size_pct': 0.2},
+    'strategy': {'rsi_window': 14, 'sma_short_window': 10, 'sma_long_window': 50,
+                 'rsi_buy': 45, 'rsi_sell': 70, 'take_profit_pct': 0.03, 'trailing_stop_pct': 0.02},
+    'backtest': {'fee_pct': 0.001, 'initial_cash': 10000.0},
+}
+
+def _fixture(n=1500, seed=4):
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))), 2)
+    open_ = np.r_[100.0, close[:-1]]
+    return pd.DataFrame({'open': open_, 'close': close}, index=pd.date_range('2024-01-01', periods=n, freq='h'))
+
+def test_grid_drops_inconsistent_combos_and_random_search_is_distinct():
+    space = {'sma_short_window': [10, 50], 'sma_long_window': [30, 60], 'rsi_buy': [40, 45]}
+    grid = param_grid(space, CFG['strategy'])
+    assert all(c['sma_short_window'] < c['sma_long_window'] for c in grid)
+    assert len(grid) == 6
+    sampled = random_search(space, CFG['strategy'], 4, seed=1)
+    assert len({tuple(c.values()) for c in sampled}) == len(sampled) == 4
+
+def test_parallel_sweep_matches_direct_backtests_and_ranks():
+    df = _fixture()
+    combos = param_grid({'rsi_window': [7, 14], 'sma_short_window': [5, 10],
+                         'take_profit_pct': [0.02, 0.04]}, CFG['strategy'])
+    results = optimize(df, CFG, combos, metric='total_return', workers=2)
+    assert len(results) == len(combos)
+    assert list(results['rank']) == list(range(1, len(combos) + 1))
+    assert results['total_return'].is_monotonic_decreasing
+    assert results['cache_hits'].max() > 0  # séries SMA/RSI partagées entre combinaisons
+    for row in results.itertuples():
+        params = {'rsi_window': row.rsi_window, 'sma_short_window': row.sma_short_window,
+                  'take_profit_pct': row.take_profit_pct}
+        expected = run_backtest(df, {**CFG, 'strategy': {**CFG['strategy'], **params}})
+        assert row.final_equity == expected.stats['final_equity']
+        assert row.trades == expected.stats['trades']
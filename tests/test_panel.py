@@ -0,0 +1,41 @@
+# tests/test_panel.py
+import numpy as np
+import pandas as pd
+from src.indicators import compute_indicators
+from src.panel import compute_panel_indicators, panel_signals
+from src.strategies.rsi_sma import RSISMAStrategy
+
+CFG = {'rsi_window': 14, 'sma_short_window': 10, 'sma_long_window': 50, 'rsi_buy': 30, 'rsi_sell': 70}
+
+def _panel(n_symbols=40, n=200, seed=11):
+    rng = np.random.default_rng(seed)
+    closes = np.round(100 + np.cumsum(rng.normal(0, 1.5, (n_symbols, n)), axis=1), 2)
+    closes[0, :120] = np.nan  # historique court, aligné à droite
+    closes[1, 60:90] = closes[1, 60]  # série constante
+    return closes
+
+def test_panel_indicators_match_per_symbol_reference():
+    closes = _panel()
+    ind = compute_panel_indicators(closes, CFG)
+    for i, row in enumerate(closes):
+        ref = compute_indicators(pd.DataFrame({'close': row[~np.isnan(row)]}), CFG)
+        for k in ('SMA_short', 'SMA_long', 'RSI'):
+            got = ind[k][i][~np.isnan(row)]
+            np.testing.assert_allclose(got, ref[k].to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+def test_panel_signals_match_scalar_strategy():
+    closes = _panel(n_symbols=300, seed=5)
+    strategy = RSISMAStrategy({**CFG, 'rsi_buy': 50, 'rsi_sell': 50})
+    symbols = [f"S{i}/USDT" for i in range(len(closes))]
+    candidates = {r['symbol']: r for r in panel_signals(symbols, closes, strategy)}
+    ind = compute_panel_indicators(closes, CFG)
+    expected = {}
+    for i, s in enumerate(symbols):
+        signal = strategy.evaluate({k: ind[k][i, -1] for k in ind})
+        if signal['action'] != 'HOLD':
+            expected[s] = signal
+    assert {s['action'] for s in expected.values()} == {'BUY', 'SELL'}
+    assert set(candidates) == set(expected)
+    for s, signal in expected.items():
+        assert candidates[s]['signal']['action'] == signal['action']
+        assert candidates[s]['signal']['confidence'] == signal['confidence']
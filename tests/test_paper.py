@@ -0,0 +1,58 @@
+# tests/test_paper.py
+import pytest
+from ccxt.base.errors import InsufficientFunds, InvalidOrder
+from src.marketdata import BookStore
+from src.paper import PaperExchange
+
+class _Upstream:
+    def __init__(self):
+        self.tickers = 0
+        self.exchange_info = 0
+
+    async def publicGetExchangeInfo(self, params=None):
+        self.exchange_info += 1
+        return {"symbols": [{"symbol": "BTCUSDT", "filters": [
+            {"filterType": "LOT_SIZE", "minQty": "0.001", "maxQty": "100", "stepSize": "0.001"},
+            {"filterType": "NOTIONAL", "minNotional": "10"},
+        ]}]}
+
+    async def fetch_ticker(self, symbol):
+        self.tickers += 1
+        return {"symbol": symbol, "last": 200.0, "bid": 199.0, "ask": 201.0}
+
+@pytest.mark.asyncio
+async def test_paper_fills_against_book_with_fees_and_filters():
+    book = BookStore(8)
+    book.update("BTCUSDT", 100.0, 1.0, 101.0, 1.0, 1)
+    ex = PaperExchange(_Upstream(), balances={"USDT": 1000.0}, fee_pct=0.001, book=book)
+    buy = await ex.create_order("BTC/USDT", "market", "buy", 2.0)
+    assert buy["status"] == "closed" and buy["average"] == 101.0
+    assert buy["fee"] == {"cost": pytest.approx(0.202), "currency": "USDT"}
+    sell = await ex.create_order("BTC/USDT", "market", "sell", 1.5)
+    assert sell["price"] == 100.0
+    balance = await ex.fetch_balance()
+    assert balance["BTC"]["free"] == pytest.approx(0.5)
+    assert balance["free"]["USDT"] == pytest.approx(1000.0 - 202.202 + 150.0 - 0.15)
+    with pytest.raises(InvalidOrder):
+        await ex.create_order("BTC/USDT", "market", "buy", 0.0015)  # pas de stepSize
+    with pytest.raises(InvalidOrder):
+        await ex.create_order("BTC/USDT", "market", "buy", 0.05)  # 5.05 < NOTIONAL
+    with pytest.raises(InsufficientFunds):
+        await ex.create_order("BTC/USDT", "market", "buy", 50.0)
+    assert ex.stats["filled"] == 2 and ex.stats["rejected_LOT_SIZE"] == 1
+    # Carnet trop vieux : repli sur le ticker REST
+    book.recv_time[book.slot("BTCUSDT")] -= 60
+    order = await ex.create_order("BTC/USDT", "market", "sell", 0.5)
+    assert order["price"] == 199.0 and ex._upstream.tickers == 1
+
+@pytest.mark.asyncio
+async def test_paper_orders_are_served_from_the_book():
+    book = BookStore(8)
+    book.update("BTCUSDT", 100.0, 1.0, 100.1, 1.0, 1)
+    upstream = _Upstream()
+    ex = PaperExchange(upstream, balances={"USDT": 1e9}, book=book, book_max_age=None)
+    for i in range(1000):
+        await ex.create_order("BTC/USDT", "market", "buy" if i % 2 == 0 else "sell", 0.1)
+    # Aucun appel réseau par ordre : filtres chargés une fois, prix lus dans le carnet
+    assert ex.stats["filled"] == 1000
+    assert upstream.exchange_info == 1 and upstream.tickers == 0
@@ -0,0 +1,48 @@
+# tests/test_persistence.py
+import json
+
+from src import persistence
+from src.persistence import load, state, record, save, update_realized_pnl, roll_daily_if_needed
+
+def _use(tmp_path, monkeypatch):
+    monkeypatch.setenv("BOT_STATE_PATH", str(tmp_path / "state.json"))
+    return load()
+
+def test_mutations_are_journaled_and_replayed(tmp_path, monkeypatch):
+    _use(tmp_path, monkeypatch)
+    roll_daily_if_needed("2025-09-01")
+    record("set_position", symbol="BTC/USDT", position={"qty": 0.1, "entry_price": 100.0})
+    record("update_position", symbol="BTC/USDT", fields={"qty": 0.05})
+    update_realized_pnl(12.5)
+    assert not (tmp_path / "state.json").exists()  # aucun snapshot réécrit sur le chemin des ordres
+    lines = (tmp_path / "state.json.journal").read_text().splitlines()
+    assert [json.loads(l)["op"] for l in lines] == ["roll_daily", "set_position", "update_position", "realized_pnl"]
+
+    st = load()
+    assert st["positions"]["BTC/USDT"]["qty"] == 0.05
+    assert st["daily"] == {"date": "2025-09-01", "realized_pnl_quote": 12.5}
+    assert (tmp_path / "state.json.journal").read_text() == ""
+
+def test_replay_skips_records_already_in_snapshot(tmp_path, monkeypatch):
+    _use(tmp_path, monkeypatch)
+    roll_daily_if_needed("2025-09-02")
+    update_realized_pnl(5.0)
+    journal = (tmp_path / "state.json.journal").read_text()
+    save()
+    # Crash simulé entre le rename du snapshot et la remise à zéro du journal
+    (tmp_path / "state.json.journal").write_text(journal)
+    update_realized_pnl(1.0)
+    persistence.flush()
+    assert load()["daily"]["realized_pnl_quote"] == 6.0
+
+def test_truncated_tail_is_ignored(tmp_path, monkeypatch):
+    _use(tmp_path, monkeypatch)
+    record("set_position", symbol="ETH/USDT", position={"qty": 1.0, "entry_price": 10.0})
+    persistence.flush()
+    with open(tmp_path / "state.json.journal", "a") as f:
+        f.write('{"seq":2,"op":"clear_posi')
+    st = load()
+    assert "ETH/USDT" in st["positions"]
+    record("clear_position", symbol="ETH/USDT")
+    assert "ETH/USDT" not in load()["positions"]
+    assert state() is persistence.state()
@@ -0,0 +1,36 @@
+# tests/test_profiling.py
+import asyncio
+import json
+import pstats
+import time
+
+import pytest
+from src.profiling import CycleProfiler
+
+def test_requested_cycles_are_profiled_then_disarmed(tmp_path):
+    profiler = CycleProfiler(str(tmp_path))
+    with profiler.cycle() as meta:
+        meta["due"] = 1
+    assert list(tmp_path.iterdir()) == []  # désarmé : aucun fichier
+    profiler.request(2)
+    for _ in range(3):
+        with profiler.cycle() as meta:
+            sum(range(1000))
+            meta["due"] = 5
+    profiles = sorted(tmp_path.glob("cycle-*.prof"))
+    assert len(profiles) == 2 and not profiler.armed
+    assert pstats.Stats(str(profiles[0])).total_calls > 0
+    meta = json.loads(profiles[0].with_suffix(".json").read_text())
+    assert meta["cycle"] == 2 and meta["due"] == 5 and meta["duration"] >= 0
+
+@pytest.mark.asyncio
+async def test_slow_cycle_watchdog_captures_stacks_while_blocked(tmp_path):
+    profiler = CycleProfiler(str(tmp_path), slow_threshold=0.05)
+    with profiler.cycle():
+        await asyncio.sleep(0)
+    assert list(tmp_path.glob("slow-*")) == []
+    with profiler.cycle():
+        time.sleep(0.2)  # boucle bloquée : la capture vient du thread du watchdog
+    snapshot = next(tmp_path.glob("slow-*.txt")).read_text()
+    assert "test_slow_cycle_watchdog_captures_stacks_while_blocked" in snapshot
+    assert "tâches asyncio" in snapshot
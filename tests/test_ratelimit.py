@@ -0,0 +1,84 @@
+# tests/test_ratelimit.py
+import asyncio
+import json
+import time
+
+import pytest
+from ccxt.base.errors import DDoSProtection
+from metrics import bot_rate_limit_total, bot_ban_total
+from src.ratelimit import WeightScheduler, PRIORITY_ORDER, PRIORITY_MARKET_DATA
+
+class _FakeExchange:
+    """Répond 429/418 selon un script, avec les en-têtes Binance"""
+
+    def __init__(self, script=()):
+        self.script = list(script)
+        self.last_response_headers = {}
+        self.calls = []
+
+    async def fetch_ohlcv(self, symbol):
+        self.calls.append((symbol, time.monotonic()))
+        status = self.script.pop(0) if self.script else 200
+        if status in (418, 429):
+            self.last_response_headers = {"Retry-After": "0.2"}
+            msg = ("Way too much request weight used; IP banned until 1700000000000." if status == 418 else
+                   "Too much request weight used; current limit is 6000 request weight per 1 MINUTE.")
+            self.last_http_response = json.dumps({"code": -1003, "msg": msg})
+            # Format des erreurs ccxt : "<exchange> <statut> <raison> <corps>"
+            raise DDoSProtection(f"binance {status} Too Many Requests {self.last_http_response}")
+        self.last_response_headers = {"X-MBX-USED-WEIGHT-1M": "5"}
+        return symbol
+
+    async def create_order(self, symbol):
+        self.calls.append((symbol, time.monotonic()))
+        return symbol
+
+@pytest.mark.asyncio
+async def test_429_pauses_and_retries_market_data():
+    ex = _FakeExchange([429])
+    sched = WeightScheduler(ex, weight_limit=60000, order_reserve=0.0)
+    before = bot_rate_limit_total._value.get()
+    assert await sched.call(ex.fetch_ohlcv, "BTC/USDT") == "BTC/USDT"
+    assert bot_rate_limit_total._value.get() == before + 1
+    assert len(ex.calls) == 2 and ex.calls[1][1] - ex.calls[0][1] >= 0.19
+
+@pytest.mark.asyncio
+async def test_418_counts_ban_and_raises():
+    ex = _FakeExchange([418])
+    sched = WeightScheduler(ex, weight_limit=60000, order_reserve=0.0)
+    before = bot_ban_total._value.get()
+    with pytest.raises(DDoSProtection):
+        await sched.call(ex.fetch_ohlcv, "BTC/USDT")
+    assert bot_ban_total._value.get() == before + 1
+    assert sched.paused_until > time.monotonic()
+
+def test_ban_is_read_from_status_or_binance_error_code():
+    ex = _FakeExchange()
+    sched = WeightScheduler(ex, weight_limit=60000)
+    # 429 dont le corps contient " 418 " : pas un ban
+    ex.last_http_response = '{"code":-1003,"msg":"Too much request weight used; retry in 418 ms."}'
+    assert not sched._on_limit(DDoSProtection(f"binance 429 Too Many Requests {ex.last_http_response}"))
+    # Statut absent du message (erreur ré-emballée) : ban reconnu au code -1003 "banned"
+    ex.last_http_response = '{"code":-1003,"msg":"Way too much request weight used; IP banned until 1."}'
+    assert sched._on_limit(DDoSProtection("rate limited"))
+    assert sched._on_limit(DDoSProtection("binance 418 I'm a teapot"))
+
+@pytest.mark.asyncio
+async def test_used_weight_header_resyncs_bucket():
+    ex = _FakeExchange()
+    sched = WeightScheduler(ex, weight_limit=100, safety=1.0)
+    await sched.call(ex.fetch_ohlcv, "BTC/USDT", weight=1)
+    assert sched.tokens <= 95 + 1e-3
+
+@pytest.mark.asyncio
+async def test_orders_jump_ahead_of_queued_market_data():
+    ex = _FakeExchange()
+    # 50 de poids par seconde, réserve de 50 % réservée aux ordres
+    sched = WeightScheduler(ex, weight_limit=10, window=0.2, safety=1.0, order_reserve=0.5)
+    sched._tokens = 0.0
+    data = [asyncio.create_task(sched.call(ex.fetch_ohlcv, f"S{i}", weight=2, priority=PRIORITY_MARKET_DATA))
+            for i in range(5)]
+    await asyncio.sleep(0.01)
+    order = asyncio.create_task(sched.call(ex.create_order, "ORDER", weight=1, priority=PRIORITY_ORDER))
+    await asyncio.gather(order, *data)
+    assert ex.calls[0][0] == "ORDER"
@@ -0,0 +1,94 @@
+# tests/test_replay.py
+import asyncio
+import json
+import time
+
+import pytest
+from src.marketdata import BookStore, ShardedStream
+from src.recorder import Recorder, RecordingExchange, read_segments
+from src.replay import ReplayServer
+
+class _Clock:
+    def __init__(self, t):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+class _Exchange:
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        return [[1000, 1.0, 2.0, 0.5, 1.5, 10.0], [2000, 1.5, 2.5, 1.0, 2.0, 12.0]]
+
+    async def fetch_ticker(self, symbol):
+        return {"symbol": symbol, "last": 42.0}
+
+def _book(symbol, u, bid):
+    return json.dumps({"stream": f"{symbol.lower()}@bookTicker",
+                       "data": {"u": u, "s": symbol, "b": str(bid), "B": "1", "a": str(bid + 1), "A": "1"}})
+
+async def _record(tmp_path):
+    clock = _Clock(1_700_000_000.0)
+    rec = Recorder(str(tmp_path), segment_seconds=5, clock=clock)
+    ex = RecordingExchange(_Exchange(), rec)
+    await ex.fetch_ohlcv("BTC/USDT", "1h", since=1000, limit=2)
+    for i in range(10):
+        clock.t += 1.0
+        rec.ws(_book("BTCUSDT", i + 1, 100.0 + i))
+        rec.ws(_book("ETHUSDT", i + 1, 10.0 + i))
+        if i == 6:
+            rec.ws(json.dumps({"u": 99, "s": "XRPUSDT", "b": "0.5", "B": "1", "a": "0.6", "A": "1"}))  # /ws/!bookTicker
+    clock.t += 1.0
+    await ex.fetch_ticker("BTC/USDT")
+    rec.close()
+    return clock
+
+@pytest.mark.asyncio
+async def test_recorder_writes_rotating_compressed_segments(tmp_path):
+    await _record(tmp_path)
+    assert len(list(tmp_path.glob("ws-*.tsv.gz"))) == 2  # rotation toutes les 5 s
+    ws = list(read_segments(str(tmp_path), "ws"))
+    assert len(ws) == 21 and [t for t, _ in ws] == sorted(t for t, _ in ws)
+    assert json.loads(ws[0][1])["data"]["s"] == "BTCUSDT"
+    rest = list(read_segments(str(tmp_path), "rest"))
+    assert [(m, k) for _, m, k, _ in rest] == [("fetch_ohlcv", "BTC/USDT|1h"), ("fetch_ticker", "BTC/USDT")]
+    assert rest[0][3][1] == [2000, 1.5, 2.5, 1.0, 2.0, 12.0]
+
+    # Flux silencieux : les lignes en file sont quand même vidées sur disque en une seconde
+    rec = Recorder(str(tmp_path / "quiet"))
+    rec.ws(_book("BTCUSDT", 1, 100.0))
+    await asyncio.sleep(1.5)
+    assert len(list(read_segments(str(tmp_path / "quiet"), "ws"))) == 1
+    rec.close()
+
+    # Segment tronqué (crash) : lecture jusqu'au dernier bloc valide
+    last = sorted(tmp_path.glob("ws-*.tsv.gz"))[-1]
+    last.write_bytes(last.read_bytes()[:-8])
+    assert 0 < len(list(read_segments(str(tmp_path), "ws"))) <= 21
+
+@pytest.mark.asyncio
+async def test_replay_server_feeds_unmodified_stream_clients_at_speed(tmp_path):
+    await _record(tmp_path)
+    assert ReplayServer(str(tmp_path), speed=5000).clock.speed == 1000  # borné à 1-1000
+    server = ReplayServer(str(tmp_path), speed=200)
+    await server.start()
+    try:
+        book = BookStore(4)
+        stream = ShardedStream(book.handle, server.url, backoff=0.01)
+        stream.set_streams(["btcusdt@bookTicker", "xrpusdt@bookTicker"])
+        task = asyncio.create_task(stream.run())
+        t0 = time.monotonic()
+        await asyncio.wait_for(server.done.wait(), 2.0)
+        elapsed = time.monotonic() - t0
+        task.cancel()
+        assert elapsed < 1.0  # 11 s enregistrées rejouées x200
+        assert book.midprice("BTC/USDT") == 109.5
+        assert book.midprice("XRP/USDT") == 0.55  # payload brut rejoué en message combiné
+        assert book.midprice("ETH/USDT") is None  # non abonné
+
+        ex = server.exchange()
+        assert (await ex.fetch_ohlcv("BTC/USDT", "1h", since=2000))[0][0] == 2000
+        assert (await ex.fetch_ticker("BTC/USDT"))["last"] == 42.0
+        with pytest.raises(Exception):
+            await ex.fetch_ticker("DOGE/USDT")
+    finally:
+        await server.stop()
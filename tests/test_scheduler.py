@@ -0,0 +1,93 @@
+# tests/test_scheduler.py
+import asyncio
+
+import pytest
+from candles import configure_clock  # module importé par src.scheduler (horloge partagée)
+from src.candles import CandleStore
+from src.scheduler import CandleScheduler
+
+H = 3600
+
+def _candles(first, n):
+    return [[(first + i * H) * 1000, 1.0, 2.0, 0.5, 1.5, 10.0] for i in range(n)]
+
+def test_next_wakeup_is_candle_boundary_plus_offset():
+    sched = CandleScheduler("1h", offset=2.0)
+    assert sched.next_wakeup(now=10 * H + 100) == 11 * H + 2
+    assert sched.next_wakeup(now=11 * H + 1) == 11 * H + 2  # frontière passée, offset pas encore
+    assert sched.next_wakeup(now=11 * H + 2) == 12 * H + 2
+
+def test_due_only_returns_symbols_with_a_new_closed_candle():
+    store = CandleStore(50)
+    sched = CandleScheduler("1h", offset=2.0)
+    store.merge("BTC/USDT", "1h", _candles(0, 10))  # bougie 9H en cours à 9H + 10 min
+    store.merge("ETH/USDT", "1h", _candles(0, 10))
+    now = 9 * H + 600
+    assert sched.due(store, ["BTC/USDT", "ETH/USDT", "XRP/USDT"], now) == ["BTC/USDT", "ETH/USDT", "XRP/USDT"]
+    sched.mark(store, ["BTC/USDT", "ETH/USDT"], now)
+    store.merge("BTC/USDT", "1h", [[9 * H * 1000, 1.0, 2.0, 0.5, 1.6, 12.0]])  # mise à jour intra-bougie
+    assert sched.due(store, ["BTC/USDT", "ETH/USDT"], now) == []
+    later = 10 * H + 2
+    store.merge("BTC/USDT", "1h", _candles(10 * H, 1))
+    assert sched.due(store, ["BTC/USDT", "ETH/USDT"], later) == ["BTC/USDT", "ETH/USDT"]
+    sched.mark(store, ["BTC/USDT", "ETH/USDT"], later)
+    assert sched.due(store, ["BTC/USDT", "ETH/USDT"], later) == []
+
+@pytest.mark.asyncio
+async def test_wait_returns_early_on_kline_close():
+    class _Feed:
+        def __init__(self):
+            self.closed = asyncio.Queue()
+
+        async def wait_closed(self, timeout, settle=0.0):
+            symbol, open_time = await asyncio.wait_for(self.closed.get(), timeout)
+            return {symbol: open_time}
+
+    feed = _Feed()
+    sched = CandleScheduler("1h", offset=2.0)
+    asyncio.get_running_loop().call_later(0.01, feed.closed.put_nowait, ("BTC/USDT", 0))
+    assert await asyncio.wait_for(sched.wait(feed), 1.0) == {"BTC/USDT": 0}
+
+@pytest.mark.asyncio
+async def test_replay_clock_drives_closed_candles_and_wait():
+    class _Feed:
+        async def wait_closed(self, timeout, settle=0.0):
+            self.timeout = timeout
+            return {}
+
+    store = CandleStore(50)
+    store.merge("BTC/USDT", "1h", _candles(0, 10))  # enregistrée à 9H + 10 min : bougie 9H en cours
+    configure_clock(lambda: 9 * H + 600, speed=100)
+    try:
+        sched = CandleScheduler("1h", offset=2.0)
+        assert sched.last_closed(store.get("BTC/USDT", "1h")) == 8 * H * 1000
+        feed = _Feed()
+        await sched.wait(feed)
+        assert feed.timeout == pytest.approx((H - 600 + 2) / 100)
+    finally:
+        configure_clock()
+
+def test_live_symbols_wait_for_their_own_kline_close():
+    store = CandleStore(50)
+    sched = CandleScheduler("1h", offset=2.0, grace=10.0)
+    for symbol in ("BTC/USDT", "ETH/USDT"):
+        store.merge(symbol, "1h", _candles(0, 10))
+        store.get(symbol, "1h").live = True
+    now = 9 * H + 600
+    sched.on_closed({"BTC/USDT": 8 * H * 1000, "ETH/USDT": 8 * H * 1000})
+    assert sched.due(store, ["BTC/USDT", "ETH/USDT"], now) == ["BTC/USDT", "ETH/USDT"]
+    sched.mark(store, ["BTC/USDT", "ETH/USDT"], now)
+    # Frontière 10H : seul BTC a reçu sa clôture, ETH est différé sans être marqué
+    for symbol in ("BTC/USDT", "ETH/USDT"):
+        store.merge(symbol, "1h", _candles(10 * H, 1))
+    sched.on_closed({"BTC/USDT": 9 * H * 1000})
+    later = 10 * H + 2
+    assert sched.due(store, ["BTC/USDT", "ETH/USDT"], later) == ["BTC/USDT"]
+    sched.mark(store, ["BTC/USDT", "ETH/USDT"], later)
+    assert sched.next_wakeup(later) == 10 * H + 10  # réveil à la fin du délai de grâce
+    sched.on_closed({"ETH/USDT": 9 * H * 1000})
+    assert sched.due(store, ["BTC/USDT", "ETH/USDT"], later + 1) == ["ETH/USDT"]
+    # Flux muet au-delà du délai de grâce : repli sur l'horloge
+    store.merge("BTC/USDT", "1h", _candles(11 * H, 1))
+    assert sched.due(store, ["BTC/USDT"], 11 * H + 5) == []
+    assert sched.due(store, ["BTC/USDT"], 11 * H + 10) == ["BTC/USDT"]
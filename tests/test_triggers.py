@@ -0,0 +1,41 @@
+# tests/test_triggers.py
+import json
+
+import src.triggers as triggers_mod
+from src.marketdata import BookStore
+from src.triggers import TriggerIndex
+
+def _tick(symbol, bid, ask, u):
+    return json.dumps({"u": u, "s": symbol, "b": str(bid), "B": "1", "a": str(ask), "A": "1"})
+
+def test_trailing_stop_follows_high_water_mark_on_ticks(monkeypatch):
+    persisted = []
+    monkeypatch.setattr(triggers_mod, "update_position_high", lambda s, h: persisted.append((s, h)))
+    fired = []
+    index = TriggerIndex(take_profit_pct=0.05, trailing_stop_pct=0.02, on_trigger=lambda *a: fired.append(a))
+    book = BookStore(4)
+    book.listeners.append(index.on_tick)
+    index.sync({"BTC/USDT": {"qty": 0.5, "entry_price": 100.0}})
+    assert index.levels("BTC/USDT") == (105.0, 98.0)
+
+    book.handle(_tick("BTCUSDT", 99.0, 99.1, 1))
+    book.handle(_tick("BTCUSDT", 103.0, 103.1, 2))  # nouveau plus haut : le stop remonte
+    assert index.levels("BTC/USDT") == (105.0, 103.0 * 0.98)
+    assert persisted == [("BTC/USDT", 103.0)]
+    book.handle(_tick("BTCUSDT", 100.5, 100.6, 3))  # ancien stop fixe (98) non atteint, trailing oui
+    assert fired == [("BTC/USDT", 0.5, 100.5, "STOP_LOSS")]
+    book.handle(_tick("BTCUSDT", 90.0, 90.1, 4))
+    assert len(fired) == 1  # désarmé jusqu'à la réconciliation
+
+def test_sync_restores_persisted_high_and_rearms_failed_sells():
+    index = TriggerIndex(take_profit_pct=0.05, trailing_stop_pct=0.02)
+    positions = {"ETH/USDT": {"qty": 1.0, "entry_price": 10.0, "high": 10.4}}
+    index.sync(positions)
+    assert index.levels("ETH/USDT") == (10.5, 10.4 * 0.98)
+    assert index.check("ETHUSDT", 10.6) == ("ETH/USDT", 1.0, 10.6, "TAKE_PROFIT")
+    index.sync(positions, skip=lambda s: True)  # vente en cours : pas de réarmement
+    assert index.check("ETHUSDT", 10.6) is None
+    index.sync(positions, skip=lambda s: False)  # vente échouée, position toujours ouverte
+    assert index.check("ETHUSDT", 10.6) is not None
+    index.sync({})
+    assert len(index) == 0
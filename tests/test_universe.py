@@ -0,0 +1,50 @@
+# tests/test_universe.py
+import asyncio
+
+from src.universe import Universe, select_universe
+
+MARKETS = {
+    "BTC/USDT": {"base": "BTC", "quote": "USDT", "active": True, "type": "spot"},
+    "ETH/USDT": {"base": "ETH", "quote": "USDT", "active": True, "type": "spot"},
+    "DOGE/TRY": {"base": "DOGE", "quote": "TRY", "active": True, "type": "spot"},
+    "OLD/USDT": {"base": "OLD", "quote": "USDT", "active": False, "type": "spot"},
+    "BTC/USDT:USDT": {"base": "BTC", "quote": "USDT", "active": True, "type": "swap"},
+    "XRP/USDT": {"base": "XRP", "quote": "USDT", "active": True, "type": "spot"},
+}
+TICKERS = {
+    "BTC/USDT": {"quoteVolume": 5e9},
+    "ETH/USDT": {"quoteVolume": 2e9},
+    "DOGE/TRY": {"quoteVolume": 9e9},
+    "OLD/USDT": {"quoteVolume": 9e9},
+    "XRP/USDT": {"quoteVolume": 5e4},
+}
+
+def test_select_universe_filters_and_ranks_by_volume():
+    assert select_universe(MARKETS, TICKERS, ["USDT"], 1e5, 50) == ["BTC/USDT", "ETH/USDT"]
+    assert select_universe(MARKETS, TICKERS, ["USDT"], 0, 2) == ["BTC/USDT", "ETH/USDT"]
+    assert select_universe(MARKETS, {}, ["USDT"], 0, 50) == ["BTC/USDT", "ETH/USDT", "XRP/USDT"]
+
+class _FakeExchange:
+    def __init__(self):
+        self.calls = []
+
+    async def load_markets(self, reload=False):
+        self.calls.append("load_markets" if reload else "load_markets (cache)")
+        return MARKETS
+
+    async def fetch_tickers(self):
+        self.calls.append("fetch_tickers")
+        return TICKERS
+
+    async def fetch_ticker(self, symbol):
+        raise AssertionError("pas d'appel par symbole")
+
+def test_universe_refresh_uses_one_bulk_call():
+    ex = _FakeExchange()
+    cfg = {"bot": {"filter_bases": ["USDT"], "volume_threshold": 100000, "max_symbols": 1}}
+    universe = Universe(ex, cfg)
+    assert asyncio.run(universe.refresh()) == ["BTC/USDT"]
+    assert ex.calls == ["load_markets", "fetch_tickers"]
+    assert not universe.is_stale()
+    assert universe.is_stale(now=universe.updated_at + universe.refresh_seconds)
+    assert not universe.is_stale(now=0)
@@ -0,0 +1,71 @@
+# tests/test_warmstart.py
+import time
+
+import numpy as np
+import utils  # module importé par src.warmstart (cache exchangeInfo partagé)
+from src import warmstart
+from src.cache import OHLCVCache
+from src.indicators import IndicatorBank
+from src.universe import Universe
+from src.warmstart import WarmStart
+
+STRATEGY = {"rsi_window": 14, "sma_short_window": 5, "sma_long_window": 20}
+INFO = {"symbols": [{"symbol": "BTCUSDT", "status": "TRADING", "filters": []},
+                    {"symbol": "ETHUSDT", "status": "TRADING", "filters": []}]}
+
+def _cfg():
+    return {"bot": {"timeframe": "1h", "limit": 100}, "strategy": dict(STRATEGY)}
+
+def _state(cfg):
+    cache = OHLCVCache(capacity=100)
+    universe = Universe(None, cfg)
+    return cache, universe, IndicatorBank(cfg["strategy"])
+
+def test_warmstart_roundtrip(tmp_path):
+    cfg = _cfg()
+    cache, universe, indicators = _state(cfg)
+    last = int(time.time() * 1000) // 3_600_000 * 3_600_000
+    rows = [[last - 3_600_000 * (59 - i), 1.0, 2.0, 0.5, 100.0 + i, 10.0] for i in range(60)]
+    cache.store.merge("BTC/USDT", "1h", rows)
+    buf = cache.store.get("BTC/USDT", "1h")
+    values = indicators.engine("BTC/USDT", "1h").sync(buf.timestamps(), buf.close)
+    universe.symbols, universe.updated_at = ["BTC/USDT", "ETH/USDT"], 123.0
+    downloaded = time.time() - 420
+    warmstart.prime_exchange_info(INFO, downloaded)
+
+    warm = WarmStart(str(tmp_path / "warm.pkl"))
+    warm.attach(cache, cfg, universe, indicators)
+    assert warm.save()
+
+    warmstart.prime_exchange_info({})
+    cache2, universe2, indicators2 = _state(cfg)
+    restored = warm.restore(cache2, cfg, universe2, indicators2)
+    assert restored == {"exchange_info": 2, "universe": 2, "candles": 1, "indicators": 1}
+    assert universe2.symbols == ["BTC/USDT", "ETH/USDT"] and universe2.updated_at == 123.0
+    assert warmstart.cached_exchange_info() == INFO
+    assert utils.exchange_info_timestamp() == downloaded  # TTL non prolongé par le redémarrage
+    buf2 = cache2.store.get("BTC/USDT", "1h")
+    np.testing.assert_array_equal(buf2.timestamps(), buf.timestamps())
+    np.testing.assert_array_equal(buf2.view(), buf.view())
+    engine = indicators2._engines[("BTC/USDT", "1h")]
+    assert engine.last_closed_ts == rows[-2][0] and engine.values == indicators.engine("BTC/USDT", "1h").values
+    assert engine.sync(buf2.timestamps(), buf2.close) == values
+
+    # Stratégie modifiée : bougies reprises, indicateurs recalculés
+    cfg["strategy"]["rsi_window"] = 7
+    cache3, universe3, indicators3 = _state(cfg)
+    assert warm.restore(cache3, cfg, universe3, indicators3)["indicators"] == 0
+    warmstart.prime_exchange_info({})
+
+def test_warmstart_rejects_stale_or_corrupt_snapshot(tmp_path):
+    cfg = _cfg()
+    cache, universe, indicators = _state(cfg)
+    cache.store.merge("BTC/USDT", "1h", [[0, 1.0, 1.0, 1.0, 1.0, 1.0]])  # bien au-delà de limit
+    path = tmp_path / "warm.pkl"
+    warm = WarmStart(str(path), max_age=60)
+    warm.attach(cache, cfg, universe, indicators)
+    warm.save()
+    assert warm.restore(OHLCVCache(capacity=100), cfg)["candles"] == 0
+    assert WarmStart(str(path), max_age=60, clock=lambda: time.time() + 3600).read() is None
+    path.write_bytes(b"tronqu")
+    assert warm.read() is None